@@ -0,0 +1,252 @@
+# Materialized pricing and plan statistics, maintained incrementally
+from typing import Any, Dict, List, Optional, Tuple
+import bisect
+import heapq
+import threading
+from collections import Counter
+from datetime import datetime
+
+from api.data_store import data_version, load_cached_json
+from api.price_history import add_price_listener, latest_prices_version, load_latest_prices
+
+# Sums are kept in thousandths so repeated add/remove never drifts
+SCALE = 1000
+
+_lock = threading.Lock()
+
+# key (source versions) -> price aggregates
+_price_aggregates: Dict[str, Any] = {}
+
+# key (plans file version) -> plan aggregates
+_plan_aggregates: Dict[str, Any] = {}
+
+class GroupStats:
+    """Count, sum, minimum and maximum of a group of values.
+
+    The minimum and maximum come from a min-heap and a max-heap. A removed value
+    stays in the heaps until it reaches the top, and is dropped there once no live
+    copy is left (the heaps are rebuilt if stale entries pile up). Updates are
+    O(log n) and summaries amortized O(1).
+    """
+    __slots__ = ("counts", "count", "total", "low", "high")
+
+    def __init__(self):
+        self.counts: Counter = Counter()
+        self.count = 0
+        self.total = 0
+        self.low: List[float] = []
+        self.high: List[float] = []  # negated
+
+    def add(self, value: float) -> None:
+        self.counts[value] += 1
+        self.count += 1
+        self.total += round(value * SCALE)
+        heapq.heappush(self.low, value)
+        heapq.heappush(self.high, -value)
+
+    def remove(self, value: float) -> None:
+        if not self.counts.get(value):
+            return
+        self.counts[value] -= 1
+        if not self.counts[value]:
+            del self.counts[value]
+        self.count -= 1
+        self.total -= round(value * SCALE)
+        if len(self.low) > 2 * self.count + 16:
+            self.low = list(self.counts.elements())
+            heapq.heapify(self.low)
+            self.high = [-value for value in self.low]
+            heapq.heapify(self.high)
+
+    def summary(self, prefix: str = "") -> Dict[str, Any]:
+        while self.low and self.low[0] not in self.counts:
+            heapq.heappop(self.low)
+        while self.high and -self.high[0] not in self.counts:
+            heapq.heappop(self.high)
+        count = self.count
+        return {
+            "product_count": count,
+            f"min_{prefix}price": self.low[0] if count else 0,
+            f"max_{prefix}price": -self.high[0] if count else 0,
+            f"avg_{prefix}price": self.total / SCALE / count if count else 0,
+        }
+
+def price_groups(price: Dict[str, Any], categories: Dict[str, str]) -> List[Tuple[str, str, float]]:
+    """The (kind, group, value) entries a price contributes to."""
+    product_id = price.get("retailer_product_id", "")
+    groups = [("overall", "", price["price"]), ("retailer", product_id.split(":", 1)[0], price["price"])]
+    category = categories.get(product_id)
+    if category:
+        groups.append(("category", category, price["price"]))
+    if "unit_price" in price:
+        groups.append(("unit_price", price.get("unit_price_measure", ""), price["unit_price"]))
+    return groups
+
+def apply_price(state: Dict[str, Any], price: Dict[str, Any], sign: int) -> None:
+    """Add (sign 1) or remove (sign -1) one price from every group it belongs to."""
+    if "price" not in price:
+        return
+    for kind, group, value in price_groups(price, state["categories"]):
+        stats = state["groups"].setdefault((kind, group), GroupStats())
+        if sign > 0:
+            stats.add(value)
+        else:
+            stats.remove(value)
+
+def price_sources_key() -> Tuple[Any, ...]:
+    return (latest_prices_version(), data_version("retailer_catalog.json"),
+            data_version("products.json"), data_version("retailers.json"))
+
+def build_price_aggregates() -> Dict[str, Any]:
+    """Aggregate the current price slice from scratch."""
+    product_categories = {
+        product["canonical_id"]: product.get("category", "")
+        for product in load_cached_json("products.json").get("products", [])
+    }
+    categories = {
+        item["retailer_product_id"]: product_categories.get(item.get("canonical_id"), "")
+        for item in load_cached_json("retailer_catalog.json").get("retailer_products", [])
+    }
+    state = {
+        "categories": categories,
+        "retailers": load_cached_json("retailers.json").get("retailers", []),
+        "current": {},
+        "groups": {},
+        "summary": None,
+    }
+    for price in load_latest_prices().get("prices", []):
+        state["current"][price.get("retailer_product_id", "")] = price
+        apply_price(state, price, 1)
+    return state
+
+def on_prices_changed(changed: Dict[str, Dict[str, Any]], previous_version: Optional[Tuple[str, ...]]) -> None:
+    """Price listener: move changed products between groups instead of rebuilding.
+
+    Only applied when the aggregates were built from the slice this append started
+    from; otherwise the next summary rebuilds them.
+    """
+    key = price_sources_key()
+    with _lock:
+        state = _price_aggregates.get("value")
+        if state is None or _price_aggregates["key"] != (previous_version,) + key[1:]:
+            return
+        for product_id, price in changed.items():
+            previous = state["current"].get(product_id)
+            if previous is not None:
+                apply_price(state, previous, -1)
+            state["current"][product_id] = price
+            apply_price(state, price, 1)
+        state["summary"] = None
+        _price_aggregates["key"] = key
+
+add_price_listener(on_prices_changed)
+
+def pricing_summary() -> Dict[str, Any]:
+    """Pricing statistics summary, rebuilt only when a source file changes outside an ingest."""
+    key = price_sources_key()
+    with _lock:
+        if _price_aggregates.get("key") != key:
+            _price_aggregates.update(key=key, value=build_price_aggregates())
+        state = _price_aggregates["value"]
+        if state["summary"] is not None:
+            return state["summary"]
+
+        groups = state["groups"]
+        overall = groups.get(("overall", ""), GroupStats()).summary()
+        retailer_stats = {}
+        for retailer in state["retailers"]:
+            stats = groups.get(("retailer", retailer["retailer_id"]))
+            if stats and stats.count:
+                retailer_stats[retailer["retailer_id"]] = {"display_name": retailer["display_name"], **stats.summary()}
+
+        state["summary"] = {
+            "summary": {
+                "total_products": len(state["current"]),
+                "total_retailers": len(state["retailers"]),
+                "price_range": {
+                    "min": overall["min_price"],
+                    "max": overall["max_price"],
+                    "average": overall["avg_price"]
+                }
+            },
+            "retailer_stats": retailer_stats,
+            "category_stats": {
+                group: stats.summary()
+                for (kind, group), stats in sorted(groups.items()) if kind == "category" and stats.count
+            },
+            "unit_price_stats": {
+                group: stats.summary("unit_")
+                for (kind, group), stats in sorted(groups.items()) if kind == "unit_price" and stats.count
+            }
+        }
+        return state["summary"]
+
+def parse_generated_at(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+def apply_plan(state: Dict[str, Any], plan: Dict[str, Any], sign: int) -> None:
+    """Add (sign 1) or remove (sign -1) a saved plan entry from the plan aggregates."""
+    generated_at = parse_generated_at(plan["generated_at"])
+    if sign > 0:
+        bisect.insort(state["timestamps"], generated_at)
+    else:
+        position = bisect.bisect_left(state["timestamps"], generated_at)
+        if position < len(state["timestamps"]) and state["timestamps"][position] == generated_at:
+            del state["timestamps"][position]
+
+    # Only structured payloads contribute to the averages
+    payload = plan.get("payload")
+    if isinstance(payload, dict) and payload:
+        state["cost"] += sign * round(payload.get("total_cost", 0.0) * SCALE)
+        state["stores"] += sign * payload.get("num_stores", 0)
+        state["time"] += sign * round(payload.get("total_time", 0.0) * SCALE)
+        state["valid"] += sign
+
+def build_plan_aggregates(plans_data: dict) -> Dict[str, Any]:
+    state = {"timestamps": [], "cost": 0, "stores": 0, "time": 0, "valid": 0}
+    for plan in plans_data.get("plans", []):
+        apply_plan(state, plan, 1)
+    return state
+
+def plans_summary(plans_file: str) -> Dict[str, Any]:
+    """Plan statistics summary, built once per plans file version."""
+    key = data_version(plans_file)
+    with _lock:
+        if _plan_aggregates.get("key") != key:
+            _plan_aggregates.update(key=key, value=build_plan_aggregates(load_cached_json(plans_file)))
+        state = _plan_aggregates["value"]
+
+        if not state["timestamps"]:
+            return {
+                "total_plans": 0,
+                "oldest_plan": None,
+                "newest_plan": None,
+                "average_cost": 0.0,
+                "average_stores": 0.0,
+                "average_time": 0.0
+            }
+        valid = state["valid"]
+        return {
+            "total_plans": len(state["timestamps"]),
+            "oldest_plan": state["timestamps"][0].isoformat(),
+            "newest_plan": state["timestamps"][-1].isoformat(),
+            "average_cost": round(state["cost"] / SCALE / valid, 2) if valid else 0.0,
+            "average_stores": round(state["stores"] / valid, 2) if valid else 0.0,
+            "average_time": round(state["time"] / SCALE / valid, 2) if valid else 0.0
+        }
+
+def record_plan_change(plans_file: str, previous_version: str, added: List[dict], removed: List[dict]) -> None:
+    """Apply saved or deleted plans to the aggregates after plans_file was rewritten.
+
+    Only applied when the aggregates matched the file before the write; otherwise the
+    next summary rebuilds them from the file.
+    """
+    with _lock:
+        state = _plan_aggregates.get("value")
+        if state is None or _plan_aggregates.get("key") != previous_version:
+            return
+        for plan in removed:
+            apply_plan(state, plan, -1)
+        for plan in added:
+            apply_plan(state, plan, 1)
+        _plan_aggregates["key"] = data_version(plans_file)
@@ -0,0 +1,184 @@
+# Anytime route search: greedy construction improved by local search, best-so-far at any deadline
+"""
+Searches routes (ordered stores, at most one per retailer) without enumerating every
+retailer subset and visiting order. A greedy construction gives a first incumbent
+quickly; local search then improves it with 2-opt on the visiting order, store swaps
+within a retailer, and retailer swap, insert and drop moves, restarting from random
+perturbations of the incumbent until it stops improving or the deadline passes.
+
+Routes are scored by a caller-supplied function, so the search uses exactly the
+router's scoring; it returns None for routes that are not feasible.
+"""
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+import random
+import time
+
+# Search time when the caller gives no deadline
+DEFAULT_TIME_LIMIT_SECONDS = 2.0
+
+# Perturbation rounds without a new incumbent before the search stops early
+MAX_STALE_ROUNDS = 30
+
+# Moves applied to the incumbent to start each perturbation round
+PERTURBATION_MOVES = 2
+
+# Fixed seed so the same request always explores the same routes
+RANDOM_SEED = 0
+
+Store = Dict[str, Any]
+ScoreRoute = Callable[[List[Store]], Optional[Dict[str, Any]]]
+
+class AnytimeRouteSearch:
+    """Incumbent-keeping local search over routes.
+
+    candidates maps each retailer to the stores that may represent it. Every scored
+    route is memoized by its store sequence, so revisiting a route costs nothing.
+    """
+
+    def __init__(
+        self,
+        candidates: Dict[str, List[Store]],
+        score: ScoreRoute,
+        max_retailers: int,
+        expires_at: float
+    ):
+        self.candidates = {retailer_id: stores for retailer_id, stores in candidates.items() if stores}
+        self.score = score
+        self.max_retailers = max(1, max_retailers)
+        self.expires_at = expires_at
+        self.scored: Dict[Tuple[str, ...], Optional[Dict[str, Any]]] = {}
+        self.incumbent: Optional[Dict[str, Any]] = None
+        self.rounds = 0
+        self.converged = False
+        self.random = random.Random(RANDOM_SEED)
+
+    def out_of_time(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def evaluate(self, stores: List[Store]) -> Optional[Dict[str, Any]]:
+        """Score a route once, updating the incumbent."""
+        key = tuple(store["store_id"] for store in stores)
+        if key not in self.scored:
+            scored_route = self.score(stores)
+            self.scored[key] = scored_route
+            if scored_route is not None and (
+                self.incumbent is None or scored_route["total_score"] < self.incumbent["total_score"]
+            ):
+                self.incumbent = scored_route
+        return self.scored[key]
+
+    def cost(self, stores: List[Store]) -> float:
+        scored_route = self.evaluate(stores)
+        return scored_route["total_score"] if scored_route is not None else float("inf")
+
+    def construct(self) -> List[Store]:
+        """Greedy start: the best single store, then the best store insertion while it improves."""
+        route: List[Store] = []
+        best_cost = float("inf")
+        for stores in self.candidates.values():
+            for store in stores:
+                candidate_cost = self.cost([store])
+                if candidate_cost < best_cost:
+                    route, best_cost = [store], candidate_cost
+
+        while route and len(route) < self.max_retailers and not self.out_of_time():
+            best_insertion = None
+            for candidate in self.insertions(route):
+                candidate_cost = self.cost(candidate)
+                if candidate_cost < best_cost:
+                    best_insertion, best_cost = candidate, candidate_cost
+            if best_insertion is None:
+                break
+            route = best_insertion
+        return route
+
+    def insertions(self, route: List[Store]) -> Iterator[List[Store]]:
+        """Routes with one unused retailer's store inserted at any position."""
+        used = {store["retailer_id"] for store in route}
+        for retailer_id, stores in self.candidates.items():
+            if retailer_id in used:
+                continue
+            for store in stores:
+                for position in range(len(route) + 1):
+                    yield route[:position] + [store] + route[position:]
+
+    def neighbours(self, route: List[Store]) -> Iterator[List[Store]]:
+        """Routes one move away: 2-opt, store swap, retailer swap, insert and drop."""
+        # 2-opt: reverse a segment of the visiting order
+        for i in range(len(route) - 1):
+            for j in range(i + 1, len(route)):
+                yield route[:i] + route[i:j + 1][::-1] + route[j + 1:]
+
+        used = {store["retailer_id"] for store in route}
+        for position, current in enumerate(route):
+            # Another store of the same retailer
+            for store in self.candidates.get(current["retailer_id"], []):
+                if store["store_id"] != current["store_id"]:
+                    yield route[:position] + [store] + route[position + 1:]
+            # A store of an unused retailer in its place
+            for retailer_id, stores in self.candidates.items():
+                if retailer_id not in used:
+                    for store in stores:
+                        yield route[:position] + [store] + route[position + 1:]
+
+        if len(route) < self.max_retailers:
+            yield from self.insertions(route)
+
+        if len(route) > 1:
+            for position in range(len(route)):
+                yield route[:position] + route[position + 1:]
+
+    def improve(self, route: List[Store]) -> List[Store]:
+        """First-improvement local search until no move helps or time runs out."""
+        current_cost = self.cost(route)
+        improved = True
+        while improved and not self.out_of_time():
+            improved = False
+            for candidate in self.neighbours(route):
+                if self.out_of_time():
+                    break
+                candidate_cost = self.cost(candidate)
+                if candidate_cost < current_cost:
+                    route, current_cost, improved = candidate, candidate_cost, True
+                    break
+        return route
+
+    def perturb(self, route: List[Store]) -> List[Store]:
+        """Apply random moves to escape the current local optimum."""
+        for _ in range(PERTURBATION_MOVES):
+            moves = list(self.neighbours(route))
+            if not moves:
+                break
+            route = self.random.choice(moves)
+        return route
+
+    def run(self) -> Optional[Dict[str, Any]]:
+        """Search until the deadline or MAX_STALE_ROUNDS rounds without a new incumbent."""
+        route = self.construct()
+        if not route:
+            return self.incumbent
+        route = self.improve(route)
+
+        stale_rounds = 0
+        while not self.out_of_time():
+            if stale_rounds >= MAX_STALE_ROUNDS:
+                self.converged = True
+                break
+            previous_score = self.incumbent["total_score"] if self.incumbent else float("inf")
+            self.improve(self.perturb(self.incumbent["route"]["stores"] if self.incumbent else route))
+            self.rounds += 1
+            if self.incumbent and self.incumbent["total_score"] < previous_score:
+                stale_rounds = 0
+            else:
+                stale_rounds += 1
+        return self.incumbent
+
+    def feasible_routes(self) -> List[Dict[str, Any]]:
+        """Every feasible route scored during the search."""
+        return [scored_route for scored_route in self.scored.values() if scored_route is not None]
+
+def optimality_gap(score: float, lower_bound: float) -> float:
+    """Relative gap between a route score and a lower bound on the optimal score."""
+    if score <= 0:
+        return 0.0
+    return max(0.0, (score - lower_bound) / score)
@@ -0,0 +1,295 @@
+# Click & Collect minimum-spend aware item assignment
+from typing import Any, Dict, List, Optional, Tuple
+
+from api.data_store import get_derived
+
+# Baskets up to this many contested items are solved exactly by branch and bound
+EXACT_MAX_ITEMS = 12
+EXACT_NODE_LIMIT = 5000
+
+# Subgradient iterations for the relaxation heuristic on larger baskets
+RELAXATION_ITERATIONS = 40
+
+# Route orderings over the same retailers pose the same problem, so solved baskets are memoised
+_assignment_cache: Dict[tuple, Tuple[Dict[str, int], float]] = {}
+ASSIGNMENT_CACHE_SIZE = 256
+
+def build_min_spend_index(retailers_data: dict) -> Dict[str, float]:
+    """Build retailer_id -> click & collect minimum spend."""
+    return {
+        retailer["retailer_id"]: float(retailer.get("click_collect", {}).get("min_spend", 0) or 0)
+        for retailer in retailers_data.get("retailers", [])
+    }
+
+def get_min_spend_index() -> Dict[str, float]:
+    """Get the minimum spend per retailer, rebuilt only when retailers.json changes."""
+    return get_derived("click_collect_min_spend", ["retailers.json"], build_min_spend_index)
+
+def line_spend(entry: Dict[str, Any]) -> float:
+    """Price of a dataset entry at its basket quantity, which counts toward min spend."""
+    return entry["price"] * entry["quantity"]
+
+def line_cost(entry: Dict[str, Any]) -> float:
+    """Cost of a dataset entry in the objective: its spend plus any substitution penalty.
+
+    Matches option_cost in the optimization router, so substitutes are weighed the
+    same with and without click & collect.
+    """
+    return line_spend(entry) + entry.get("substitution_penalty", 0.0) * entry["quantity"]
+
+def total_shortfall(subtotals: Dict[str, float], thresholds: Dict[str, float]) -> float:
+    """Amount still needed to reach min spend at every constrained retailer that has items."""
+    return sum(
+        max(0.0, thresholds[retailer_id] - subtotal)
+        for retailer_id, subtotal in subtotals.items()
+        if retailer_id in thresholds and subtotal > 1e-9
+    )
+
+def retailer_subtotals(choices: Dict[str, Dict[str, Any]]) -> Dict[str, float]:
+    """Sum the chosen line spends per retailer."""
+    subtotals: Dict[str, float] = {}
+    for entry in choices.values():
+        subtotals[entry["retailer_id"]] = subtotals.get(entry["retailer_id"], 0.0) + line_spend(entry)
+    return subtotals
+
+def evaluate(choices: Dict[str, Dict[str, Any]], thresholds: Dict[str, float]) -> Tuple[float, float]:
+    """Return (cost including substitution penalties, shortfall) of an assignment."""
+    cost = sum(line_cost(entry) for entry in choices.values())
+    return cost, total_shortfall(retailer_subtotals(choices), thresholds)
+
+def reachable_thresholds(
+    item_options: Dict[str, List[Dict[str, Any]]],
+    min_spend: Dict[str, float]
+) -> Dict[str, float]:
+    """Keep only thresholds some assignment can meet.
+
+    A retailer whose whole offer for this basket is below its minimum can never be
+    eligible (e.g. retailers without click & collect), so it is not constrained.
+    """
+    offer: Dict[str, float] = {}
+    for options in item_options.values():
+        for entry in options:
+            offer[entry["retailer_id"]] = offer.get(entry["retailer_id"], 0.0) + line_spend(entry)
+    return {
+        retailer_id: min_spend[retailer_id]
+        for retailer_id, total in offer.items()
+        if min_spend.get(retailer_id, 0) > 0 and total >= min_spend[retailer_id]
+    }
+
+def improve_by_moves(
+    choices: Dict[str, Dict[str, Any]],
+    item_options: Dict[str, List[Dict[str, Any]]],
+    thresholds: Dict[str, float]
+) -> Dict[str, Dict[str, Any]]:
+    """Local search: move single items, or empty a whole retailer, while the effective cost drops."""
+    choices = dict(choices)
+    subtotals = retailer_subtotals(choices)
+
+    def shortfall_at(retailer_id: str, subtotal: float) -> float:
+        if retailer_id not in thresholds or subtotal <= 1e-9:
+            return 0.0
+        return max(0.0, thresholds[retailer_id] - subtotal)
+
+    improved = True
+    while improved:
+        improved = False
+
+        # Single item moves, costed from the two affected retailers only
+        for canonical_id, options in item_options.items():
+            current = choices[canonical_id]
+            for entry in options:
+                source, target = current["retailer_id"], entry["retailer_id"]
+                if source == target:
+                    continue
+                source_spend, target_spend = line_spend(current), line_spend(entry)
+                source_subtotal = subtotals.get(source, 0.0)
+                target_subtotal = subtotals.get(target, 0.0)
+                delta = (
+                    line_cost(entry) - line_cost(current)
+                    + shortfall_at(source, source_subtotal - source_spend) - shortfall_at(source, source_subtotal)
+                    + shortfall_at(target, target_subtotal + target_spend) - shortfall_at(target, target_subtotal)
+                )
+                if delta < -1e-9:
+                    subtotals[source] = source_subtotal - source_spend
+                    subtotals[target] = target_subtotal + target_spend
+                    choices[canonical_id] = current = entry
+                    improved = True
+
+        # Single moves cannot leave an underfilled retailer, since each one raises its shortfall
+        best_cost = sum(evaluate(choices, thresholds))
+        for retailer_id in {entry["retailer_id"] for entry in choices.values()}:
+            candidate = dict(choices)
+            movable = True
+            for canonical_id, entry in choices.items():
+                if entry["retailer_id"] != retailer_id:
+                    continue
+                others = [option for option in item_options[canonical_id] if option["retailer_id"] != retailer_id]
+                if not others:
+                    movable = False
+                    break
+                candidate[canonical_id] = min(others, key=line_cost)
+            if movable:
+                cost = sum(evaluate(candidate, thresholds))
+                if cost < best_cost - 1e-9:
+                    choices = candidate
+                    subtotals = retailer_subtotals(choices)
+                    best_cost = cost
+                    improved = True
+
+    return choices
+
+def solve_exact(
+    item_options: Dict[str, List[Dict[str, Any]]],
+    thresholds: Dict[str, float],
+    incumbent: Dict[str, Dict[str, Any]]
+) -> Dict[str, Dict[str, Any]]:
+    """Branch and bound over item assignments, starting from a heuristic incumbent.
+
+    Items with the largest gap between their two cheapest options are branched on first.
+    The bound adds the cheapest remaining costs to the shortfall no remaining item can
+    close. If the node limit is hit the incumbent found so far is returned.
+    """
+    ordered = sorted(
+        item_options.items(),
+        key=lambda pair: -(line_cost(pair[1][1]) - line_cost(pair[1][0])) if len(pair[1]) > 1 else 0
+    )
+    num_items = len(ordered)
+
+    # Remaining cheapest cost and remaining possible spend per retailer, from each depth on
+    suffix_min = [0.0] * (num_items + 1)
+    suffix_offer: List[Dict[str, float]] = [{} for _ in range(num_items + 1)]
+    for depth in range(num_items - 1, -1, -1):
+        options = ordered[depth][1]
+        suffix_min[depth] = suffix_min[depth + 1] + line_cost(options[0])
+        offer = dict(suffix_offer[depth + 1])
+        for entry in options:
+            offer[entry["retailer_id"]] = offer.get(entry["retailer_id"], 0.0) + line_spend(entry)
+        suffix_offer[depth] = offer
+
+    best = {"cost": sum(evaluate(incumbent, thresholds)), "choices": dict(incumbent)}
+    subtotals: Dict[str, float] = {}
+    path: List[Dict[str, Any]] = [None] * num_items
+    nodes = 0
+
+    def search(depth: int, price: float) -> bool:
+        nonlocal nodes
+        nodes += 1
+        if nodes > EXACT_NODE_LIMIT:
+            return False
+
+        offer = suffix_offer[depth]
+        unavoidable_shortfall = sum(
+            max(0.0, thresholds[retailer_id] - subtotal - offer.get(retailer_id, 0.0))
+            for retailer_id, subtotal in subtotals.items()
+            if retailer_id in thresholds and subtotal > 1e-9
+        )
+        if price + suffix_min[depth] + unavoidable_shortfall >= best["cost"] - 1e-9:
+            return True
+
+        if depth == num_items:
+            best["cost"] = price + total_shortfall(subtotals, thresholds)
+            best["choices"] = {ordered[i][0]: path[i] for i in range(num_items)}
+            return True
+
+        for entry in ordered[depth][1]:
+            spend = line_spend(entry)
+            retailer_id = entry["retailer_id"]
+            subtotals[retailer_id] = subtotals.get(retailer_id, 0.0) + spend
+            path[depth] = entry
+            finished = search(depth + 1, price + line_cost(entry))
+            subtotals[retailer_id] -= spend
+            if not finished:
+                return False
+        return True
+
+    search(0, 0.0)
+    return best["choices"]
+
+def solve_relaxation(
+    item_options: Dict[str, List[Dict[str, Any]]],
+    thresholds: Dict[str, float],
+    incumbent: Dict[str, Dict[str, Any]]
+) -> Dict[str, Dict[str, Any]]:
+    """Heuristic for large baskets based on the LP relaxation of the min-spend constraints.
+
+    Each constrained retailer gets a multiplier that discounts its spend, which is the
+    Lagrangian (dual) form of the relaxed constraint, so every iteration is one cheap
+    per-item assignment. Multipliers follow the subgradient of the shortfall, every
+    iterate is evaluated at its true cost, and the best one is polished by local moves.
+    """
+    multipliers = {retailer_id: 0.0 for retailer_id in thresholds}
+    best_choices = dict(incumbent)
+    best_cost = sum(evaluate(best_choices, thresholds))
+
+    for iteration in range(RELAXATION_ITERATIONS):
+        choices = {
+            canonical_id: min(
+                options,
+                key=lambda entry: line_cost(entry) - line_spend(entry) * multipliers.get(entry["retailer_id"], 0.0)
+            )
+            for canonical_id, options in item_options.items()
+        }
+        cost = sum(evaluate(choices, thresholds))
+        if cost < best_cost - 1e-9:
+            best_choices, best_cost = choices, cost
+
+        subtotals = retailer_subtotals(choices)
+        step = 1.0 / (iteration + 2)
+        for retailer_id, threshold in thresholds.items():
+            gap = (threshold - subtotals.get(retailer_id, 0.0)) / threshold
+            multipliers[retailer_id] = min(0.9, max(0.0, multipliers[retailer_id] + step * gap))
+
+    return improve_by_moves(best_choices, item_options, thresholds)
+
+def assign_with_min_spend(
+    item_options: Dict[str, List[Dict[str, Any]]],
+    min_spend: Optional[Dict[str, float]] = None
+) -> Tuple[Dict[str, Dict[str, Any]], float]:
+    """Assign each item to one retailer, minimising cost plus min-spend shortfall.
+
+    item_options maps canonical_id to its candidate entries (one per retailer). Any
+    retailer that gets items should reach its click & collect minimum; a missed minimum
+    costs the amount still needed. Returns (chosen entry per item, total shortfall).
+    """
+    if min_spend is None:
+        min_spend = get_min_spend_index()
+
+    item_options = {
+        canonical_id: sorted(options, key=line_cost)
+        for canonical_id, options in item_options.items()
+        if options
+    }
+    cheapest = {canonical_id: options[0] for canonical_id, options in item_options.items()}
+
+    thresholds = reachable_thresholds(item_options, min_spend)
+    if total_shortfall(retailer_subtotals(cheapest), thresholds) == 0:
+        return cheapest, 0.0
+
+    cache_key = (
+        tuple(sorted(thresholds.items())),
+        tuple(
+            (canonical_id, tuple((entry["retailer_id"], line_spend(entry), line_cost(entry)) for entry in options))
+            for canonical_id, options in sorted(item_options.items())
+        )
+    )
+    cached = _assignment_cache.get(cache_key)
+    if cached:
+        picks, shortfall = cached
+        return {canonical_id: item_options[canonical_id][index] for canonical_id, index in picks.items()}, shortfall
+
+    # Items with a single option never branch, so only contested items count toward the size
+    contested = sum(1 for options in item_options.values() if len(options) > 1)
+    choices = improve_by_moves(dict(cheapest), item_options, thresholds)
+    if contested <= EXACT_MAX_ITEMS:
+        choices = solve_exact(item_options, thresholds, choices)
+    else:
+        choices = solve_relaxation(item_options, thresholds, choices)
+
+    shortfall = evaluate(choices, thresholds)[1]
+    if len(_assignment_cache) >= ASSIGNMENT_CACHE_SIZE:
+        _assignment_cache.clear()
+    _assignment_cache[cache_key] = (
+        {canonical_id: item_options[canonical_id].index(entry) for canonical_id, entry in choices.items()},
+        shortfall
+    )
+    return choices, shortfall
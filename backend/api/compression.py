@@ -0,0 +1,158 @@
+# Negotiated gzip/brotli response compression
+from typing import Dict, List, Optional
+import gzip
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Responses smaller than this are sent uncompressed
+COMPRESSION_MIN_BYTES = 1024
+
+# Per-request compression favours speed; bodies compressed once per data version use
+# the highest levels
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4
+PRECOMPRESS_GZIP_LEVEL = 9
+PRECOMPRESS_BROTLI_QUALITY = 11
+
+def available_encodings() -> List[str]:
+    """Content codings this server can produce, most preferred first."""
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+def choose_encoding(headers: Headers) -> Optional[str]:
+    """Pick the best available coding the client's Accept-Encoding allows, if any."""
+    accepted: Dict[str, float] = {}
+    for part in headers.get("accept-encoding", "").split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        params = params.strip().replace(" ", "")
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding] = quality
+
+    best, best_quality = None, 0.0
+    for coding in available_encodings():
+        quality = accepted.get(coding, accepted.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+def compress(body: bytes, encoding: str, precompress: bool = False) -> bytes:
+    """Compress a complete body with the given coding."""
+    if encoding == "br":
+        return brotli.compress(body, quality=PRECOMPRESS_BROTLI_QUALITY if precompress else BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=PRECOMPRESS_GZIP_LEVEL if precompress else GZIP_LEVEL)
+
+def precompress(body: bytes) -> Dict[str, bytes]:
+    """Compress a body once with every available coding, at the highest levels.
+
+    Bodies under the size threshold are left uncompressed.
+    """
+    if len(body) < COMPRESSION_MIN_BYTES:
+        return {}
+    return {encoding: compress(body, encoding, precompress=True) for encoding in available_encodings()}
+
+class StreamCompressor:
+    """Incremental compressor that flushes after every chunk so streamed items are not held back."""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self.compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            self.compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def chunk(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self.compressor.process(data) + self.compressor.flush()
+        return self.compressor.compress(data) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self.compressor.finish()
+        return self.compressor.flush(zlib.Z_FINISH)
+
+class CompressionMiddleware:
+    """Compress responses with brotli (when installed) or gzip, as the client accepts.
+
+    Complete responses under COMPRESSION_MIN_BYTES and responses that already carry a
+    Content-Encoding (such as pre-compressed cached bodies) are sent unchanged.
+    Streamed responses are compressed chunk by chunk.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = COMPRESSION_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        state: Dict[str, object] = {"start": None, "compressor": None, "passthrough": False}
+
+        async def send_compressed(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                if "content-encoding" in headers or message["status"] in (204, 304):
+                    state["passthrough"] = True
+                    await send(message)
+                else:
+                    # Held until the first body chunk shows whether compression pays off
+                    state["start"] = message
+                return
+
+            if message["type"] != "http.response.body" or state["passthrough"]:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            start = state["start"]
+            if start is not None:
+                state["start"] = None
+                headers = MutableHeaders(scope=start)
+                if not more_body and len(body) < self.minimum_size:
+                    state["passthrough"] = True
+                    await send(start)
+                    await send(message)
+                    return
+
+                headers["content-encoding"] = encoding
+                if "accept-encoding" not in headers.get("vary", "").lower():
+                    headers.add_vary_header("Accept-Encoding")
+                if not more_body:
+                    body = compress(body, encoding)
+                    headers["content-length"] = str(len(body))
+                    await send(start)
+                    await send({"type": "http.response.body", "body": body})
+                    return
+
+                if "content-length" in headers:
+                    del headers["content-length"]
+                state["compressor"] = StreamCompressor(encoding)
+                await send(start)
+
+            compressor = state["compressor"]
+            data = compressor.chunk(body)
+            if not more_body:
+                data += compressor.finish()
+            await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
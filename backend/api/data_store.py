@@ -0,0 +1,56 @@
+# Shared data cache for ShopLyft API
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import json
+from pathlib import Path
+
+DATA_DIR = Path(__file__).parent.parent.parent / "data"
+
+# filename -> (version, parsed JSON)
+_json_cache: Dict[str, Tuple[str, dict]] = {}
+
+# key -> (versions of the source files, derived value)
+_derived_cache: Dict[str, Tuple[Tuple[str, ...], Any]] = {}
+
+def data_version(filename: str) -> str:
+    """Get a version string for a data file that changes whenever the file does."""
+    try:
+        stat = (DATA_DIR / filename).stat()
+    except FileNotFoundError:
+        return "missing"
+    return f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+
+def version_mtime(version: str) -> Optional[float]:
+    """Modification time (epoch seconds) recorded in a data_version string."""
+    if version == "missing":
+        return None
+    return int(version.split("-", 1)[0], 16) / 1e9
+
+def load_cached_json(filename: str) -> dict:
+    """Load JSON data from the data directory, re-reading it only when the file changes."""
+    version = data_version(filename)
+    cached = _json_cache.get(filename)
+    if cached and cached[0] == version:
+        return cached[1]
+
+    try:
+        with open(DATA_DIR / filename, 'r') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        data = {}
+
+    _json_cache[filename] = (version, data)
+    return data
+
+def get_derived(key: str, filenames: List[str], builder: Callable[..., Any]) -> Any:
+    """Get a value derived from data files, rebuilding it once per data version.
+
+    The builder receives the parsed JSON of each file in order.
+    """
+    versions = tuple(data_version(filename) for filename in filenames)
+    cached = _derived_cache.get(key)
+    if cached and cached[0] == versions:
+        return cached[1]
+
+    value = builder(*(load_cached_json(filename) for filename in filenames))
+    _derived_cache[key] = (versions, value)
+    return value
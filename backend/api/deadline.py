@@ -0,0 +1,75 @@
+# Request deadlines split into per-stage time budgets
+from typing import Dict, List, Optional
+import math
+import os
+import time
+
+# Header that sets a request's time budget in milliseconds (overrides the body field)
+DEADLINE_HEADER = "X-Deadline-Ms"
+
+# Budget for requests that do not set one; 0 (the default) means no budget
+DEFAULT_DEADLINE_MS = int(os.getenv("SHOPLYFT_DEADLINE_MS", "0"))
+
+# Requested budgets are clamped to this range
+MIN_DEADLINE_MS = 1000
+MAX_DEADLINE_MS = 300000
+
+# Relative share of the budget each optimization stage may use, in stage order. A
+# stage's share is taken from the time still left, so time a stage does not use
+# carries over to the stages after it.
+STAGE_WEIGHTS: Dict[str, float] = {
+    "parse": 0.4,
+    "routes": 0.2,
+    "links": 0.4,
+}
+
+class Deadline:
+    """Absolute deadline for one request, and the stages that fell back because of it."""
+
+    def __init__(self, budget_ms: int):
+        self.budget_ms = budget_ms
+        self.expires_at = time.monotonic() + budget_ms / 1000
+        self.degraded: List[str] = []
+
+    def degrade(self, stage: str) -> None:
+        """Record that a stage ran out of budget and used its fallback."""
+        if stage not in self.degraded:
+            self.degraded.append(stage)
+
+    def remaining(self) -> float:
+        """Seconds left, never negative."""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def stage_budget(self, stage: str) -> float:
+        """Seconds the stage may use: its weight's share of the time left for it and the stages after it."""
+        stages = list(STAGE_WEIGHTS)
+        later = sum(STAGE_WEIGHTS[name] for name in stages[stages.index(stage):])
+        return self.remaining() * STAGE_WEIGHTS[stage] / later
+
+    def stage_expires_at(self, stage: str) -> float:
+        """Monotonic time at which the stage's budget runs out."""
+        return time.monotonic() + self.stage_budget(stage)
+
+def resolve_deadline(header_value: Optional[str], field_value: Optional[int]) -> Optional[int]:
+    """Effective budget in milliseconds: the header, then the request field, then the default.
+
+    Returns None when no budget applies.
+    """
+    budget_ms = field_value
+    if header_value:
+        try:
+            header_ms = float(header_value)
+        except ValueError:
+            header_ms = math.nan
+        # "inf" and "nan" parse as floats but are not budgets
+        if not math.isfinite(header_ms):
+            raise ValueError(f"Invalid {DEADLINE_HEADER} header '{header_value}', expected milliseconds")
+        budget_ms = int(header_ms)
+    if budget_ms is None:
+        budget_ms = DEFAULT_DEADLINE_MS
+    if budget_ms <= 0:
+        return None
+    return min(max(budget_ms, MIN_DEADLINE_MS), MAX_DEADLINE_MS)
@@ -0,0 +1,126 @@
+# Hedged execution: race alternative strategies, launching the slower ones only when needed
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import asyncio
+import threading
+import time
+
+# Wait before launching the next strategy when nothing is known about the leader
+DEFAULT_HEDGE_DELAY_SECONDS = 2.0
+
+# Learned hedge delays are kept within these bounds
+MIN_HEDGE_DELAY_SECONDS = 0.5
+MAX_HEDGE_DELAY_SECONDS = 8.0
+
+# The hedge fires once the leader has run this many times its typical winning latency
+HEDGE_LATENCY_FACTOR = 1.5
+
+# Weight of the newest sample in the latency moving average
+LATENCY_SMOOTHING = 0.2
+
+Strategy = Tuple[str, Callable[[], Awaitable[Any]]]
+
+class StrategyStats:
+    """Win rates and winning latencies of named strategies, used to order and pace the race.
+
+    Strategies cancelled because another one won are not counted against their win rate.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stats: Dict[str, Dict[str, float]] = {}
+
+    def entry(self, name: str) -> Dict[str, float]:
+        return self.stats.setdefault(name, {"launched": 0, "wins": 0, "failures": 0, "cancelled": 0, "win_latency": 0.0})
+
+    def record(self, name: str, outcome: str, latency: float = 0.0) -> None:
+        with self.lock:
+            entry = self.entry(name)
+            entry[outcome] += 1
+            if outcome == "wins":
+                previous = entry["win_latency"]
+                entry["win_latency"] = latency if entry["wins"] == 1 else previous + LATENCY_SMOOTHING * (latency - previous)
+
+    def win_rate(self, name: str) -> float:
+        """Smoothed win rate; 0.5 for a strategy that has never finished."""
+        entry = self.stats.get(name)
+        if entry is None:
+            return 0.5
+        return (entry["wins"] + 1) / (entry["wins"] + entry["failures"] + 2)
+
+    def order(self, names: List[str]) -> List[str]:
+        """Strategies by win rate, then by winning latency; ties keep the given order."""
+        def key(name: str):
+            entry = self.stats.get(name)
+            latency = entry["win_latency"] if entry and entry["wins"] else float("inf")
+            return (-round(self.win_rate(name), 2), latency)
+        return sorted(names, key=key)
+
+    def hedge_delay(self, name: str) -> float:
+        """How long to give a strategy before starting the next one alongside it."""
+        entry = self.stats.get(name)
+        if entry is None or not entry["wins"]:
+            return DEFAULT_HEDGE_DELAY_SECONDS
+        delay = entry["win_latency"] * HEDGE_LATENCY_FACTOR
+        return min(max(delay, MIN_HEDGE_DELAY_SECONDS), MAX_HEDGE_DELAY_SECONDS)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self.lock:
+            return {
+                name: {**entry, "win_rate": round(self.win_rate(name), 3), "win_latency": round(entry["win_latency"], 3)}
+                for name, entry in self.stats.items()
+            }
+
+async def hedged_race(
+    strategies: List[Strategy],
+    is_winner: Callable[[Any], bool],
+    stats: StrategyStats
+) -> Optional[Any]:
+    """Run strategies as a hedged race and return the first winning result.
+
+    Strategies are launched in the order the stats favour. Each one gets its hedge delay
+    before the next is started alongside it, and the next starts at once if every
+    running strategy has finished without a win. The first winning result cancels the
+    rest. If nobody wins, the first non-empty result (from the most favoured
+    strategy) is returned instead, or None.
+    """
+    by_name = dict(strategies)
+    pending = list(stats.order([name for name, _ in strategies]))
+    running: Dict[asyncio.Task, Tuple[str, float]] = {}
+    fallbacks: Dict[str, Any] = {}
+    launch_order: List[str] = []
+
+    def launch() -> None:
+        name = pending.pop(0)
+        launch_order.append(name)
+        stats.record(name, "launched")
+        running[asyncio.ensure_future(by_name[name]())] = (name, time.monotonic())
+
+    try:
+        launch()
+        while running:
+            timeout = stats.hedge_delay(launch_order[-1]) if pending else None
+            done, _ = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                launch()
+                continue
+
+            for task in done:
+                name, started = running.pop(task)
+                result = None if task.cancelled() or task.exception() else task.result()
+                if result is not None and is_winner(result):
+                    stats.record(name, "wins", time.monotonic() - started)
+                    return result
+                stats.record(name, "failures")
+                if result is not None:
+                    fallbacks[name] = result
+            if not running and pending:
+                launch()
+
+        for name in launch_order:
+            if name in fallbacks:
+                return fallbacks[name]
+        return None
+    finally:
+        for task, (name, _) in running.items():
+            task.cancel()
+            stats.record(name, "cancelled")
@@ -0,0 +1,179 @@
+# HTTP validators and an in-process response cache for data-backed read endpoints
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Dict, List, Optional, Tuple
+import hashlib
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from api.compression import choose_encoding, precompress
+from api.data_store import data_version, version_mtime
+
+# Clients may keep responses but must revalidate them with the ETag
+CACHE_CONTROL = "no-cache"
+
+DEFAULT_MAX_ENTRIES = 256
+
+# Larger bodies are served normally rather than held in memory
+MAX_CACHED_BODY_BYTES = 4 * 1024 * 1024
+
+def make_etag(versions: Tuple[str, ...]) -> str:
+    """Weak ETag for a set of data file versions (weak, since compressed and identity bodies share it)."""
+    digest = hashlib.blake2b("|".join(versions).encode(), digest_size=10).hexdigest()
+    return f'W/"{digest}"'
+
+def last_modified_time(versions: Tuple[str, ...]) -> Optional[float]:
+    """Newest modification time among the data files, if any exist."""
+    times = [mtime for mtime in (version_mtime(version) for version in versions) if mtime is not None]
+    return max(times) if times else None
+
+def is_not_modified(headers: Headers, etag: str, last_modified: Optional[float]) -> bool:
+    """Evaluate If-None-Match, or If-Modified-Since when no ETag was sent."""
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        # Weak comparison: W/ prefixes are ignored
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return etag.removeprefix("W/") in tags
+
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since is None or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since).timestamp()
+    except (TypeError, ValueError):
+        return False
+    # HTTP dates have one second resolution
+    return int(last_modified) <= since
+
+class CachedResponse:
+    """A 200 response held as its serialized body plus compressed copies made once."""
+    __slots__ = ("content_type", "body", "encoded")
+
+    def __init__(self, content_type: str, body: bytes):
+        self.content_type = content_type
+        self.body = body
+        self.encoded = precompress(body)
+
+class DataVersionCacheMiddleware:
+    """ETag/Last-Modified validation and optional response caching for read endpoints.
+
+    Each path prefix is mapped to the data files its endpoints read. The validators are
+    derived from those files' versions, and cached bodies are keyed by version and
+    never need invalidating. A conditional GET matching the validators is answered
+    with 304 straight from a cached 200, and otherwise only once the endpoint has
+    returned 200, so errors such as a 404 for a missing resource are still sent.
+    Cached bodies are pre-compressed with every available coding, so hits do no
+    encoding or compression work. Streamed responses (no Content-Length) get
+    validators but are not cached.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        routes: Dict[str, List[str]],
+        response_cache: bool = True,
+        max_entries: int = DEFAULT_MAX_ENTRIES
+    ):
+        self.app = app
+        # Longest prefix first so nested prefixes win
+        self.routes = sorted(routes.items(), key=lambda route: len(route[0]), reverse=True)
+        self.response_cache = response_cache
+        self.max_entries = max_entries
+        self.cache: "OrderedDict[Tuple[str, bytes, Tuple[str, ...]], CachedResponse]" = OrderedDict()
+
+    def data_files(self, path: str) -> Optional[List[str]]:
+        for prefix, filenames in self.routes:
+            if path == prefix or path.startswith(prefix + "/"):
+                return filenames
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+        filenames = self.data_files(scope["path"])
+        if filenames is None:
+            await self.app(scope, receive, send)
+            return
+
+        versions = tuple(data_version(filename) for filename in filenames)
+        etag = make_etag(versions)
+        last_modified = last_modified_time(versions)
+        validators = {"etag": etag, "cache-control": CACHE_CONTROL}
+        if last_modified is not None:
+            validators["last-modified"] = formatdate(last_modified, usegmt=True)
+
+        request_headers = Headers(scope=scope)
+        not_modified = is_not_modified(request_headers, etag, last_modified)
+
+        key = (scope["path"], scope["query_string"], versions)
+        cached = self.cache.get(key) if self.response_cache else None
+        if cached is not None:
+            self.cache.move_to_end(key)
+            if not_modified:
+                await send_response(send, 304, validators, b"")
+                return
+            headers = {**validators, "content-type": cached.content_type, "vary": "Accept-Encoding"}
+            encoding = choose_encoding(request_headers)
+            if encoding in cached.encoded:
+                headers["content-encoding"] = encoding
+                await send_response(send, 200, headers, cached.encoded[encoding])
+            else:
+                await send_response(send, 200, headers, cached.body)
+            return
+
+        state = {"collect": False, "content_type": "", "chunks": [], "not_modified": False}
+
+        async def send_with_validators(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                if message["status"] == 200:
+                    # The body is still read (and cached) but replaced with a 304
+                    state["not_modified"] = not_modified
+                    headers = MutableHeaders(scope=message)
+                    for name, value in validators.items():
+                        headers[name] = value
+                    length = headers.get("content-length")
+                    state["collect"] = (
+                        self.response_cache
+                        and length is not None
+                        and int(length) <= MAX_CACHED_BODY_BYTES
+                        and "content-encoding" not in headers
+                    )
+                    state["content_type"] = headers.get("content-type", "application/json")
+                    if state["collect"]:
+                        headers["vary"] = "Accept-Encoding"
+                if state["not_modified"]:
+                    return
+            elif message["type"] == "http.response.body":
+                if state["collect"]:
+                    state["chunks"].append(message.get("body", b""))
+                if state["not_modified"]:
+                    if not message.get("more_body", False):
+                        await send_response(send, 304, validators, b"")
+                    return
+            await send(message)
+
+        await self.app(scope, receive, send_with_validators)
+
+        # Compressed once per data version, after the client already has its response
+        if state["collect"] and state["chunks"]:
+            body = b"".join(state["chunks"])
+            self.store(key, await run_in_threadpool(CachedResponse, state["content_type"], body))
+
+    def store(self, key: Tuple[str, bytes, Tuple[str, ...]], response: CachedResponse) -> None:
+        self.cache[key] = response
+        self.cache.move_to_end(key)
+        while len(self.cache) > self.max_entries:
+            self.cache.popitem(last=False)
+
+async def send_response(send: Send, status: int, headers: Dict[str, str], body: bytes) -> None:
+    """Send a complete response with the given headers."""
+    raw_headers = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in headers.items()]
+    if status != 304:
+        raw_headers.append((b"content-length", str(len(body)).encode()))
+    await send({"type": "http.response.start", "status": status, "headers": raw_headers})
+    await send({"type": "http.response.body", "body": body})
@@ -18,6 +18,21 @@ class UnitMeasure(str, Enum):
     PIECE = "piece"
     PACK = "pack"
 
+class SearchMode(str, Enum):
+    RETAILER = "retailer"
+    STORE = "store"
+    ANYTIME = "anytime"
+
+class TravelMode(str, Enum):
+    WALKING = "walking"
+    DRIVING = "driving"
+    TRANSIT = "transit"
+
+class BasketAction(str, Enum):
+    ADD = "add"
+    REMOVE = "remove"
+    UPDATE = "update"
+
 # Product Models
 class ProductAliases(BaseModel):
     aliases: List[str] = Field(..., description="List of alternative names for the product")
@@ -37,10 +52,21 @@ class ProductResponse(BaseModel):
 class ProductSearchRequest(BaseModel):
     query: str = Field(..., description="Search query for products")
     category: Optional[str] = Field(None, description="Filter by category")
+    limit: int = Field(20, ge=1, le=200, description="Maximum number of results to return")
+    offset: int = Field(0, ge=0, description="Number of ranked results to skip")
+    fuzzy: bool = Field(True, description="Match query terms with small typos")
 
 class ProductSearchResponse(BaseModel):
     products: List[Product]
-    total_count: int
+    total_count: int = Field(..., description="Number of matching products across all pages")
+
+class ProductSuggestion(BaseModel):
+    canonical_id: str = Field(..., description="Unique identifier for the product")
+    canonical_name: str = Field(..., description="Official name of the product")
+    category: str = Field(..., description="Product category")
+
+class ProductAutocompleteResponse(BaseModel):
+    suggestions: List[ProductSuggestion]
 
 # Store Models
 class Location(BaseModel):
@@ -84,6 +110,25 @@ class PriceSnapshot(BaseModel):
 class PriceResponse(BaseModel):
     prices: List[PriceSnapshot]
 
+class PriceHistoryPoint(PriceSnapshot):
+    recorded_at: datetime = Field(..., description="When this price was recorded")
+
+class PriceHistoryResponse(BaseModel):
+    retailer_product_id: str = Field(..., description="Retailer-specific product ID")
+    points: List[PriceHistoryPoint] = Field(..., description="Recorded prices, oldest first")
+
+class PriceIngestError(BaseModel):
+    line: int = Field(..., description="Line number in the feed")
+    error: str = Field(..., description="Why the row was rejected")
+
+class PriceIngestResponse(BaseModel):
+    accepted: int = Field(..., description="Rows written to the price history")
+    rejected: int = Field(..., description="Rows that failed validation")
+    batches: int = Field(..., description="Batches committed")
+    seeded: int = Field(default=0, description="price_snapshots.json prices recorded first because there was no price history yet")
+    recorded_at: datetime = Field(..., description="Recording time of the ingested prices")
+    errors: List[PriceIngestError] = Field(default_factory=list, description="First rejected rows")
+
 class PriceComparisonRequest(BaseModel):
     canonical_ids: List[str] = Field(..., description="List of product canonical IDs to compare")
     retailer_ids: Optional[List[str]] = Field(None, description="Filter by specific retailers")
@@ -150,6 +195,7 @@ class RouteItem(BaseModel):
     quantity: int
     unit_price: float
     line_total: float
+    substitute_for: Optional[str] = Field(None, description="Requested product this item substitutes, if the retailer does not sell it")
 
 class StoreBasket(BaseModel):
     store_info: RouteStore
@@ -175,6 +221,25 @@ class OptimizationDetails(BaseModel):
     time_component: float = Field(..., description="Time optimization component")
     total_items: int = Field(..., description="Total number of items")
     stores_count: int = Field(..., description="Number of stores in route")
+    optimality_gap: Optional[float] = Field(None, description="Relative gap between the route score and a lower bound (anytime search only)")
+
+class PlanAlternative(BaseModel):
+    retailers: List[str] = Field(..., description="Retailers visited in this plan")
+    total_cost: float = Field(..., description="Total cost of the plan")
+    total_time: float = Field(..., description="Total time in minutes")
+    travel_time: float = Field(..., description="Travel time in minutes")
+    shopping_time: float = Field(..., description="Shopping time in minutes")
+    route_score: float = Field(..., description="Optimization score")
+    num_stores: int = Field(..., description="Number of stores to visit")
+    stores: List[StoreBasket] = Field(..., description="Items organized by store")
+    route_segments: List[RouteSegment] = Field(..., description="Route segments between stores")
+    pareto_optimal: bool = Field(..., description="Whether no other plan is both cheaper and faster")
+
+class ParetoPoint(BaseModel):
+    retailers: List[str] = Field(..., description="Retailers visited in this plan")
+    total_cost: float = Field(..., description="Total cost of the plan")
+    total_time: float = Field(..., description="Total time in minutes")
+    route_score: float = Field(..., description="Optimization score")
 
 class ShoppingPlan(BaseModel):
     plan_id: Optional[str] = Field(None, description="Unique plan identifier")
@@ -191,6 +256,8 @@ class ShoppingPlan(BaseModel):
     num_stores: int = Field(..., description="Number of stores to visit")
     store_baskets: List[StoreBasket] = Field(..., description="Items organized by store (backend alias)")
     generated_at: Optional[datetime] = Field(None, description="Plan generation timestamp")
+    alternatives: List[PlanAlternative] = Field(default_factory=list, description="Next best distinct plans, ranked by score")
+    pareto_frontier: List[ParetoPoint] = Field(default_factory=list, description="Price/time trade-off frontier, cheapest first")
     
     class Config:
         # Ensure all fields are included in serialization, even if they have default values
@@ -204,11 +271,91 @@ class OptimizationRequest(BaseModel):
     max_stores: int = Field(default=3, description="Maximum number of stores to visit")
     time_weight: float = Field(default=0.2, description="Weight for time optimization")
     price_weight: float = Field(default=0.8, description="Weight for price optimization")
+    search_mode: SearchMode = Field(default=SearchMode.RETAILER, description="Route search mode: closest store per retailer, joint store selection, or anytime local search")
+    stores_per_retailer: int = Field(default=5, ge=1, le=10, description="Nearest stores per retailer considered in store and anytime search modes")
+    num_alternatives: int = Field(default=3, ge=0, le=10, description="Number of alternative plans to return")
+    departure_time: Optional[datetime] = Field(None, description="Departure time; stores closed on arrival are excluded")
+    travel_mode: TravelMode = Field(default=TravelMode.DRIVING, description="Travel profile used for route times")
+    click_collect: bool = Field(default=False, description="Assign items so each retailer used meets its click & collect minimum spend")
+    substitutes: bool = Field(default=False, description="Let retailers that do not sell an item offer a penalized substitute from the same category")
+    pack_sizes: bool = Field(default=False, description="Buy each item's requested amount (e.g. \"4L milk\") as the cheapest mix of pack sizes")
+    deadline_ms: Optional[int] = Field(None, ge=0, description="Time budget in milliseconds (the X-Deadline-Ms header overrides it; 0 disables)")
 
 class OptimizationResponse(BaseModel):
     plan: ShoppingPlan
     success: bool = Field(..., description="Whether optimization was successful")
     message: Optional[str] = Field(None, description="Additional information")
+    degraded_stages: List[str] = Field(default_factory=list, description="Stages that ran out of time budget and used a fallback")
+
+# Multi-shopper Models
+class SplitOptimizationRequest(BaseModel):
+    grocery_list: str = Field(..., description="Natural language grocery list")
+    shopper_locations: List[str] = Field(..., min_length=1, max_length=4, description="Starting location of each shopper")
+    max_stores: int = Field(default=3, description="Maximum number of stores visited by all shoppers together")
+    time_weight: float = Field(default=0.2, description="Weight for time optimization (applied to the longest shopper's trip)")
+    price_weight: float = Field(default=0.8, description="Weight for price optimization")
+    travel_mode: TravelMode = Field(default=TravelMode.DRIVING, description="Travel profile used for route times")
+    click_collect: bool = Field(default=False, description="Assign items so each retailer used meets its click & collect minimum spend")
+    substitutes: bool = Field(default=False, description="Let retailers that do not sell an item offer a penalized substitute from the same category")
+    pack_sizes: bool = Field(default=False, description="Buy each item's requested amount (e.g. \"4L milk\") as the cheapest mix of pack sizes")
+
+class ShopperRoute(BaseModel):
+    shopper: int = Field(..., description="Shopper index, in request order")
+    starting_location: StartingLocation = Field(..., description="Where this shopper starts and ends")
+    stores: List[StoreBasket] = Field(..., description="This shopper's store baskets, in visiting order")
+    route_segments: List[RouteSegment] = Field(..., description="Route segments between this shopper's stores")
+    subtotal: float = Field(..., description="Cost of this shopper's baskets")
+    total_time: float = Field(..., description="Trip time in minutes, travel and shopping")
+    travel_time: float = Field(..., description="Travel time in minutes")
+    shopping_time: float = Field(..., description="Shopping time in minutes")
+
+class SplitShoppingPlan(BaseModel):
+    shoppers: List[ShopperRoute] = Field(..., description="Route of each shopper, in request order")
+    total_cost: float = Field(..., description="Total cost across all shoppers")
+    makespan: float = Field(..., description="Longest shopper trip in minutes")
+    total_savings: float = Field(..., description="Total savings compared to single store")
+    route_score: float = Field(..., description="Optimization score")
+    solver: str = Field(..., description="Split solver used: exact or savings")
+    generated_at: Optional[datetime] = Field(None, description="Plan generation timestamp")
+
+class SplitOptimizationResponse(BaseModel):
+    plan: Optional[SplitShoppingPlan] = Field(None, description="Split plan, if one was found")
+    success: bool = Field(..., description="Whether optimization was successful")
+    message: Optional[str] = Field(None, description="Additional information")
+
+# Optimization Session Models
+class BasketItemChange(BaseModel):
+    action: BasketAction = Field(..., description="Add, remove, or change the quantity of an item")
+    canonical_id: Optional[str] = Field(None, description="Canonical product ID of the item")
+    item_text: Optional[str] = Field(None, description="Natural language item to add when no canonical ID is given")
+    quantity: int = Field(default=1, description="Quantity to add, or quantity delta for updates")
+
+class BasketUpdateRequest(BaseModel):
+    changes: List[BasketItemChange] = Field(..., description="Basket changes to apply in order")
+
+class OptimizationSessionResponse(BaseModel):
+    session_id: str = Field(..., description="Optimization session identifier")
+    expires_at: datetime = Field(..., description="Session expiry time")
+    items: List[ParsedProduct] = Field(..., description="Current basket items")
+    unmatched_items: List[str] = Field(default_factory=list, description="Items that could not be matched")
+    plan: ShoppingPlan
+    success: bool = Field(..., description="Whether optimization was successful")
+    message: Optional[str] = Field(None, description="Additional information")
+
+class WeightedRoute(BaseModel):
+    retailers: List[str] = Field(..., description="Retailers visited, in order")
+    store_ids: List[str] = Field(..., description="Stores visited, in order")
+    total_cost: float = Field(..., description="Total cost of the plan")
+    total_time: float = Field(..., description="Total time in minutes")
+    route_score: Optional[float] = Field(None, description="Score for the requested weights")
+    time_weight_range: Optional[List[float]] = Field(None, description="Normalized time weights [from, to] for which this hull route is best")
+
+class WeightSweepResponse(BaseModel):
+    session_id: str = Field(..., description="Optimization session identifier")
+    time_weight: Optional[float] = Field(None, description="Requested time weight")
+    price_weight: Optional[float] = Field(None, description="Requested price weight")
+    ranked: List[WeightedRoute] = Field(default_factory=list, description="Best distinct plans for the requested weights")
+    hull: List[WeightedRoute] = Field(default_factory=list, description="Plans on the lower convex hull of (cost, time), cheapest first")
 
 # Plan Management Models
 class PlanEntry(BaseModel):
@@ -0,0 +1,78 @@
+# Store opening hours index for time-aware routing
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from api.data_store import get_derived
+
+# Opening hours in stores.json are local store times
+STORE_TIMEZONE = ZoneInfo("Australia/Sydney")
+
+DAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+MINUTES_PER_DAY = 24 * 60
+
+def parse_clock_time(value: str) -> int:
+    """Convert an "HH:MM" string to minutes after midnight."""
+    hours, minutes = value.split(":")
+    return int(hours) * 60 + int(minutes)
+
+def build_open_interval_index(stores_data: dict) -> Dict[str, List[Optional[Tuple[int, int]]]]:
+    """Build store_id -> per-weekday (open, close) minutes, None when closed all day.
+
+    A close time at or before the open time runs past midnight, so it is stored as
+    minutes after the opening day's midnight (greater than 1440).
+    """
+    index = {}
+    for store in stores_data.get("stores", []):
+        intervals = [None] * len(DAYS)
+        for hours in store.get("opening_hours", []):
+            day = hours.get("day", "")[:3].title()
+            if day not in DAYS:
+                continue
+            open_minute = parse_clock_time(hours["open"])
+            close_minute = parse_clock_time(hours["close"])
+            if close_minute <= open_minute:
+                close_minute += MINUTES_PER_DAY
+            intervals[DAYS.index(day)] = (open_minute, close_minute)
+        index[store["store_id"]] = intervals
+    return index
+
+def get_open_interval_index() -> Dict[str, List[Optional[Tuple[int, int]]]]:
+    """Get the open-interval index, rebuilt only when stores.json changes."""
+    return get_derived("store_open_intervals", ["stores.json"], build_open_interval_index)
+
+def to_store_time(moment: datetime) -> datetime:
+    """Convert a datetime to store-local time; naive datetimes are assumed local already."""
+    if moment.tzinfo is None:
+        return moment
+    return moment.astimezone(STORE_TIMEZONE)
+
+def make_open_check(departure_time: datetime) -> Callable[[Dict[str, Any], float], bool]:
+    """Create a check for whether a store is open a number of minutes after departure.
+
+    Each check is two index lookups (the arrival day and the previous day's overnight
+    hours), so it costs O(1) per candidate store.
+    """
+    index = get_open_interval_index()
+    local_departure = to_store_time(departure_time)
+    departure_day = local_departure.weekday()
+    departure_minute = local_departure.hour * 60 + local_departure.minute + local_departure.second / 60.0
+
+    def is_open(store: Dict[str, Any], minutes_after_departure: float) -> bool:
+        intervals = index.get(store["store_id"])
+        if intervals is None:
+            # Unknown hours: do not exclude the store
+            return True
+
+        arrival = departure_minute + minutes_after_departure
+        day = (departure_day + int(arrival // MINUTES_PER_DAY)) % 7
+        minute = arrival % MINUTES_PER_DAY
+
+        today = intervals[day]
+        if today and today[0] <= minute < today[1]:
+            return True
+
+        yesterday = intervals[(day - 1) % 7]
+        return bool(yesterday and minute + MINUTES_PER_DAY < yesterday[1])
+
+    return is_open
@@ -0,0 +1,180 @@
+# Pack-size optimization: buy a requested amount with the cheapest mix of pack sizes
+"""
+Products that differ only in pack size (milk-fullcream-1l/2l/3l, eggs-12pk/18pk)
+form a family. Each retailer's packs of a family, sorted by unit price, are
+indexed once per version of the price slice, catalog and products. A requested
+amount ("4L milk") is then a small knapsack per retailer: the cheapest pack counts
+whose total size reaches at least the amount. Solutions are memoized by the pack
+prices and amount, so the solve runs once per item and retailer and route scoring
+only compares the per-retailer totals.
+"""
+from functools import lru_cache
+from math import gcd
+from typing import Any, Dict, List, Optional, Tuple
+import re
+
+from api.data_store import data_version, load_cached_json
+from api.price_history import latest_prices_version, load_latest_prices
+
+# Pack size suffix of a canonical ID ("milk-fullcream-2l" -> "milk-fullcream")
+SIZE_SUFFIX = re.compile(r"-(\d+(\.\d+)?(ml|l|g|kg|pk))$")
+
+# Requested amounts in free text, e.g. "4L", "1.5 kg", "500g", "24 pack"
+AMOUNT_PATTERN = re.compile(
+    r"(\d+(?:\.\d+)?)\s*(ml|millilitres?|l|litres?|liters?|kg|kilos?|g|grams?|pk|packs?|pieces?)\b",
+    re.IGNORECASE
+)
+
+# Conversion of each amount unit into a product measure
+AMOUNT_UNITS = {
+    "ml": ("L", 0.001), "millilitre": ("L", 0.001), "millilitres": ("L", 0.001),
+    "l": ("L", 1.0), "litre": ("L", 1.0), "litres": ("L", 1.0), "liter": ("L", 1.0), "liters": ("L", 1.0),
+    "g": ("kg", 0.001), "gram": ("kg", 0.001), "grams": ("kg", 0.001),
+    "kg": ("kg", 1.0), "kilo": ("kg", 1.0), "kilos": ("kg", 1.0),
+    "pk": ("piece", 1.0), "pack": ("piece", 1.0), "packs": ("piece", 1.0),
+    "piece": ("piece", 1.0), "pieces": ("piece", 1.0),
+}
+
+# Sizes are solved on an integer grid of this many units per measure (millilitres, grams)
+GRID_UNITS = {"L": 1000, "kg": 1000, "piece": 1}
+
+# Largest amount solved, in grid cells; larger requests are solved on a coarser grid
+MAX_GRID_CELLS = 20000
+
+# (price slice version, catalog version, products version) -> index
+_index_cache: Dict[str, Any] = {}
+
+def family_of(product: Dict[str, Any]) -> str:
+    """Family key of a product: its category, ID without the size suffix, and measure."""
+    stem = SIZE_SUFFIX.sub("", product["canonical_id"])
+    return f"{product.get('category', '')}:{stem}:{product.get('unit_measure', '')}"
+
+def build_pack_index(products_data: dict, catalog_data: dict, prices: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Index every retailer's priced packs by family.
+
+    products maps each canonical ID to its products.json entry. families maps each
+    family to its category, measure and, per retailer, the packs sorted by unit price.
+    """
+    products = {product["canonical_id"]: product for product in products_data.get("products", [])}
+    price_lookup = {price["retailer_product_id"]: price["price"] for price in prices}
+
+    families: Dict[str, Dict[str, Any]] = {}
+    product_families: Dict[str, str] = {}
+    for canonical_id, product in products.items():
+        family = family_of(product)
+        product_families[canonical_id] = family
+        families.setdefault(family, {
+            "category": product.get("category", ""),
+            "unit_measure": product.get("unit_measure", ""),
+            "retailers": {}
+        })
+
+    for catalog_item in catalog_data.get("retailer_products", []):
+        product = products.get(catalog_item["canonical_id"])
+        price = price_lookup.get(catalog_item["retailer_product_id"])
+        if product is None or price is None or not product.get("unit_size"):
+            continue
+        family = families[product_families[product["canonical_id"]]]
+        family["retailers"].setdefault(catalog_item["retailer_id"], []).append({
+            "canonical_id": product["canonical_id"],
+            "retailer_product_id": catalog_item["retailer_product_id"],
+            "product_name": catalog_item["name"],
+            "unit_size": product["unit_size"],
+            "price": price,
+            "unit_price": price / product["unit_size"]
+        })
+
+    for family in families.values():
+        for retailer_packs in family["retailers"].values():
+            retailer_packs.sort(key=lambda pack: pack["unit_price"])
+
+    return {"products": products, "families": families, "product_families": product_families}
+
+def get_pack_index() -> Dict[str, Any]:
+    """Get the pack index, rebuilt once per version of the price slice, catalog and products."""
+    key = (latest_prices_version(), data_version("retailer_catalog.json"), data_version("products.json"))
+    if _index_cache.get("key") != key:
+        index = build_pack_index(
+            load_cached_json("products.json"),
+            load_cached_json("retailer_catalog.json"),
+            load_latest_prices().get("prices", [])
+        )
+        _index_cache.update(key=key, value=index)
+    return _index_cache["value"]
+
+def parse_requested_amount(text: str, unit_measure: str) -> Optional[float]:
+    """Amount asked for in the item text ("4L milk" -> 4.0), in the product's measure.
+
+    Returns None when the text states no amount in a compatible unit.
+    """
+    for match in AMOUNT_PATTERN.finditer(text):
+        measure, factor = AMOUNT_UNITS[match.group(2).lower()]
+        if measure == unit_measure:
+            return float(match.group(1)) * factor
+    return None
+
+@lru_cache(maxsize=4096)
+def solve_packs(sizes: Tuple[int, ...], prices: Tuple[float, ...], target: int) -> Optional[Tuple[float, Tuple[int, ...]]]:
+    """Cheapest pack counts whose sizes sum to at least target, as (cost, counts).
+
+    Sizes are integer grid units; solved on a grid of their greatest common divisor,
+    so the table stays small. Targets over MAX_GRID_CELLS cells use a coarser grid
+    with pack sizes rounded down, so the packs chosen still reach the target (at a
+    possibly higher cost); packs smaller than a coarse cell are left out, and if all
+    are, the pack with the best unit price is bought alone.
+    """
+    if target <= 0:
+        return 0.0, tuple(0 for _ in sizes)
+    step = 0
+    for size in sizes:
+        step = gcd(step, size)
+    goal = -(-target // step)
+    if goal > MAX_GRID_CELLS:
+        step *= -(-goal // MAX_GRID_CELLS)
+        goal = -(-target // step)
+    cells = [size // step for size in sizes]
+    if not any(cells):
+        best = min(range(len(sizes)), key=lambda pack: prices[pack] / sizes[pack])
+        count = -(-target // sizes[best])
+        return round(prices[best] * count, 2), tuple(count if pack == best else 0 for pack in range(len(sizes)))
+
+    # cost[a]: cheapest way to reach at least a cells; last[a]: pack added last
+    cost = [0.0] + [float("inf")] * goal
+    last = [-1] * (goal + 1)
+    for amount in range(1, goal + 1):
+        for pack, pack_cells in enumerate(cells):
+            if not pack_cells:
+                continue
+            candidate = cost[max(0, amount - pack_cells)] + prices[pack]
+            if candidate < cost[amount]:
+                cost[amount], last[amount] = candidate, pack
+
+    if last[goal] < 0:
+        return None
+    counts = [0] * len(sizes)
+    amount = goal
+    while amount > 0:
+        pack = last[amount]
+        counts[pack] += 1
+        amount = max(0, amount - cells[pack])
+    return round(cost[goal], 2), tuple(counts)
+
+def cheapest_packs(packs: List[Dict[str, Any]], amount: float, unit_measure: str) -> Optional[Dict[str, Any]]:
+    """Cheapest combination of a retailer's packs reaching at least amount.
+
+    Returns {"price", "amount", "packs": [{...pack, "count"}]}, or None without packs.
+    """
+    if not packs:
+        return None
+    grid = GRID_UNITS.get(unit_measure, 1)
+    sizes = tuple(max(1, round(pack["unit_size"] * grid)) for pack in packs)
+    solution = solve_packs(sizes, tuple(pack["price"] for pack in packs), round(amount * grid))
+    if solution is None:
+        return None
+    total, counts = solution
+    chosen = [{**pack, "count": count} for pack, count in zip(packs, counts) if count]
+    return {
+        "price": total,
+        "amount": sum(pack["unit_size"] * pack["count"] for pack in chosen),
+        "packs": chosen
+    }
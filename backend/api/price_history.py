@@ -0,0 +1,373 @@
+# Append-only price history with a compact, memory-mapped on-disk format
+#
+# Layout under data/price_history/:
+#   dictionary.json   retailer product IDs and unit measures, indexed by position
+#   YYYY-MM-DD.seg    append-only records for snapshots taken that day (UTC)
+#   latest.bin        one record per product holding its most recent price
+#
+# Segments and latest.bin share one fixed-width little-endian record layout, so both
+# are read straight from a memory map without parsing the rest of the history.
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import argparse
+import bisect
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+
+from api.data_store import DATA_DIR, data_version, get_derived, load_cached_json
+
+HISTORY_DIR = DATA_DIR / "price_history"
+DICTIONARY_FILE = "dictionary.json"
+LATEST_FILE = "latest.bin"
+
+# Data files whose versions change on every append (latest.bin is always rewritten)
+VERSION_FILES = [f"price_history/{DICTIONARY_FILE}", f"price_history/{LATEST_FILE}"]
+
+MAGIC = b"SLPH\x01\x00\x00\x00"
+
+# recorded_at (epoch seconds), product index, price (cents), unit price (1/1000), measure index
+RECORD = struct.Struct("<qIiiH2x")
+
+# Reentrant so seeding can check for the history and append under one hold
+_write_lock = threading.RLock()
+
+# path -> (version, mmap) for open segment and checkpoint files
+_maps: Dict[str, Tuple[str, Optional[mmap.mmap]]] = {}
+
+# segment path -> (version, product index -> (sorted timestamps, record offsets))
+_segment_indexes: Dict[str, Tuple[str, Dict[int, Tuple[List[int], List[int]]]]] = {}
+
+# version of latest.bin and the dictionary -> decoded latest slice
+_latest_cache: Dict[str, Any] = {}
+
+# Called after every append with retailer_product_id -> new latest snapshot, and the
+# latest_prices_version() from before the append (None if the append created the history)
+_price_listeners: List[Callable[[Dict[str, Dict[str, Any]], Optional[Tuple[str, ...]]], None]] = []
+
+def add_price_listener(listener: Callable[[Dict[str, Dict[str, Any]], Optional[Tuple[str, ...]]], None]) -> None:
+    """Register a callback for products whose latest price changed.
+
+    The previous version lets listeners holding state derived from the price slice
+    tell whether the change can be applied to it. It is None when the append created
+    the history, since the slice then replaces the price_snapshots.json fallback.
+    """
+    _price_listeners.append(listener)
+
+def to_epoch(moment: datetime) -> int:
+    """Convert a datetime to epoch seconds; naive datetimes are treated as UTC."""
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return int(moment.timestamp())
+
+def from_epoch(seconds: int) -> datetime:
+    """Convert epoch seconds to a UTC datetime."""
+    return datetime.fromtimestamp(seconds, tz=timezone.utc)
+
+def segment_name(seconds: int) -> str:
+    """Name of the day partition holding a timestamp."""
+    return f"{from_epoch(seconds):%Y-%m-%d}.seg"
+
+def file_version(path: Path) -> str:
+    """Version string of a history file (see data_store.data_version)."""
+    return data_version(str(path.relative_to(DATA_DIR)))
+
+def build_dictionary(data: dict) -> Dict[str, Any]:
+    """Add reverse lookups to the product/measure dictionary."""
+    products = data.get("products", [])
+    measures = data.get("measures", [])
+    return {
+        "products": products,
+        "measures": measures,
+        "product_index": {product_id: i for i, product_id in enumerate(products)},
+        "measure_index": {measure: i for i, measure in enumerate(measures)}
+    }
+
+def load_dictionary() -> Dict[str, Any]:
+    """Get the product/measure dictionary, rebuilt only when it changes."""
+    return get_derived("price_history_dictionary", [f"price_history/{DICTIONARY_FILE}"], build_dictionary)
+
+def open_map(path: Path) -> Optional[mmap.mmap]:
+    """Memory-map a history file read-only, remapping only when it changes."""
+    version = file_version(path)
+    cached = _maps.get(str(path))
+    if cached and cached[0] == version:
+        return cached[1]
+
+    mapped = None
+    if version != "missing" and path.stat().st_size > len(MAGIC):
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if mapped[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path.name} is not a price history file")
+    if cached and cached[1] is not None:
+        cached[1].close()
+    _maps[str(path)] = (version, mapped)
+    return mapped
+
+def record_count(mapped: mmap.mmap) -> int:
+    """Number of complete records in a mapped file."""
+    # A torn trailing record from an interrupted append is ignored
+    return (len(mapped) - len(MAGIC)) // RECORD.size
+
+def decode(record: tuple, dictionary: Dict[str, Any]) -> Dict[str, Any]:
+    """Turn a raw record into a price snapshot dict with its recording time."""
+    recorded_at, product, price, unit_price, measure = record
+    return {
+        "retailer_product_id": dictionary["products"][product],
+        "price": price / 100.0,
+        "unit_price": unit_price / 1000.0,
+        "unit_price_measure": dictionary["measures"][measure],
+        "recorded_at": from_epoch(recorded_at)
+    }
+
+def list_segments() -> List[Path]:
+    """All segment files, oldest first (names sort by date)."""
+    if not HISTORY_DIR.exists():
+        return []
+    return sorted(HISTORY_DIR.glob("*.seg"))
+
+def segment_index(path: Path) -> Dict[int, Tuple[List[int], List[int]]]:
+    """Index a segment by product: sorted timestamps and matching record offsets.
+
+    Built with one pass over the memory map and cached until the segment grows.
+    """
+    version = file_version(path)
+    cached = _segment_indexes.get(str(path))
+    if cached and cached[0] == version:
+        return cached[1]
+
+    index: Dict[int, List[Tuple[int, int]]] = {}
+    mapped = open_map(path)
+    if mapped is not None:
+        for i in range(record_count(mapped)):
+            offset = len(MAGIC) + i * RECORD.size
+            recorded_at, product = struct.unpack_from("<qI", mapped, offset)
+            index.setdefault(product, []).append((recorded_at, offset))
+
+    by_product = {}
+    for product, entries in index.items():
+        entries.sort()
+        by_product[product] = ([entry[0] for entry in entries], [entry[1] for entry in entries])
+    _segment_indexes[str(path)] = (version, by_product)
+    return by_product
+
+def read_latest() -> Optional[Dict[str, Dict[str, Any]]]:
+    """Decode latest.bin into retailer_product_id -> snapshot, or None without history."""
+    path = HISTORY_DIR / LATEST_FILE
+    key = (file_version(path), file_version(HISTORY_DIR / DICTIONARY_FILE))
+    if _latest_cache.get("key") == key:
+        return _latest_cache["value"]
+
+    mapped = open_map(path)
+    value = None
+    if mapped is not None:
+        dictionary = load_dictionary()
+        value = {}
+        for record in RECORD.iter_unpack(mapped[len(MAGIC):len(MAGIC) + record_count(mapped) * RECORD.size]):
+            if record[0]:
+                snapshot = decode(record, dictionary)
+                value[snapshot["retailer_product_id"]] = snapshot
+
+    _latest_cache.update(key=key, value=value)
+    return value
+
+def latest_prices_version() -> Tuple[str, ...]:
+    """Version of the slice load_latest_prices returns; changes on every append."""
+    if not (HISTORY_DIR / LATEST_FILE).exists():
+        return (data_version("price_snapshots.json"),)
+    return (file_version(HISTORY_DIR / LATEST_FILE), file_version(HISTORY_DIR / DICTIONARY_FILE))
+
+def load_latest_prices() -> dict:
+    """Get the current price slice shaped like price_snapshots.json.
+
+    Reads the latest.bin checkpoint only; without any history it falls back to
+    price_snapshots.json.
+    """
+    latest = read_latest()
+    if latest is None:
+        return load_cached_json("price_snapshots.json")
+    return {"prices": list(latest.values())}
+
+def price_as_of(retailer_product_id: str, as_of: datetime) -> Optional[Dict[str, Any]]:
+    """Get the last recorded price of a product at or before a point in time."""
+    dictionary = load_dictionary()
+    product = dictionary["product_index"].get(retailer_product_id)
+    if product is None:
+        return None
+
+    cutoff = to_epoch(as_of)
+    latest = (read_latest() or {}).get(retailer_product_id)
+    if latest and to_epoch(latest["recorded_at"]) <= cutoff:
+        return latest
+
+    # Walk back through the day partitions, starting at the cutoff's day
+    cutoff_segment = segment_name(cutoff)
+    for path in reversed(list_segments()):
+        if path.name > cutoff_segment:
+            continue
+        entry = segment_index(path).get(product)
+        if not entry:
+            continue
+        position = bisect.bisect_right(entry[0], cutoff)
+        if position:
+            record = RECORD.unpack_from(open_map(path), entry[1][position - 1])
+            return decode(record, dictionary)
+    return None
+
+def price_series(
+    retailer_product_id: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+) -> List[Dict[str, Any]]:
+    """Get every recorded price of a product between start and end, oldest first."""
+    dictionary = load_dictionary()
+    product = dictionary["product_index"].get(retailer_product_id)
+    if product is None:
+        return []
+
+    start_seconds = to_epoch(start) if start else None
+    end_seconds = to_epoch(end) if end else None
+    points = []
+    for path in list_segments():
+        if start_seconds is not None and path.name < segment_name(start_seconds):
+            continue
+        if end_seconds is not None and path.name > segment_name(end_seconds):
+            break
+        entry = segment_index(path).get(product)
+        if not entry:
+            continue
+        lo = bisect.bisect_left(entry[0], start_seconds) if start_seconds is not None else 0
+        hi = bisect.bisect_right(entry[0], end_seconds) if end_seconds is not None else len(entry[0])
+        mapped = open_map(path)
+        points.extend(decode(RECORD.unpack_from(mapped, offset), dictionary) for offset in entry[1][lo:hi])
+    return points
+
+def write_atomic(path: Path, payload: bytes) -> None:
+    """Replace a file in one step so readers never see a partial write."""
+    fd, temp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(payload)
+    os.chmod(temp_path, 0o644)
+    os.replace(temp_path, path)
+
+def append_snapshots(snapshots: Iterable[Dict[str, Any]], recorded_at: Optional[datetime] = None) -> int:
+    """Append price snapshots to the history and advance the latest checkpoint.
+
+    Snapshots are price_snapshots.json style dicts. Records go to the segment for the
+    recording day; latest.bin only moves forward, so backfilled history never
+    replaces a newer price. The in-memory latest slice is patched rather than
+    re-read, and price listeners are told which products changed. The first append
+    also records every price_snapshots.json price it does not replace, so a partial
+    feed never drops the rest of the fallback slice. Returns the number of the given
+    snapshots recorded.
+    """
+    seconds = to_epoch(recorded_at or datetime.now(timezone.utc))
+    snapshots = list(snapshots)
+    count = len(snapshots)
+
+    with _write_lock:
+        previous_version = latest_prices_version() if (HISTORY_DIR / LATEST_FILE).exists() else None
+        if previous_version is None and snapshots:
+            # Seed the history with the fallback slice, ahead of the new snapshots
+            incoming = {snapshot["retailer_product_id"] for snapshot in snapshots}
+            fallback = load_cached_json("price_snapshots.json").get("prices", [])
+            snapshots = [price for price in fallback if price["retailer_product_id"] not in incoming] + snapshots
+        HISTORY_DIR.mkdir(parents=True, exist_ok=True)
+        latest_path = HISTORY_DIR / LATEST_FILE
+        previous_key = (file_version(latest_path), file_version(HISTORY_DIR / DICTIONARY_FILE))
+        dictionary = load_dictionary()
+        products = list(dictionary["products"])
+        measures = list(dictionary["measures"])
+        product_index = dict(dictionary["product_index"])
+        measure_index = dict(dictionary["measure_index"])
+
+        records = []
+        for snapshot in snapshots:
+            product_id = snapshot["retailer_product_id"]
+            measure = snapshot.get("unit_price_measure", "")
+            if product_id not in product_index:
+                product_index[product_id] = len(products)
+                products.append(product_id)
+            if measure not in measure_index:
+                measure_index[measure] = len(measures)
+                measures.append(measure)
+            records.append((
+                seconds,
+                product_index[product_id],
+                round(float(snapshot["price"]) * 100),
+                round(float(snapshot.get("unit_price", 0)) * 1000),
+                measure_index[measure]
+            ))
+
+        if not records:
+            return 0
+
+        # The dictionary must know every index before any record refers to it
+        if len(products) != len(dictionary["products"]) or len(measures) != len(dictionary["measures"]):
+            write_atomic(
+                HISTORY_DIR / DICTIONARY_FILE,
+                json.dumps({"products": products, "measures": measures}).encode()
+            )
+
+        segment = HISTORY_DIR / segment_name(seconds)
+        with open(segment, "ab") as f:
+            if f.tell() == 0:
+                f.write(MAGIC)
+            f.write(b"".join(RECORD.pack(*record) for record in records))
+            f.flush()
+            os.fsync(f.fileno())
+
+        # Rewrite the checkpoint with one dense slot per product index
+        slots = [RECORD.pack(0, i, 0, 0, 0) for i in range(len(products))]
+        mapped = open_map(latest_path)
+        if mapped is not None:
+            for i in range(record_count(mapped)):
+                offset = len(MAGIC) + i * RECORD.size
+                slots[i] = mapped[offset:offset + RECORD.size]
+        changed = {}
+        names = {"products": products, "measures": measures}
+        for record in records:
+            if record[0] >= RECORD.unpack(slots[record[1]])[0]:
+                slots[record[1]] = RECORD.pack(*record)
+                changed[products[record[1]]] = decode(record, names)
+        write_atomic(latest_path, MAGIC + b"".join(slots))
+
+        # Patch the decoded slice when it was current before this write; it is copied
+        # rather than mutated because readers on other threads may be iterating it
+        if changed and _latest_cache.get("key") == previous_key and _latest_cache["value"] is not None:
+            _latest_cache["value"] = {**_latest_cache["value"], **changed}
+            _latest_cache["key"] = (file_version(latest_path), file_version(HISTORY_DIR / DICTIONARY_FILE))
+
+    if changed:
+        for listener in _price_listeners:
+            listener(changed, previous_version)
+
+    return count
+
+def seed_price_history(recorded_at: Optional[datetime] = None) -> int:
+    """Record price_snapshots.json in the history if there is none yet.
+
+    Returns the number of prices seeded, 0 when the history already exists.
+    """
+    with _write_lock:
+        if (HISTORY_DIR / LATEST_FILE).exists():
+            return 0
+        return append_snapshots(load_cached_json("price_snapshots.json").get("prices", []), recorded_at)
+
+def main() -> None:
+    """Seed the price history from price_snapshots.json."""
+    parser = argparse.ArgumentParser(description="Record ShopLyft price snapshots in the price history")
+    parser.add_argument("--at", type=datetime.fromisoformat, help="Recording time (ISO 8601, default now)")
+    args = parser.parse_args()
+
+    snapshots = load_cached_json("price_snapshots.json").get("prices", [])
+    count = append_snapshots(snapshots, args.at)
+    print(f"Recorded {count} price snapshots in {HISTORY_DIR}")
+
+if __name__ == "__main__":
+    main()
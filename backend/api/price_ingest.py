@@ -0,0 +1,122 @@
+# Streaming price feed ingestion (NDJSON or CSV) into the price history
+from typing import Any, Dict, IO, Iterable, Iterator, List, Optional
+import argparse
+import csv
+import json
+import sys
+from datetime import datetime, timezone
+
+from pydantic import ValidationError
+
+from api.models import PriceSnapshot
+from api.price_history import append_snapshots, seed_price_history
+
+DEFAULT_BATCH_SIZE = 1000
+
+# Only the first few row errors are reported back
+MAX_REPORTED_ERRORS = 20
+
+FEED_FORMATS = ("ndjson", "csv")
+
+def iter_feed_rows(stream: IO[str], feed_format: str) -> Iterator[tuple]:
+    """Yield (line number, row dict or parse error) from an NDJSON or CSV text stream."""
+    if feed_format == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+
+    for line_number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_number, e
+
+def iter_batches(rows: Iterable[tuple], batch_size: int) -> Iterator[List[tuple]]:
+    """Group rows into lists of at most batch_size."""
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def validate_batch(batch: List[tuple], summary: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Validate a batch against PriceSnapshot, recording rejected rows in the summary."""
+    valid = []
+    for line_number, row in batch:
+        if isinstance(row, Exception):
+            error = f"invalid JSON: {row}"
+        elif not isinstance(row, dict):
+            error = "row is not an object"
+        else:
+            try:
+                valid.append(PriceSnapshot(**row).model_dump())
+                continue
+            except ValidationError as e:
+                error = "; ".join(
+                    f"{'.'.join(str(part) for part in detail['loc'])}: {detail['msg']}" for detail in e.errors()
+                )
+
+        summary["rejected"] += 1
+        if len(summary["errors"]) < MAX_REPORTED_ERRORS:
+            summary["errors"].append({"line": line_number, "error": error})
+    return valid
+
+def ingest_price_feed(
+    stream: IO[str],
+    feed_format: str = "ndjson",
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    recorded_at: Optional[datetime] = None
+) -> Dict[str, Any]:
+    """Validate and append a price feed in batches, holding one batch in memory at a time.
+
+    Each batch is committed to the price history (segment append and atomic checkpoint
+    replace) before the next is read, so a failure part way through keeps the batches
+    already ingested. Without a price history, price_snapshots.json is recorded
+    first, so a partial feed only replaces the prices it contains.
+    """
+    if feed_format not in FEED_FORMATS:
+        raise ValueError(f"Unsupported feed format '{feed_format}'")
+
+    recorded_at = recorded_at or datetime.now(timezone.utc)
+    summary = {"accepted": 0, "rejected": 0, "batches": 0, "errors": []}
+    summary["seeded"] = seed_price_history(recorded_at)
+
+    for batch in iter_batches(iter_feed_rows(stream, feed_format), batch_size):
+        valid = validate_batch(batch, summary)
+        summary["accepted"] += append_snapshots(valid, recorded_at)
+        summary["batches"] += 1
+
+    summary["recorded_at"] = recorded_at
+    return summary
+
+def main() -> None:
+    """Ingest a price feed file (or stdin) into the price history."""
+    parser = argparse.ArgumentParser(description="Ingest an NDJSON or CSV price feed")
+    parser.add_argument("feed", help="Feed file path, or - for stdin")
+    parser.add_argument("--format", choices=FEED_FORMATS, help="Feed format (default: from file extension)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Rows validated and written per batch")
+    parser.add_argument("--at", type=datetime.fromisoformat, help="Recording time (ISO 8601, default now)")
+    args = parser.parse_args()
+
+    feed_format = args.format or ("csv" if args.feed.endswith(".csv") else "ndjson")
+    if args.feed == "-":
+        summary = ingest_price_feed(sys.stdin, feed_format, args.batch_size, args.at)
+    else:
+        with open(args.feed, "r", newline="") as f:
+            summary = ingest_price_feed(f, feed_format, args.batch_size, args.at)
+
+    if summary["seeded"]:
+        print(f"Seeded the price history with {summary['seeded']} prices from price_snapshots.json")
+    print(f"Ingested {summary['accepted']} prices in {summary['batches']} batches, rejected {summary['rejected']}")
+    for error in summary["errors"]:
+        print(f"  line {error['line']}: {error['error']}")
+
+if __name__ == "__main__":
+    main()
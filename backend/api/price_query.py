@@ -0,0 +1,157 @@
+# Price query engine: sorted price ranges per retailer and a token index over product names
+from typing import Any, Dict, List, Optional, Set, Tuple
+import bisect
+import heapq
+
+from api.data_store import data_version, load_cached_json
+from api.price_history import latest_prices_version, load_latest_prices
+from api.product_search import tokenize, trigrams
+
+PRICE_SORTS = ("price", "-price", "unit_price", "-unit_price")
+
+# Key used for the range index over every retailer
+ALL_RETAILERS = "*"
+
+# (price slice version, catalog version) -> index
+_index_cache: Dict[str, Any] = {}
+
+def retailer_of(retailer_product_id: str) -> str:
+    """Retailer prefix of a retailer product ID ("woolworths:milk:..." -> "woolworths")."""
+    return retailer_product_id.split(":", 1)[0]
+
+def build_price_index(prices: List[Dict[str, Any]], catalog_data: dict) -> Dict[str, Any]:
+    """Index the current prices for range, text and combined queries.
+
+    ranges maps each retailer (and ALL_RETAILERS) to parallel lists of ascending
+    prices and price positions, so a min/max filter is two bisections. postings maps
+    each token of a product's ID and catalog name to the positions containing it, and
+    the trigram index maps character trigrams to the tokens containing them, so query
+    tokens typed mid-word ("ream") still find their tokens ("cream").
+    """
+    names = {item["retailer_product_id"]: item.get("name", "") for item in catalog_data.get("retailer_products", [])}
+
+    by_retailer: Dict[str, List[Tuple[float, int]]] = {ALL_RETAILERS: []}
+    postings: Dict[str, Set[int]] = {}
+    for position, price in enumerate(prices):
+        product_id = price.get("retailer_product_id", "")
+        entry = (price.get("price", 0), position)
+        by_retailer[ALL_RETAILERS].append(entry)
+        by_retailer.setdefault(retailer_of(product_id), []).append(entry)
+        for token in set(tokenize(product_id)) | set(tokenize(names.get(product_id, ""))):
+            postings.setdefault(token, set()).add(position)
+
+    trigram_index: Dict[str, Set[str]] = {}
+    for term in postings:
+        for gram in trigrams(term):
+            trigram_index.setdefault(gram, set()).add(term)
+
+    ranges = {}
+    for retailer_id, entries in by_retailer.items():
+        entries.sort()
+        ranges[retailer_id] = ([price for price, _ in entries], [position for _, position in entries])
+
+    return {
+        "prices": prices,
+        "ranges": ranges,
+        "postings": postings,
+        "vocabulary": sorted(postings),
+        "trigram_index": trigram_index,
+    }
+
+def get_price_index() -> Dict[str, Any]:
+    """Get the price index, rebuilt once per version of the price slice and catalog."""
+    key = (latest_prices_version(), data_version("retailer_catalog.json"))
+    if _index_cache.get("key") != key:
+        index = build_price_index(load_latest_prices().get("prices", []), load_cached_json("retailer_catalog.json"))
+        _index_cache.update(key=key, value=index)
+    return _index_cache["value"]
+
+def range_positions(
+    index: Dict[str, Any],
+    retailer_id: Optional[str],
+    min_price: Optional[float],
+    max_price: Optional[float]
+) -> List[int]:
+    """Positions of prices within [min_price, max_price] for a retailer, cheapest first."""
+    values, positions = index["ranges"].get(retailer_id or ALL_RETAILERS, ([], []))
+    lo = bisect.bisect_left(values, min_price) if min_price is not None else 0
+    hi = bisect.bisect_right(values, max_price) if max_price is not None else len(values)
+    return positions[lo:hi]
+
+def containing_terms(index: Dict[str, Any], fragment: str) -> List[str]:
+    """Vocabulary terms containing fragment, found through the trigram index.
+
+    Fragments shorter than a trigram scan the vocabulary instead.
+    """
+    grams = trigrams(fragment)
+    if not grams:
+        return [term for term in index["vocabulary"] if fragment in term]
+    postings = sorted((index["trigram_index"].get(gram, set()) for gram in grams), key=len)
+    candidates = set.intersection(*postings) if postings[0] else set()
+    return [term for term in candidates if fragment in term]
+
+def text_positions(index: Dict[str, Any], query: str) -> Set[int]:
+    """Positions whose product ID or name has a token containing each query token."""
+    matches: Optional[Set[int]] = None
+    for token in tokenize(query):
+        token_matches = set()
+        for term in containing_terms(index, token):
+            token_matches |= index["postings"][term]
+        matches = token_matches if matches is None else matches & token_matches
+        if not matches:
+            return set()
+    return matches if matches is not None else set()
+
+def query_prices(
+    query: Optional[str] = None,
+    retailer_id: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    sort: Optional[str] = None,
+    limit: Optional[int] = None,
+    offset: int = 0
+) -> List[Dict[str, Any]]:
+    """Find current prices matching any combination of text, retailer and price range.
+
+    Without a sort, results keep the price slice's order. Price sorts walk the
+    retailer's sorted range directly and stop once the page is full.
+    """
+    if sort is not None and sort not in PRICE_SORTS:
+        raise ValueError(f"Unsupported sort '{sort}', expected one of: {', '.join(PRICE_SORTS)}")
+
+    index = get_price_index()
+    prices = index["prices"]
+    in_range = range_positions(index, retailer_id, min_price, max_price)
+    text = text_positions(index, query) if query else None
+    wanted = None if limit is None else offset + limit
+
+    if sort in ("price", "-price"):
+        ordered = in_range if sort == "price" else reversed(in_range)
+        page = []
+        for position in ordered:
+            if text is None or position in text:
+                page.append(position)
+                if wanted is not None and len(page) >= wanted:
+                    break
+        return [prices[position] for position in page[offset:]]
+
+    if text is None:
+        candidates = in_range
+    elif retailer_id is None and min_price is None and max_price is None:
+        # Text only: the matches are the candidates, no range to intersect
+        candidates = list(text)
+    else:
+        candidates = [position for position in in_range if position in text]
+
+    if sort is None:
+        key = lambda position: position
+    elif sort == "unit_price":
+        key = lambda position: (prices[position].get("unit_price", 0), position)
+    else:
+        key = lambda position: (-prices[position].get("unit_price", 0), position)
+
+    if wanted is not None and wanted < len(candidates):
+        ordered = heapq.nsmallest(wanted, candidates, key=key)
+    else:
+        ordered = sorted(candidates, key=key)
+    return [prices[position] for position in ordered[offset:]]
@@ -0,0 +1,226 @@
+# Inverted index product search with BM25 ranking and prefix, substring and typo-tolerant matching
+from typing import Any, Dict, List, Optional, Set, Tuple
+import bisect
+import heapq
+import math
+import re
+
+from api.data_store import get_derived
+
+# Field boosts: a hit in the canonical name outranks one in an alias or the category
+FIELD_WEIGHTS = {"canonical_name": 3.0, "aliases": 1.5, "category": 1.0}
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# Query terms expanded by prefix, substring or typo score lower than exact matches
+PREFIX_WEIGHT = 0.8
+INFIX_WEIGHT = 0.6
+FUZZY_WEIGHT = 0.5
+
+# Typo index depth: terms are indexed under every variant with up to this many
+# characters deleted
+MAX_TYPOS = 2
+
+# Most expansions considered per query term
+MAX_EXPANSIONS = 50
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase alphanumeric tokens."""
+    return TOKEN_PATTERN.findall(text.lower())
+
+def trigrams(term: str) -> Set[str]:
+    """Character trigrams of a term."""
+    return {term[i:i + 3] for i in range(len(term) - 2)}
+
+def deletions(term: str, depth: int) -> Set[str]:
+    """The term and every variant of it with up to depth characters deleted."""
+    variants = {term}
+    frontier = {term}
+    for _ in range(depth):
+        frontier = {word[:i] + word[i + 1:] for word in frontier for i in range(len(word))}
+        variants |= frontier
+    return variants
+
+def max_typos(term: str) -> int:
+    """Edits tolerated for a query term of this length."""
+    if len(term) <= 3:
+        return 0
+    return 1 if len(term) <= 7 else MAX_TYPOS
+
+def within_edit_distance(a: str, b: str, limit: int) -> bool:
+    """Whether a and b are within limit insertions, deletions, substitutions or adjacent swaps."""
+    if abs(len(a) - len(b)) > limit:
+        return False
+    previous_previous = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+        if min(current) > limit:
+            return False
+        previous_previous, previous = previous, current
+    return previous[-1] <= limit
+
+def bm25_postings(frequencies: Dict[int, float], lengths: List[float], average_length: float) -> Dict[int, float]:
+    """BM25 score of one term for every product containing it."""
+    idf = math.log(1 + (len(lengths) - len(frequencies) + 0.5) / (len(frequencies) + 0.5))
+    scores = {}
+    for position, frequency in frequencies.items():
+        norm = K1 * (1 - B + B * lengths[position] / average_length)
+        scores[position] = idf * frequency * (K1 + 1) / (frequency + norm)
+    return scores
+
+def build_search_index(products_data: dict) -> Dict[str, Any]:
+    """Build the inverted index over product names, aliases and categories.
+
+    postings maps a term to {product position: BM25 score}, computed here from
+    field-weighted term frequencies so queries only add up scores. The sorted
+    vocabulary answers prefix queries by bisection, the trigram index answers
+    substring queries, and the deletion index (terms keyed by their variants with
+    characters deleted) finds typo candidates before edit distances are checked.
+    """
+    products = products_data.get("products", [])
+    postings: Dict[str, Dict[int, float]] = {}
+    lengths = []
+    for position, product in enumerate(products):
+        fields = {
+            "canonical_name": product.get("canonical_name", ""),
+            "aliases": " ".join(product.get("aliases", [])),
+            "category": product.get("category", ""),
+        }
+        length = 0.0
+        for field, text in fields.items():
+            for token in tokenize(text):
+                weight = FIELD_WEIGHTS[field]
+                doc_postings = postings.setdefault(token, {})
+                doc_postings[position] = doc_postings.get(position, 0.0) + weight
+                length += weight
+        lengths.append(length)
+
+    average_length = sum(lengths) / len(lengths) if lengths else 1.0
+    for term, doc_postings in postings.items():
+        postings[term] = bm25_postings(doc_postings, lengths, average_length)
+
+    vocabulary = sorted(postings)
+    trigram_index: Dict[str, Set[str]] = {}
+    deletion_index: Dict[str, List[str]] = {}
+    for term in vocabulary:
+        for gram in trigrams(term):
+            trigram_index.setdefault(gram, set()).add(term)
+        if len(term) > 3:
+            for variant in deletions(term, MAX_TYPOS):
+                deletion_index.setdefault(variant, []).append(term)
+
+    return {
+        "products": products,
+        "postings": postings,
+        "vocabulary": vocabulary,
+        "trigram_index": trigram_index,
+        "deletion_index": deletion_index,
+        "categories": [product.get("category", "").lower() for product in products],
+    }
+
+def get_search_index() -> Dict[str, Any]:
+    """Get the product search index, rebuilt only when products.json changes."""
+    return get_derived("product_search_index", ["products.json"], build_search_index)
+
+def prefix_terms(index: Dict[str, Any], prefix: str) -> List[str]:
+    """Vocabulary terms starting with prefix, shortest first."""
+    vocabulary = index["vocabulary"]
+    start = bisect.bisect_left(vocabulary, prefix)
+    end = bisect.bisect_left(vocabulary, prefix + "\uffff")
+    return sorted(vocabulary[start:end], key=len)[:MAX_EXPANSIONS]
+
+def infix_terms(index: Dict[str, Any], fragment: str) -> List[str]:
+    """Vocabulary terms containing fragment (three or more characters), shortest first."""
+    grams = trigrams(fragment)
+    if not grams:
+        return []
+    postings = sorted((index["trigram_index"].get(gram, set()) for gram in grams), key=len)
+    candidates = set.intersection(*postings) if postings[0] else set()
+    return sorted((term for term in candidates if fragment in term), key=len)[:MAX_EXPANSIONS]
+
+def fuzzy_terms(index: Dict[str, Any], term: str) -> List[str]:
+    """Vocabulary terms within the typo allowance of term."""
+    limit = max_typos(term)
+    if limit == 0:
+        return []
+    candidates = set()
+    for variant in deletions(term, limit):
+        candidates.update(index["deletion_index"].get(variant, []))
+    matches = [candidate for candidate in candidates if within_edit_distance(term, candidate, limit)]
+    return sorted(matches)[:MAX_EXPANSIONS]
+
+def expand_term(index: Dict[str, Any], term: str, partial: bool, fuzzy: bool) -> Dict[str, float]:
+    """Index terms a query term matches, with the weight of each kind of match."""
+    expansions = {}
+    if term in index["postings"]:
+        expansions[term] = 1.0
+    if partial:
+        for candidate in prefix_terms(index, term):
+            expansions.setdefault(candidate, PREFIX_WEIGHT)
+        for candidate in infix_terms(index, term):
+            expansions.setdefault(candidate, INFIX_WEIGHT)
+    if fuzzy and not expansions:
+        for candidate in fuzzy_terms(index, term):
+            expansions.setdefault(candidate, FUZZY_WEIGHT)
+    return expansions
+
+def search(
+    query: str,
+    category: Optional[str] = None,
+    limit: int = 20,
+    offset: int = 0,
+    partial: bool = True,
+    fuzzy: bool = True
+) -> Tuple[List[Dict[str, Any]], int]:
+    """Rank products for a query; returns one page of product dicts and the total match count.
+
+    Every query term must match: exactly, as a prefix or substring of an indexed term
+    when partial matching is on, or otherwise within the typo allowance. A term's
+    score for a product is the best of its expansions, and a product's score is the
+    sum over query terms.
+    """
+    index = get_search_index()
+    terms = tokenize(query)
+    if not terms:
+        return [], 0
+
+    totals: Optional[Dict[int, float]] = None
+    for term in terms:
+        expansions = expand_term(index, term, partial, fuzzy)
+        best: Dict[int, float] = {}
+        for candidate, weight in expansions.items():
+            for position, score in index["postings"][candidate].items():
+                weighted = weight * score
+                if weighted > best.get(position, 0.0):
+                    best[position] = weighted
+        if totals is None:
+            totals = best
+        else:
+            totals = {position: totals[position] + score for position, score in best.items() if position in totals}
+        if not totals:
+            return [], 0
+
+    if category:
+        wanted = category.lower()
+        totals = {position: score for position, score in totals.items() if index["categories"][position] == wanted}
+
+    top = heapq.nsmallest(offset + limit, totals.items(), key=lambda hit: (-hit[1], hit[0]))
+    return [index["products"][position] for position, _ in top[offset:]], len(totals)
+
+def autocomplete(prefix: str, limit: int = 10) -> List[Dict[str, Any]]:
+    """Suggest products for partially typed text, best match first."""
+    products, _ = search(prefix, limit=limit)
+    return [
+        {"canonical_id": product["canonical_id"], "canonical_name": product["canonical_name"], "category": product["category"]}
+        for product in products
+    ]
@@ -1,26 +1,108 @@
 # Optimization API Router
-from fastapi import APIRouter, HTTPException, BackgroundTasks
-from typing import List, Optional, Dict, Any
+from fastapi import APIRouter, Header, HTTPException, BackgroundTasks
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from typing import AsyncIterator, List, Optional, Dict, Any, Callable
 import json
 import math
+import orjson
 import itertools
+import heapq
+import bisect
 import urllib.parse
+import re
+import time
 import asyncio
 import aiohttp
+from collections import Counter, OrderedDict
 from datetime import datetime, timezone
 from pathlib import Path
 
 from api.models import (
     OptimizationRequest, OptimizationResponse, ShoppingListRequest, ShoppingListResponse,
+    SplitOptimizationRequest, SplitOptimizationResponse, SplitShoppingPlan, ShopperRoute,
     ParsedProduct, ShoppingPlan, StoreBasket, RouteStore, RouteItem,
     StartingLocation, RouteSegment, OptimizationDetails, Location,
-    ErrorResponse
+    PlanAlternative, ParetoPoint, SearchMode, ErrorResponse
 )
+from api.opening_hours import make_open_check
+from api.travel import TravelModel, get_travel_model
+from api.click_collect import assign_with_min_spend, get_min_spend_index
+from api.price_history import load_latest_prices
+from api.serialization import ORJSON_OPTIONS, FastJSONResponse, plan_response, serialize_plan
+from api.single_flight import SingleFlight, normalize_text
+from api.hedging import StrategyStats, hedged_race
+from api.anytime_route import DEFAULT_TIME_LIMIT_SECONDS as ANYTIME_TIME_LIMIT_SECONDS, AnytimeRouteSearch, optimality_gap
+from api.deadline import DEADLINE_HEADER, Deadline, resolve_deadline
+from api.pack_sizes import cheapest_packs, get_pack_index, parse_requested_amount
+from api.substitutes import best_substitute, get_substitution_graph
+from api.split_routing import solve_split
+from api.data_store import data_version
+from api import product_search
 from connectonion import llm_do
 from pydantic import BaseModel
 
 router = APIRouter()
 
+# Receives (event name, payload) as optimization stages complete; always called on the event loop
+ProgressCallback = Callable[[str, Any], None]
+
+# Seconds between SSE keep-alive comments while a stage is running
+SSE_KEEPALIVE_SECONDS = 15
+
+# Arrival times kept per (retailer subset, last store) state of the store-level search
+# when opening hours are checked
+MAX_ARRIVAL_LABELS = 4
+
+# Identical concurrent work is done once: whole optimizations, LLM list parses and
+# per-product Woolworths searches
+optimization_flights = SingleFlight("optimization")
+parse_flights = SingleFlight("grocery list parse")
+search_flights = SingleFlight("Woolworths search")
+
+# Stage events of the in-flight optimizations, by coalescing key, so streamed
+# requests that join a shared optimization still see its progress
+optimization_progress: Dict[bytes, "ProgressBroadcast"] = {}
+
+# Win rates and latencies of the Woolworths search strategies
+search_strategy_stats = StrategyStats()
+
+# Recent successful LLM parses, (normalized list, products.json version) -> parse,
+# used when the parse runs out of time budget
+PARSE_CACHE_SIZE = 256
+parse_cache: "OrderedDict[tuple, ParsedShoppingList]" = OrderedDict()
+
+# Confidence given to items matched by catalog search instead of the LLM
+FALLBACK_PARSE_CONFIDENCE = 0.5
+
+class ProgressBroadcast:
+    """Fans one optimization's stage events out to every subscriber, replaying earlier events to late ones."""
+
+    def __init__(self):
+        self.events: List[tuple] = []
+        self.subscribers: List[asyncio.Queue] = []
+
+    def publish(self, event: str, payload: Any) -> None:
+        self.events.append((event, payload))
+        for queue in self.subscribers:
+            queue.put_nowait((event, payload))
+
+    def subscribe(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue()
+        for item in self.events:
+            queue.put_nowait(item)
+        self.subscribers.append(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        if queue in self.subscribers:
+            self.subscribers.remove(queue)
+
+def emit_progress(progress: Optional[ProgressCallback], event: str, payload: Any) -> None:
+    """Report a stage event if anyone is listening."""
+    if progress is not None:
+        progress(event, payload)
+
 def load_json_data(filename: str) -> dict:
     """Load JSON data from the data directory."""
     data_path = Path(__file__).parent.parent.parent.parent / "data" / filename
@@ -130,10 +212,20 @@ def validate_stores_only_from_data(stores: List[Dict[str, Any]]) -> bool:
     
     return True
 
-def generate_price_dataset(parsed_products: List[ParsedProduct]) -> List[Dict[str, Any]]:
-    """Generate dataset of (item, price, store) for every item in the list."""
+def generate_price_dataset(
+    parsed_products: List[ParsedProduct],
+    pack_sizes: bool = False,
+    substitutes: bool = False
+) -> List[Dict[str, Any]]:
+    """Generate dataset of (item, price, store) for every item in the list.
+
+    With pack_sizes, each item's price at a retailer is the cheapest mix of the
+    retailer's pack sizes covering the requested amount (see pack_price_entries).
+    With substitutes, a retailer that does not sell an item offers its best
+    substitute from the substitution graph instead (see substitute_entries).
+    """
     catalog_data = load_json_data("retailer_catalog.json")
-    prices_data = load_json_data("price_snapshots.json")
+    prices_data = load_latest_prices()
     stores_data = load_json_data("stores.json")
     
     # Build price lookup
@@ -150,40 +242,192 @@ def generate_price_dataset(parsed_products: List[ParsedProduct]) -> List[Dict[st
         stores_by_retailer[retailer_id].append(store)
     
     dataset = []
+    pack_index = get_pack_index() if pack_sizes else None
+    substitution_graph = get_substitution_graph() if substitutes else None
     
     for product in parsed_products:
-        # Find all retailer products for this canonical item
-        for catalog_item in catalog_data.get("retailer_products", []):
-            if catalog_item["canonical_id"] == product.canonical_id:
-                retailer_id = catalog_item["retailer_id"]
-                retailer_product_id = catalog_item["retailer_product_id"]
-                
-                # Check if we have price data for this product
-                if retailer_product_id in price_lookup and retailer_id in stores_by_retailer:
-                    price = price_lookup[retailer_product_id]
+        product_start = len(dataset)
+        pack_entries = pack_price_entries(product, pack_index, stores_by_retailer) if pack_index is not None else []
+        if pack_entries:
+            dataset.extend(pack_entries)
+        else:
+            # Find all retailer products for this canonical item
+            for catalog_item in catalog_data.get("retailer_products", []):
+                if catalog_item["canonical_id"] == product.canonical_id:
+                    retailer_id = catalog_item["retailer_id"]
+                    retailer_product_id = catalog_item["retailer_product_id"]
                     
-                    # Add entry for each store of this retailer
-                    for store_info in stores_by_retailer[retailer_id]:
-                        dataset.append({
-                            "canonical_id": product.canonical_id,
-                            "canonical_name": product.canonical_name,
-                            "requested_item": product.requested_item,
-                            "quantity": product.quantity,
-                            "retailer_id": retailer_id,
-                            "retailer_product_id": retailer_product_id,
-                            "product_name": catalog_item["name"],
-                            "price": price,
-                            "store_info": store_info
-                        })
+                    # Check if we have price data for this product
+                    if retailer_product_id in price_lookup and retailer_id in stores_by_retailer:
+                        price = price_lookup[retailer_product_id]
+                        
+                        # Add entry for each store of this retailer
+                        for store_info in stores_by_retailer[retailer_id]:
+                            dataset.append({
+                                "canonical_id": product.canonical_id,
+                                "canonical_name": product.canonical_name,
+                                "requested_item": product.requested_item,
+                                "quantity": product.quantity,
+                                "retailer_id": retailer_id,
+                                "retailer_product_id": retailer_product_id,
+                                "product_name": catalog_item["name"],
+                                "price": price,
+                                "store_info": store_info
+                            })
+        
+        if substitution_graph is not None:
+            priced_retailers = {entry["retailer_id"] for entry in dataset[product_start:]}
+            dataset.extend(substitute_entries(product, substitution_graph, stores_by_retailer, priced_retailers))
     
     return dataset
 
+def substitute_entries(
+    product: ParsedProduct,
+    substitution_graph: Dict[str, Dict[str, List[Dict[str, Any]]]],
+    stores_by_retailer: Dict[str, List[Dict[str, Any]]],
+    priced_retailers: set
+) -> List[Dict[str, Any]]:
+    """Price dataset entries offering each other retailer's best substitute for the item.
+
+    The entries keep the item's canonical_id, buy "substitute_packs" substitute packs
+    per requested pack, and carry "substitute_for" and the per-pack
+    "substitution_penalty"; route scoring only uses them for items no retailer in
+    the route sells.
+    """
+    entries = []
+    for retailer_id, stores in stores_by_retailer.items():
+        if retailer_id in priced_retailers:
+            continue
+        substitute = best_substitute(substitution_graph, retailer_id, product.canonical_id)
+        if substitute is None:
+            continue
+        for store_info in stores:
+            entries.append({
+                "canonical_id": product.canonical_id,
+                "canonical_name": product.canonical_name,
+                "requested_item": product.requested_item,
+                "quantity": product.quantity * substitute["packs"],
+                "retailer_id": retailer_id,
+                "retailer_product_id": substitute["retailer_product_id"],
+                "product_name": substitute["product_name"],
+                "price": substitute["price"],
+                "substitute_for": product.canonical_name,
+                "substitute_packs": substitute["packs"],
+                "substitution_penalty": substitute["penalty"] / substitute["packs"],
+                "store_info": store_info
+            })
+    return entries
+
+def requested_amount(product: ParsedProduct, catalog_product: Dict[str, Any]) -> float:
+    """Amount of the product wanted: quantity x the amount stated in the item text ("4L milk"), else x pack size."""
+    amount = parse_requested_amount(product.requested_item, catalog_product.get("unit_measure", ""))
+    if amount is None:
+        amount = catalog_product["unit_size"]
+    return amount * product.quantity
+
+def pack_price_entries(
+    product: ParsedProduct,
+    pack_index: Dict[str, Any],
+    stores_by_retailer: Dict[str, List[Dict[str, Any]]]
+) -> List[Dict[str, Any]]:
+    """Price dataset entries buying the requested amount as each retailer's cheapest pack mix.
+
+    Each entry has quantity 1 and the mix's total as its price, so route scoring is
+    unchanged; the chosen packs are kept under "packs" for the basket. Returns an empty
+    list for products outside the pack index.
+    """
+    catalog_product = pack_index["products"].get(product.canonical_id)
+    family = pack_index["families"].get(pack_index["product_families"].get(product.canonical_id))
+    if catalog_product is None or family is None or not catalog_product.get("unit_size"):
+        return []
+    
+    amount = requested_amount(product, catalog_product)
+    entries = []
+    for retailer_id, packs in family["retailers"].items():
+        if retailer_id not in stores_by_retailer:
+            continue
+        solution = cheapest_packs(packs, amount, family["unit_measure"])
+        if solution is None:
+            continue
+        product_name = " + ".join(
+            f"{pack['count']} x {pack['product_name']}" if pack["count"] > 1 else pack["product_name"]
+            for pack in solution["packs"]
+        )
+        for store_info in stores_by_retailer[retailer_id]:
+            entries.append({
+                "canonical_id": product.canonical_id,
+                "canonical_name": product.canonical_name,
+                "requested_item": product.requested_item,
+                "quantity": 1,
+                "retailer_id": retailer_id,
+                "retailer_product_id": solution["packs"][0]["retailer_product_id"],
+                "product_name": product_name,
+                "price": solution["price"],
+                "packs": solution["packs"],
+                "store_info": store_info
+            })
+    return entries
+
+def prune_closed_stores(
+    price_dataset: List[Dict[str, Any]],
+    user_location: Dict[str, float],
+    is_open: Callable[[Dict[str, Any], float], bool],
+    travel_model: Optional[TravelModel] = None
+) -> List[Dict[str, Any]]:
+    """Drop dataset entries for stores that are closed at the earliest possible arrival."""
+    travel_model = travel_model or get_travel_model()
+    store_is_open = {}
+    pruned_dataset = []
+    
+    for item in price_dataset:
+        store_info = item["store_info"]
+        store_id = store_info["store_id"]
+        if store_id not in store_is_open:
+            earliest_arrival = travel_model.minutes(user_location, store_info)
+            store_is_open[store_id] = is_open(store_info, earliest_arrival)
+        if store_is_open[store_id]:
+            pruned_dataset.append(item)
+    
+    return pruned_dataset
+
+def route_is_open_on_arrival(
+    user_location: Dict[str, float],
+    route_stores: List[Dict[str, Any]],
+    is_open: Callable[[Dict[str, Any], float], bool],
+    travel_model: Optional[TravelModel] = None,
+    service: Optional[Dict[str, float]] = None
+) -> bool:
+    """Check that every store in the route is open when the user gets there.
+
+    service maps retailer_id to the minutes spent in its store before moving on.
+    """
+    travel_model = travel_model or get_travel_model()
+    service = service or {}
+    elapsed = 0.0
+    current_place = user_location
+    for store in route_stores:
+        elapsed += travel_model.minutes(current_place, store)
+        if not is_open(store, elapsed):
+            return False
+        elapsed += service.get(store["retailer_id"], 0.0)
+        current_place = store
+    return True
+
 def generate_all_possible_retailer_routes(
     price_dataset: List[Dict[str, Any]], 
     user_location: Dict[str, float],
-    max_retailers: int = 3
+    max_retailers: int = 3,
+    is_open: Optional[Callable[[Dict[str, Any], float], bool]] = None,
+    travel_model: Optional[TravelModel] = None,
+    min_spend: Optional[Dict[str, float]] = None
 ) -> List[Dict[str, Any]]:
-    """Generate every possible route for all retailer subsets."""
+    """Generate every possible route for all retailer subsets.
+
+    When is_open is given, visiting orders that reach a closed store are skipped,
+    counting the in-store time at earlier stores (see in_store_minutes, which
+    min_spend is passed to).
+    """
+    travel_model = travel_model or get_travel_model()
     
     # Get unique retailers from dataset
     retailers = set()
@@ -218,17 +462,18 @@ def generate_all_possible_retailer_routes(
                     # Find closest store for this retailer
                     closest_store = min(
                         stores_by_retailer[retailer_id],
-                        key=lambda store: haversine_distance(
-                            user_location["lat"], user_location["lng"],
-                            store["location"]["lat"], store["location"]["lng"]
-                        )
+                        key=lambda store: travel_model.minutes(user_location, store)
                     )
                     closest_stores.append(closest_store)
             
             if len(closest_stores) == len(retailer_combination):
+                service = in_store_minutes(price_dataset, set(retailer_combination), min_spend) if is_open else None
+                
                 # Generate all permutations of visiting these stores (for TSP)
                 for store_permutation in itertools.permutations(closest_stores):
                     route = list(store_permutation)
+                    if is_open and not route_is_open_on_arrival(user_location, route, is_open, travel_model, service):
+                        continue
                     all_routes.append({
                         "stores": route,
                         "retailers": list(retailer_combination),
@@ -238,6 +483,161 @@ def generate_all_possible_retailer_routes(
     
     return all_routes
 
+def generate_store_level_routes(
+    price_dataset: List[Dict[str, Any]],
+    user_location: Dict[str, float],
+    max_retailers: int = 3,
+    stores_per_retailer: int = 5,
+    is_open: Optional[Callable[[Dict[str, Any], float], bool]] = None,
+    travel_model: Optional[TravelModel] = None,
+    min_spend: Optional[Dict[str, float]] = None
+) -> List[Dict[str, Any]]:
+    """Generate the fastest store-level route for every retailer subset.
+
+    Considers the k nearest stores of each retailer and jointly picks one store per
+    retailer and the visiting order with a dynamic program over (retailer subset, last
+    store). Prices only depend on the retailer subset, so the minimum round trip per
+    subset is all the scorer needs to find the optimal plan. When is_open is given,
+    transitions that arrive at a closed store are not taken, and the earliest
+    MAX_ARRIVAL_LABELS distinct arrival times are kept per state rather than only the
+    earliest: without waiting, a later arrival can be the only one that reaches a
+    store after it opens. Arrivals include the in-store time at earlier stores for the
+    items each retailer gets (see in_store_minutes, which min_spend is passed to).
+    """
+
+    travel_model = travel_model or get_travel_model()
+    
+    # Collect the k nearest unique stores for each retailer
+    stores_by_retailer = {}
+    for item in price_dataset:
+        retailer_id = item["retailer_id"]
+        store_info = item["store_info"]
+        retailer_stores = stores_by_retailer.setdefault(retailer_id, {})
+        retailer_stores.setdefault(store_info["store_id"], store_info)
+
+    retailer_list = sorted(stores_by_retailer.keys())
+    nodes = []  # (retailer index, store)
+    for retailer_index, retailer_id in enumerate(retailer_list):
+        nearest = sorted(
+            stores_by_retailer[retailer_id].values(),
+            key=lambda store: travel_model.minutes(user_location, store)
+        )[:stores_per_retailer]
+        for store in nearest:
+            nodes.append((retailer_index, store))
+
+    if not nodes:
+        return []
+
+    # Precompute leg times so the DP only does table lookups
+    num_nodes = len(nodes)
+    outbound = [travel_model.minutes(user_location, store) for _, store in nodes]
+    inbound = [travel_model.minutes(store, user_location) for _, store in nodes]
+    legs = [
+        [travel_model.minutes(nodes[i][1], nodes[j][1]) for j in range(num_nodes)]
+        for i in range(num_nodes)
+    ]
+    nodes_by_retailer = [[] for _ in retailer_list]
+    for node_index, (retailer_index, _) in enumerate(nodes):
+        nodes_by_retailer[retailer_index].append(node_index)
+
+    max_subset_size = min(max_retailers, len(retailer_list))
+
+    def search(subset_mask: int, service: List[float]) -> Dict[int, Dict[int, list]]:
+        # dp[mask][node] = labels (elapsed time, previous node, previous label), earliest
+        # first, for paths from the user that visit one store of every retailer in mask
+        # (a subset of subset_mask) and end at node, spending service[n] minutes at each
+        # earlier node n; only the fastest label is kept unless opening hours are
+        # checked. A mask's labels are final before any path extends them, so label
+        # indices stay valid.
+        max_labels = MAX_ARRIVAL_LABELS if is_open else 1
+        dp = {}
+        for node_index, (retailer_index, store) in enumerate(nodes):
+            if not subset_mask & (1 << retailer_index):
+                continue
+            if is_open and not is_open(store, outbound[node_index]):
+                continue
+            dp.setdefault(1 << retailer_index, {})[node_index] = [(outbound[node_index], None, None)]
+
+        # Adding a retailer always yields a larger mask, so numeric order is a valid DP order
+        for mask in range(1, subset_mask + 1):
+            states = dp.get(mask)
+            if not states or bin(mask).count("1") >= max_subset_size:
+                continue
+            for node_index, labels in states.items():
+                row = legs[node_index]
+                for retailer_index, candidates in enumerate(nodes_by_retailer):
+                    if mask & (1 << retailer_index) or not subset_mask & (1 << retailer_index):
+                        continue
+                    next_states = dp.setdefault(mask | (1 << retailer_index), {})
+                    for next_index in candidates:
+                        for label_index, (time_so_far, _, _) in enumerate(labels):
+                            candidate_time = time_so_far + service[node_index] + row[next_index]
+                            if is_open and not is_open(nodes[next_index][1], candidate_time):
+                                continue
+                            current = next_states.setdefault(next_index, [])
+                            position = bisect.bisect_left(current, (candidate_time,))
+                            if position >= max_labels or (position < len(current) and current[position][0] == candidate_time):
+                                continue
+                            current.insert(position, (candidate_time, node_index, label_index))
+                            if len(current) > max_labels:
+                                current.pop()
+        return dp
+
+    def fastest_path(dp: Dict[int, Dict[int, list]], mask: int, service: List[float]) -> Optional[List[Dict[str, Any]]]:
+        # Every path over mask spends the same time in store, so the earliest return is
+        # also the shortest round trip
+        states = dp.get(mask)
+        if not states:
+            return None
+        last_index, last_label = min(
+            ((index, label_index) for index, labels in states.items() for label_index in range(len(labels))),
+            key=lambda state: states[state[0]][state[1]][0] + service[state[0]] + inbound[state[0]]
+        )
+
+        path = []
+        current_mask = mask
+        node_index, label_index = last_index, last_label
+        while node_index is not None:
+            path.append(nodes[node_index][1])
+            _, previous_index, previous_label = dp[current_mask][node_index][label_index]
+            current_mask &= ~(1 << nodes[node_index][0])
+            node_index, label_index = previous_index, previous_label
+        path.reverse()
+        return path
+
+    if is_open:
+        # Arrival times depend on the minutes spent at earlier stores, which depend on
+        # the items each retailer gets in the final subset, so each subset gets its own
+        # search
+        paths = {}
+        for mask in range(1, 1 << len(retailer_list)):
+            if bin(mask).count("1") > max_subset_size:
+                continue
+            subset_service = in_store_minutes(
+                price_dataset,
+                {retailer_id for retailer_index, retailer_id in enumerate(retailer_list) if mask & (1 << retailer_index)},
+                min_spend
+            )
+            service = [subset_service.get(retailer_list[retailer_index], 0.0) for retailer_index, _ in nodes]
+            paths[mask] = fastest_path(search(mask, service), mask, service)
+    else:
+        service = [0.0] * num_nodes
+        dp = search((1 << len(retailer_list)) - 1, service)
+        paths = {mask: fastest_path(dp, mask, service) for mask in sorted(dp)}
+
+    all_routes = []
+    for mask, path in paths.items():
+        if not path:
+            continue
+        all_routes.append({
+            "stores": path,
+            "retailers": [store["retailer_id"] for store in path],
+            "num_stores": len(path),
+            "num_retailers": len(path)
+        })
+
+    return all_routes
+
 def haversine_distance(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
     """Calculate Haversine distance between two points in km."""
     R = 6371  # Earth's radius in km
@@ -255,27 +655,24 @@ def haversine_distance(lat1: float, lng1: float, lat2: float, lng2: float) -> fl
     
     return R * c
 
-def calculate_travel_time(user_location: Dict[str, float], route_stores: List[Dict[str, Any]]) -> float:
-    """Calculate travel time for a route using Haversine distance."""
+def calculate_travel_time(
+    user_location: Dict[str, float],
+    route_stores: List[Dict[str, Any]],
+    travel_model: Optional[TravelModel] = None
+) -> float:
+    """Calculate travel time for a route using the travel model."""
     if not route_stores:
         return 0.0
     
+    travel_model = travel_model or get_travel_model()
     total_time = 0.0
-    current_location = user_location
+    current_place = user_location
     
     for store in route_stores:
-        # Calculate distance using Haversine formula
-        distance = haversine_distance(
-            current_location["lat"], current_location["lng"],
-            store["location"]["lat"], store["location"]["lng"]
-        )
+        total_time += travel_model.minutes(current_place, store)
         
-        # Convert distance to time (assume 30 km/h average speed)
-        travel_time = (distance / 30.0) * 60.0  # Convert to minutes
-        total_time += travel_time
-        
-        # Update current location
-        current_location = store["location"]
+        # Update current position
+        current_place = store
     
     return total_time
 
@@ -284,7 +681,8 @@ def score_route(
     price_dataset: List[Dict[str, Any]], 
     user_location: Dict[str, float],
     time_weight: float = 0.2,
-    price_weight: float = 0.8
+    price_weight: float = 0.8,
+    travel_model: Optional[TravelModel] = None
 ) -> Dict[str, Any]:
     """Score a route based on time (20%) and price (80%)."""
     
@@ -314,7 +712,7 @@ def score_route(
             total_price += item["price"] * item["quantity"]
     
     # Calculate travel time
-    travel_time = calculate_travel_time(user_location, route_stores)
+    travel_time = calculate_travel_time(user_location, route_stores, travel_model)
     
     # Calculate in-store time (2 minutes per item)
     in_store_time = len(item_assignments) * 2.0
@@ -342,52 +740,67 @@ def score_route(
         "num_items": len(item_assignments)
     }
 
-def calculate_round_trip_time(user_location: Dict[str, float], route_stores: List[Dict[str, Any]]) -> float:
+def calculate_round_trip_time(
+    user_location: Dict[str, float],
+    route_stores: List[Dict[str, Any]],
+    travel_model: Optional[TravelModel] = None
+) -> float:
     """Calculate round trip travel time starting and ending at user location."""
     if not route_stores:
         return 0.0
     
+    travel_model = travel_model or get_travel_model()
     total_time = 0.0
-    current_location = user_location
+    current_place = user_location
     
     # Visit each store in order
     for store in route_stores:
-        # Calculate distance using Haversine formula
-        distance = haversine_distance(
-            current_location["lat"], current_location["lng"],
-            store["location"]["lat"], store["location"]["lng"]
-        )
+        total_time += travel_model.minutes(current_place, store)
         
-        # Convert distance to time (assume 30 km/h average speed)
-        travel_time = (distance / 30.0) * 60.0  # Convert to minutes
-        total_time += travel_time
-        
-        # Update current location to this store
-        current_location = store["location"]
+        # Update current position to this store
+        current_place = store
     
     # Return to starting location
-    if route_stores:
-        final_distance = haversine_distance(
-            current_location["lat"], current_location["lng"],
-            user_location["lat"], user_location["lng"]
-        )
-        final_travel_time = (final_distance / 30.0) * 60.0
-        total_time += final_travel_time
+    total_time += travel_model.minutes(current_place, user_location)
     
     return total_time
 
-def score_retailer_route(
-    route: Dict[str, Any], 
-    price_dataset: List[Dict[str, Any]], 
-    user_location: Dict[str, float],
+def compute_route_score(
+    total_price: float,
+    total_time: float,
     time_weight: float = 0.2,
     price_weight: float = 0.8
-) -> Dict[str, Any]:
-    """Score a retailer-based route based on price and time optimization."""
+) -> tuple:
+    """Return (price score, time score, weighted total score) for a route."""
+    # Normalize scores for comparison
+    # Assume max reasonable price is $100 and max reasonable time is 120 minutes
+    normalized_price_score = total_price / 100.0
+    normalized_time_score = total_time / 120.0
     
-    route_stores = route["stores"]
-    route_retailers = set(route["retailers"])
+    # Calculate weighted score (lower is better)
+    total_score = (price_weight * normalized_price_score) + (time_weight * normalized_time_score)
     
+    return normalized_price_score, normalized_time_score, total_score
+
+def option_cost(item: Dict[str, Any]) -> float:
+    """Line cost of a price dataset entry, plus its penalty if it is a substitute.
+
+    Compared per line rather than per pack, since substitutes for one item can need
+    different numbers of packs.
+    """
+    quantity = item.get("quantity", 1)
+    return item["price"] * quantity + item.get("substitution_penalty", 0.0) * quantity
+
+def choose_route_items(
+    price_dataset: List[Dict[str, Any]],
+    route_retailers: set,
+    min_spend: Optional[Dict[str, float]] = None
+) -> tuple:
+    """Return (available items, chosen item per canonical_id, min spend shortfall) for a route.
+
+    Prices only depend on the retailer, so the choice only depends on which retailers
+    the route visits.
+    """
     # Filter price dataset to only include items from retailers in this route
     available_items = [item for item in price_dataset if item["retailer_id"] in route_retailers]
     
@@ -399,14 +812,70 @@ def score_retailer_route(
             items_by_canonical_id[canonical_id] = []
         items_by_canonical_id[canonical_id].append(item)
     
+    # Drop substitutes for items the route can buy as requested
+    for canonical_id, item_options in items_by_canonical_id.items():
+        exact_options = [item for item in item_options if "substitute_for" not in item]
+        if exact_options and len(exact_options) < len(item_options):
+            items_by_canonical_id[canonical_id] = exact_options
+    
     # For each product, find the cheapest option from available retailers
+    min_spend_shortfall = 0.0
+    if min_spend is not None:
+        # Min spend couples the items, so solve the assignment for the whole basket
+        cheapest_per_retailer = {}
+        for canonical_id, item_options in items_by_canonical_id.items():
+            options = {}
+            for item in item_options:
+                current = options.get(item["retailer_id"])
+                if current is None or option_cost(item) < option_cost(current):
+                    options[item["retailer_id"]] = item
+            cheapest_per_retailer[canonical_id] = list(options.values())
+        chosen_items, min_spend_shortfall = assign_with_min_spend(cheapest_per_retailer, min_spend)
+    else:
+        chosen_items = {
+            canonical_id: min(item_options, key=option_cost)
+            for canonical_id, item_options in items_by_canonical_id.items()
+        }
+    
+    return available_items, chosen_items, min_spend_shortfall
+
+def in_store_minutes(
+    price_dataset: List[Dict[str, Any]],
+    route_retailers: set,
+    min_spend: Optional[Dict[str, float]] = None
+) -> Dict[str, float]:
+    """Minutes spent in each retailer's store by a route over route_retailers."""
+    _, chosen_items, _ = choose_route_items(price_dataset, route_retailers, min_spend)
+    
+    # In-store time is 2 minutes per item
+    items_per_retailer = Counter(item["retailer_id"] for item in chosen_items.values())
+    return {retailer_id: count * 2.0 for retailer_id, count in items_per_retailer.items()}
+
+def score_retailer_route(
+    route: Dict[str, Any], 
+    price_dataset: List[Dict[str, Any]], 
+    user_location: Dict[str, float],
+    time_weight: float = 0.2,
+    price_weight: float = 0.8,
+    travel_model: Optional[TravelModel] = None,
+    min_spend: Optional[Dict[str, float]] = None
+) -> Dict[str, Any]:
+    """Score a retailer-based route based on price and time optimization.
+
+    With min_spend (retailer_id -> click & collect minimum), items are assigned so that
+    each retailer used reaches its minimum where possible, and any remaining shortfall
+    is added to the price when scoring. Substitutes only stand in for items no retailer
+    in the route sells, and their penalties are added to the price when scoring.
+    """
+    
+    route_stores = route["stores"]
+    route_retailers = set(route["retailers"])
+    available_items, chosen_items, min_spend_shortfall = choose_route_items(price_dataset, route_retailers, min_spend)
+    
     item_assignments = {}
     total_price = 0.0
-    
-    for canonical_id, item_options in items_by_canonical_id.items():
-        # Find the cheapest option for this product
-        best_item = min(item_options, key=lambda x: x["price"])
-        
+    substitution_penalty = 0.0
+    for canonical_id, best_item in chosen_items.items():
         # Find the corresponding store in our route
         best_store = None
         for store in route_stores:
@@ -418,30 +887,30 @@ def score_retailer_route(
             item_assignments[canonical_id] = {
                 "store": best_store,
                 "item": best_item,
-                "total_price": best_item["price"] * best_item["quantity"]
+                "total_price": best_item["price"] * best_item["quantity"],
+                "substitution_penalty": best_item.get("substitution_penalty", 0.0) * best_item["quantity"]
             }
             total_price += best_item["price"] * best_item["quantity"]
+            substitution_penalty += item_assignments[canonical_id]["substitution_penalty"]
     
     # Calculate travel time for round trip
-    travel_time = calculate_round_trip_time(user_location, route_stores)
+    travel_time = calculate_round_trip_time(user_location, route_stores, travel_model)
     
     # Calculate in-store time (2 minutes per item)
     in_store_time = len(item_assignments) * 2.0
     
     total_time = travel_time + in_store_time
     
-    # Normalize scores for comparison
-    # Assume max reasonable price is $100 and max reasonable time is 120 minutes
-    normalized_price_score = total_price / 100.0
-    normalized_time_score = total_time / 120.0
-    
-    # Calculate weighted score (lower is better)
-    total_score = (price_weight * normalized_price_score) + (time_weight * normalized_time_score)
+    normalized_price_score, normalized_time_score, total_score = compute_route_score(
+        total_price + min_spend_shortfall + substitution_penalty, total_time, time_weight, price_weight
+    )
     
     return {
         "route": route,
         "item_assignments": item_assignments,
         "total_price": total_price,
+        "min_spend_shortfall": min_spend_shortfall,
+        "substitution_penalty": substitution_penalty,
         "travel_time": travel_time,
         "in_store_time": in_store_time,
         "total_time": total_time,
@@ -458,14 +927,16 @@ def find_optimal_route(
     price_dataset: List[Dict[str, Any]], 
     user_location: Dict[str, float],
     time_weight: float = 0.2,
-    price_weight: float = 0.8
+    price_weight: float = 0.8,
+    travel_model: Optional[TravelModel] = None
 ) -> Dict[str, Any]:
     """Find the route with the best score."""
     
+    travel_model = travel_model or get_travel_model()
     scored_routes = []
     
     for route in all_routes:
-        scored_route = score_route(route, price_dataset, user_location, time_weight, price_weight)
+        scored_route = score_route(route, price_dataset, user_location, time_weight, price_weight, travel_model)
         scored_routes.append(scored_route)
     
     # Sort by total score (lower is better)
@@ -473,25 +944,304 @@ def find_optimal_route(
     
     return scored_routes[0] if scored_routes else None
 
+def plan_signature(scored_route: Dict[str, Any]) -> frozenset:
+    """Identify a plan by the stores that actually receive items."""
+    return frozenset(
+        assignment["store"]["store_id"] for assignment in scored_route["item_assignments"].values()
+    )
+
+class RouteSelection:
+    """Running selection of the top_k distinct plans and the price/time Pareto frontier.
+
+    Routes are added as they are scored, and only the selection is kept: a max-heap
+    of the best route of up to top_k plan signatures, and the routes not dominated
+    on (total_price, total_time), cheapest first.
+    """
+
+    def __init__(self, top_k: int = 1):
+        self.top_k = max(top_k, 1)
+        self.heap: List[tuple] = []  # (-total_score, insertion order, signature, route)
+        self.by_signature: Dict[frozenset, tuple] = {}
+        self.frontier: List[Dict[str, Any]] = []
+        self.frontier_prices: List[float] = []
+        self.added = 0
+
+    def add(self, scored_route: Dict[str, Any]) -> None:
+        self.added += 1
+        self.add_to_top(scored_route)
+        self.add_to_frontier(scored_route)
+
+    def add_to_top(self, scored_route: Dict[str, Any]) -> None:
+        signature = plan_signature(scored_route)
+        entry = (-scored_route["total_score"], self.added, signature, scored_route)
+        current = self.by_signature.get(signature)
+        if current is not None:
+            # Another route of the same plan (e.g. a different visit order)
+            if entry[0] > current[0]:
+                self.heap.remove(current)
+                self.heap.append(entry)
+                heapq.heapify(self.heap)
+                self.by_signature[signature] = entry
+        elif len(self.heap) < self.top_k:
+            heapq.heappush(self.heap, entry)
+            self.by_signature[signature] = entry
+        elif entry[0] > self.heap[0][0]:
+            evicted = heapq.heapreplace(self.heap, entry)
+            del self.by_signature[evicted[2]]
+            self.by_signature[signature] = entry
+
+    def add_to_frontier(self, scored_route: Dict[str, Any]) -> None:
+        # The frontier's times strictly fall as its prices rise
+        price, route_time = scored_route["total_price"], scored_route["total_time"]
+        position = bisect.bisect_right(self.frontier_prices, price)
+        if position > 0 and self.frontier[position - 1]["total_time"] <= route_time:
+            return
+        start = position - 1 if position > 0 and self.frontier_prices[position - 1] == price else position
+        end = position
+        while end < len(self.frontier) and self.frontier[end]["total_time"] >= route_time:
+            end += 1
+        self.frontier[start:end] = [scored_route]
+        self.frontier_prices[start:end] = [price]
+
+    def result(self) -> Optional[Dict[str, Any]]:
+        """The best route, carrying "alternatives" and "pareto_frontier"; None if nothing was added."""
+        if not self.heap:
+            return None
+        ranked_routes = [entry[3] for entry in sorted(self.heap, key=lambda entry: (-entry[0], entry[1]))]
+        optimal_route = ranked_routes[0]
+        optimal_route["alternatives"] = ranked_routes[1:]
+        optimal_route["pareto_frontier"] = list(self.frontier)
+        return optimal_route
+
 def find_optimal_retailer_route(
     all_routes: List[Dict[str, Any]], 
     price_dataset: List[Dict[str, Any]], 
     user_location: Dict[str, float],
     time_weight: float = 0.2,
-    price_weight: float = 0.8
+    price_weight: float = 0.8,
+    top_k: int = 1,
+    travel_model: Optional[TravelModel] = None,
+    min_spend: Optional[Dict[str, float]] = None,
+    expires_at: Optional[float] = None
 ) -> Dict[str, Any]:
-    """Find the retailer-based route with the best score."""
+    """Find the retailer-based route with the best score.
+
+    The returned route also carries the next best distinct plans under "alternatives"
+    (up to top_k plans in total) and the price/time Pareto frontier under
+    "pareto_frontier", all gathered in the same scoring pass with memory bounded by
+    top_k and the frontier rather than the number of routes. Scoring stops at
+    expires_at (a time.monotonic() value) with the best route so far; "routes_scored"
+    records how many routes were scored.
+    """
+    
+    travel_model = travel_model or get_travel_model()
+    selection = RouteSelection(top_k)
+    for route in all_routes:
+        if expires_at is not None and selection.added and time.monotonic() >= expires_at:
+            print(f"[ShopLyft] Route budget exhausted after scoring {selection.added} of {len(all_routes)} routes")
+            break
+        selection.add(
+            score_retailer_route(route, price_dataset, user_location, time_weight, price_weight, travel_model, min_spend)
+        )
     
-    scored_routes = []
+    optimal_route = selection.result()
+    if optimal_route is not None:
+        optimal_route["routes_scored"] = selection.added
+    return optimal_route
+
+def route_score_lower_bound(
+    price_dataset: List[Dict[str, Any]],
+    user_location: Dict[str, float],
+    stores: List[Dict[str, Any]],
+    time_weight: float = 0.2,
+    price_weight: float = 0.8,
+    travel_model: Optional[TravelModel] = None
+) -> float:
+    """Lower bound on the score of any route over the given stores.
+
+    A route visiting retailer r buys at least every item r stocks, each at no less
+    than its cheapest price anywhere and with two minutes in store, and leaves and
+    returns home once. So no route scores below the smallest such bound over the
+    retailers.
+    """
+    travel_model = travel_model or get_travel_model()
+    cheapest: Dict[str, float] = {}
+    stocked: Dict[str, set] = {}
+    for item in price_dataset:
+        canonical_id = item["canonical_id"]
+        stocked.setdefault(item["retailer_id"], set()).add(canonical_id)
+        line_total = item["price"] * item["quantity"]
+        if line_total < cheapest.get(canonical_id, float("inf")):
+            cheapest[canonical_id] = line_total
     
-    for route in all_routes:
-        scored_route = score_retailer_route(route, price_dataset, user_location, time_weight, price_weight)
-        scored_routes.append(scored_route)
+    if not stores:
+        return 0.0
+    travel_bound = (
+        min(travel_model.minutes(user_location, store) for store in stores)
+        + min(travel_model.minutes(store, user_location) for store in stores)
+    )
+    return min(
+        compute_route_score(
+            sum(cheapest[canonical_id] for canonical_id in stocked.get(retailer_id, ())),
+            travel_bound + len(stocked.get(retailer_id, ())) * 2.0,
+            time_weight, price_weight
+        )[2]
+        for retailer_id in {store["retailer_id"] for store in stores}
+    )
+
+def anytime_retailer_route(
+    price_dataset: List[Dict[str, Any]],
+    user_location: Dict[str, float],
+    request: OptimizationRequest,
+    top_k: int = 1,
+    travel_model: Optional[TravelModel] = None,
+    min_spend: Optional[Dict[str, float]] = None,
+    expires_at: Optional[float] = None
+) -> Optional[Dict[str, Any]]:
+    """Find a route with the anytime local search instead of enumerating candidates.
+
+    Considers the request's nearest stores per retailer and scores routes with
+    score_retailer_route. The result has the same shape as find_optimal_retailer_route,
+    with alternatives and the Pareto frontier drawn from every route scored, plus
+    "lower_bound", "optimality_gap" and "converged" (False if the deadline cut the
+    search short).
+    """
+    travel_model = travel_model or get_travel_model()
+    is_open = None
+    if request.departure_time is not None:
+        is_open = make_open_check(request.departure_time)
+        price_dataset = prune_closed_stores(price_dataset, user_location, is_open, travel_model)
+    
+    # Prices only depend on the retailer, so score against one entry per product and retailer
+    scoring_dataset = []
+    seen = set()
+    for item in price_dataset:
+        if (item["canonical_id"], item["retailer_id"]) not in seen:
+            seen.add((item["canonical_id"], item["retailer_id"]))
+            scoring_dataset.append(item)
     
-    # Sort by total score (lower is better)
-    scored_routes.sort(key=lambda x: x["total_score"])
+    stores_by_retailer: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    for item in price_dataset:
+        stores_by_retailer.setdefault(item["retailer_id"], {}).setdefault(item["store_info"]["store_id"], item["store_info"])
+    candidates = {
+        retailer_id: sorted(stores.values(), key=lambda store: travel_model.minutes(user_location, store))[:request.stores_per_retailer]
+        for retailer_id, stores in stores_by_retailer.items()
+    }
     
-    return scored_routes[0] if scored_routes else None
+    service_by_retailers: Dict[frozenset, Dict[str, float]] = {}
+    
+    def score(stores: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        if is_open:
+            retailers = frozenset(store["retailer_id"] for store in stores)
+            if retailers not in service_by_retailers:
+                service_by_retailers[retailers] = in_store_minutes(scoring_dataset, retailers, min_spend)
+            if not route_is_open_on_arrival(user_location, stores, is_open, travel_model, service_by_retailers[retailers]):
+                return None
+        route = {
+            "stores": stores,
+            "retailers": [store["retailer_id"] for store in stores],
+            "num_stores": len(stores),
+            "num_retailers": len(stores)
+        }
+        return score_retailer_route(
+            route, scoring_dataset, user_location, request.time_weight, request.price_weight, travel_model, min_spend
+        )
+    
+    search = AnytimeRouteSearch(
+        candidates, score, request.max_stores,
+        expires_at if expires_at is not None else time.monotonic() + ANYTIME_TIME_LIMIT_SECONDS
+    )
+    if search.run() is None:
+        return None
+    
+    optimal_route = select_top_routes(search.feasible_routes(), top_k)
+    lower_bound = route_score_lower_bound(
+        price_dataset, user_location, [store for stores in candidates.values() for store in stores],
+        request.time_weight, request.price_weight, travel_model
+    )
+    optimal_route["routes_scored"] = len(search.scored)
+    optimal_route["converged"] = search.converged
+    optimal_route["lower_bound"] = lower_bound
+    optimal_route["optimality_gap"] = optimality_gap(optimal_route["total_score"], lower_bound)
+    print(f"[ShopLyft] Anytime search scored {len(search.scored)} routes in {search.rounds} rounds, gap {optimal_route['optimality_gap']:.1%}")
+    return optimal_route
+
+def split_retailer_route(
+    price_dataset: List[Dict[str, Any]],
+    shopper_locations: List[Dict[str, float]],
+    request: SplitOptimizationRequest,
+    travel_model: Optional[TravelModel] = None,
+    min_spend: Optional[Dict[str, float]] = None
+) -> Optional[Dict[str, Any]]:
+    """Find the retailers to visit and their split between shoppers with the best score.
+
+    Every retailer subset up to max_stores is priced with score_retailer_route, and
+    its retailers are split between the shoppers to minimize the longest trip, each
+    retailer being visited at its nearest store to one of the shoppers. The score
+    weighs the price against that makespan. The result is the priced route with the
+    makespan score and "split" (see solve_split).
+    """
+    travel_model = travel_model or get_travel_model()
+    stores_by_retailer: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    for item in price_dataset:
+        stores_by_retailer.setdefault(item["retailer_id"], {}).setdefault(item["store_info"]["store_id"], item["store_info"])
+    
+    candidates = {}
+    for retailer_id, stores in stores_by_retailer.items():
+        nearest = {}
+        for start in shopper_locations:
+            store = min(stores.values(), key=lambda store: travel_model.minutes(start, store))
+            nearest[store["store_id"]] = store
+        candidates[retailer_id] = list(nearest.values())
+    
+    best_route = None
+    retailer_list = sorted(candidates)
+    for num_retailers in range(1, min(len(retailer_list), request.max_stores) + 1):
+        for retailer_combination in itertools.combinations(retailer_list, num_retailers):
+            route = {
+                "stores": [candidates[retailer_id][0] for retailer_id in retailer_combination],
+                "retailers": list(retailer_combination),
+                "num_stores": num_retailers,
+                "num_retailers": num_retailers
+            }
+            priced_route = score_retailer_route(
+                route, price_dataset, shopper_locations[0], request.time_weight, request.price_weight,
+                travel_model, min_spend
+            )
+            items_per_retailer = Counter(
+                assignment["item"]["retailer_id"] for assignment in priced_route["item_assignments"].values()
+            )
+            if len(items_per_retailer) < num_retailers:
+                # A smaller subset buys the same items
+                continue
+            
+            # In-store time is 2 minutes per item
+            service = {retailer_id: count * 2.0 for retailer_id, count in items_per_retailer.items()}
+            split = solve_split(
+                shopper_locations, {retailer_id: candidates[retailer_id] for retailer_id in retailer_combination},
+                service, travel_model.minutes
+            )
+            price_score, time_score, total_score = compute_route_score(
+                priced_route["total_price"] + priced_route["min_spend_shortfall"] + priced_route["substitution_penalty"],
+                split["makespan"], request.time_weight, request.price_weight
+            )
+            if best_route is None or total_score < best_route["total_score"]:
+                best_route = {
+                    **priced_route,
+                    "split": split,
+                    "price_score": price_score,
+                    "time_score": time_score,
+                    "total_score": total_score
+                }
+    
+    return best_route
+
+def select_top_routes(scored_routes: List[Dict[str, Any]], top_k: int = 1) -> Optional[Dict[str, Any]]:
+    """Pick the best scored route, attaching alternatives and the Pareto frontier (see RouteSelection)."""
+    selection = RouteSelection(top_k)
+    for scored_route in scored_routes:
+        selection.add(scored_route)
+    return selection.result()
 
 def calculate_single_store_baseline(price_dataset: List[Dict[str, Any]], parsed_products: List[ParsedProduct]) -> float:
     """Calculate the cost if shopping at the most expensive single store."""
@@ -522,30 +1272,31 @@ def calculate_single_store_baseline(price_dataset: List[Dict[str, Any]], parsed_
     # Return the highest single-retailer cost
     return max(retailer_totals.values()) if retailer_totals else 0.0
 
-def generate_route_segments(user_location: Dict[str, float], route_stores: List[Dict[str, Any]]) -> List[RouteSegment]:
+def generate_route_segments(
+    user_location: Dict[str, float],
+    route_stores: List[Dict[str, Any]],
+    travel_model: Optional[TravelModel] = None
+) -> List[RouteSegment]:
     """Generate route segments between stores."""
+    travel_model = travel_model or get_travel_model()
     segments = []
-    current_location = user_location
+    current_place = user_location
     
     for i, store in enumerate(route_stores):
         # Calculate distance and time to this store
-        distance = haversine_distance(
-            current_location["lat"], current_location["lng"],
-            store["location"]["lat"], store["location"]["lng"]
-        )
-        travel_time = (distance / 30.0) * 60.0  # 30 km/h to minutes
+        distance, travel_time = travel_model.leg(current_place, store)
         
-        segment = RouteSegment(
+        segment = RouteSegment.model_construct(
             from_store_id=None if i == 0 else route_stores[i-1]["store_id"],
             to_store_id=store["store_id"],
             distance_km=round(distance, 2),
             travel_time_min=round(travel_time, 1),
-            travel_method="walking"
+            travel_method=travel_model.travel_method
         )
         segments.append(segment)
         
-        # Update current location
-        current_location = store["location"]
+        # Update current position
+        current_place = store
     
     return segments
 
@@ -825,23 +1576,32 @@ async def search_woolworths_product_simple_browser(product_name: str) -> Optiona
         return None
 
 async def search_woolworths_product(product_name: str) -> Optional[str]:
-    """Search Woolworths for a product and return the cheapest item's link."""
-    
-    # Strategy 1: Try simple browser approach first (Firefox, less detection)
-    print(f"[ShopLyft] Attempting simple browser search for '{product_name}'")
-    result = await search_woolworths_product_simple_browser(product_name)
-    if result:
-        return result
-    
-    # Strategy 2: Try full browser method with stealth (Chromium)
-    print(f"[ShopLyft] Simple browser failed, trying full browser method for '{product_name}'")
-    result = await search_woolworths_product_with_browser(product_name)
-    if result:
-        return result
-    
-    # Strategy 3: Fallback to HTTP method
-    print(f"[ShopLyft] All browser methods failed, trying HTTP fallback for '{product_name}'")
-    return await search_woolworths_product_fallback(product_name)
+    """Search Woolworths for a product, sharing the search with concurrent requests for the same product."""
+    return await search_flights.do(normalize_text(product_name), lambda: scrape_woolworths_product(product_name))
+
+def is_product_link(url: Any) -> bool:
+    """Whether a search result is a Woolworths product page (not a search page fallback)."""
+    return isinstance(url, str) and url.startswith("https://") and "/shop/productdetails/" in url
+
+async def scrape_woolworths_product(product_name: str) -> Optional[str]:
+    """Search Woolworths for a product and return the cheapest item's link.
+
+    The strategies race as a hedge: the HTTP request starts first and each browser
+    joins if no product link has arrived after its hedge delay. The first product
+    link wins and the other searches are cancelled; if none finds one, the HTTP
+    fallback's search page link is returned. The order and delays adapt to each
+    strategy's observed win rate and latency.
+    """
+    print(f"[ShopLyft] Starting hedged Woolworths search for '{product_name}'")
+    return await hedged_race(
+        [
+            ("http", lambda: search_woolworths_product_fallback(product_name)),
+            ("firefox", lambda: search_woolworths_product_simple_browser(product_name)),
+            ("chromium", lambda: search_woolworths_product_with_browser(product_name)),
+        ],
+        is_product_link,
+        search_strategy_stats
+    )
 
 async def extract_any_product_link(html_content: str, search_term: str) -> Optional[str]:
     """Extract any valid product link from Woolworths search results."""
@@ -1269,21 +2029,37 @@ async def generate_product_links_async(retailer_id: str, items: List[RouteItem])
         return await generate_woolworths_links(items)
     else:
         # Fallback for other retailers (placeholder implementation)
-        base_urls = {
-            "coles": "https://www.coles.com.au/product/",
-            "aldi": "https://www.aldi.com.au/product/"
-        }
-        
-        links = []
-        base_url = base_urls.get(retailer_id, "")
-        
-        for item in items:
-            # Generate a placeholder link based on product name
-            product_slug = item.product_name.lower().replace(" ", "-").replace("'", "")
-            link = f"{base_url}{product_slug}"
-            links.append(link)
-        
-        return links
+        return [generate_placeholder_link(retailer_id, item.product_name) for item in items]
+
+def generate_placeholder_link(retailer_id: str, product_name: str) -> str:
+    """Generate a placeholder product link based on product name."""
+    base_urls = {
+        "coles": "https://www.coles.com.au/product/",
+        "aldi": "https://www.aldi.com.au/product/"
+    }
+    
+    base_url = base_urls.get(retailer_id, "")
+    product_slug = product_name.lower().replace(" ", "-").replace("'", "")
+    return f"{base_url}{product_slug}"
+
+def generate_links_without_scraping(
+    retailer_id: str,
+    items: List[RouteItem],
+    known_links: Dict[tuple, str]
+) -> List[str]:
+    """Generate links for a basket, reusing already scraped links instead of searching again."""
+    links = []
+    
+    for item in items:
+        link = known_links.get((retailer_id, item.product_name))
+        if link is None:
+            if retailer_id == "woolworths":
+                link = generate_woolworths_fallback_link(item.product_name)
+            else:
+                link = generate_placeholder_link(retailer_id, item.product_name)
+        links.append(link)
+    
+    return links
 
 async def validate_woolworths_link(url: str) -> bool:
     """Validate if a Woolworths link is accessible."""
@@ -1334,6 +2110,529 @@ async def generate_woolworths_links(items: List[RouteItem]) -> List[str]:
     
     return links
 
+def build_store_baskets(item_assignments: Dict[str, Any]) -> List[StoreBasket]:
+    """Group assigned items into per-store baskets with click & collect info."""
+    # Group items by store
+    store_baskets = {}
+    for canonical_id, assignment in item_assignments.items():
+        store = assignment["store"]
+        retailer_id = store["retailer_id"]
+    
+        if retailer_id not in store_baskets:
+            store_baskets[retailer_id] = {
+                "store_info": store,
+                "items": [],
+                "subtotal": 0.0
+            }
+    
+        item = assignment["item"]
+        line_total = item["price"] * item["quantity"]
+    
+        if "packs" in item:
+            # A pack-size mix is one line per pack size bought
+            for pack in item["packs"]:
+                store_baskets[retailer_id]["items"].append({
+                    "item_requested": item["requested_item"],
+                    "product_name": pack["product_name"],
+                    "quantity": pack["count"],
+                    "unit_price": pack["price"],
+                    "line_total": round(pack["price"] * pack["count"], 2)
+                })
+        else:
+            store_baskets[retailer_id]["items"].append({
+                "item_requested": item["requested_item"],
+                "product_name": item["product_name"],
+                "quantity": item["quantity"],
+                "unit_price": item["price"],
+                "line_total": line_total,
+                "substitute_for": item.get("substitute_for")
+            })
+    
+        store_baskets[retailer_id]["subtotal"] += line_total
+    
+    # Build store baskets with click & collect info
+    retailers_data = load_json_data("retailers.json")
+    basket_list = []
+    
+    for retailer_id, basket_data in store_baskets.items():
+        store_info = basket_data["store_info"]
+    
+        # Check Click & Collect eligibility
+        min_spend = 0
+        for retailer in retailers_data.get("retailers", []):
+            if retailer["retailer_id"] == retailer_id:
+                min_spend = retailer.get("click_collect", {}).get("min_spend", 0)
+                break
+    
+        meets_min_spend = basket_data["subtotal"] >= min_spend
+    
+        # Convert to RouteStore (data files and computed prices are trusted, so skip validation)
+        route_store = RouteStore.model_construct(
+            store_id=store_info["store_id"],
+            retailer_id=store_info["retailer_id"],
+            name=store_info["name"],
+            address=store_info["address"],
+            suburb=store_info["suburb"],
+            postcode=store_info["postcode"],
+            location=Location.model_construct(**store_info["location"])
+        )
+    
+        # Convert items to RouteItem
+        route_items = []
+        for item in basket_data["items"]:
+            route_items.append(RouteItem.model_construct(
+                item_requested=item["item_requested"],
+                product_name=item["product_name"],
+                quantity=item["quantity"],
+                unit_price=item["unit_price"],
+                line_total=item["line_total"],
+                substitute_for=item.get("substitute_for")
+            ))
+    
+        basket_list.append(StoreBasket.model_construct(
+            store_info=route_store,
+            items=route_items,
+            links=[],  # Will be populated below
+            subtotal=basket_data["subtotal"],
+            click_collect_eligible=meets_min_spend,
+            min_spend_required=float(min_spend)
+        ))
+    
+    return basket_list
+
+def build_plan_alternatives(
+    optimal_route: Dict[str, Any],
+    user_location: Dict[str, float],
+    primary_baskets: List[StoreBasket],
+    travel_model: Optional[TravelModel] = None
+) -> tuple:
+    """Build alternative plans and the Pareto frontier from an optimal route.
+
+    Alternatives are the next best distinct plans plus any Pareto-optimal plans not
+    already among them. Their links reuse what was scraped for the primary plan.
+    """
+    known_links = {}
+    for basket in primary_baskets:
+        for item, link in zip(basket.items, basket.links):
+            known_links[(basket.store_info.retailer_id, item.product_name)] = link
+    
+    frontier = optimal_route.get("pareto_frontier", [])
+    frontier_ids = {id(scored_route) for scored_route in frontier}
+    
+    candidates = []
+    seen_ids = {id(optimal_route)}
+    for scored_route in optimal_route.get("alternatives", []) + frontier:
+        if id(scored_route) not in seen_ids:
+            seen_ids.add(id(scored_route))
+            candidates.append(scored_route)
+    candidates.sort(key=lambda x: x["total_score"])
+    
+    alternatives = []
+    for scored_route in candidates:
+        route_stores = scored_route["route"]["stores"]
+        baskets = build_store_baskets(scored_route["item_assignments"])
+        for basket in baskets:
+            basket.links = generate_links_without_scraping(
+                basket.store_info.retailer_id, basket.items, known_links
+            )
+        
+        alternatives.append(PlanAlternative.model_construct(
+            retailers=[store["retailer_id"] for store in route_stores],
+            total_cost=scored_route["total_price"],
+            total_time=scored_route["total_time"],
+            travel_time=scored_route["travel_time"],
+            shopping_time=scored_route["in_store_time"],
+            route_score=scored_route["total_score"],
+            num_stores=len(route_stores),
+            stores=baskets,
+            route_segments=generate_route_segments(user_location, route_stores, travel_model),
+            pareto_optimal=id(scored_route) in frontier_ids
+        ))
+    
+    pareto_frontier = [
+        ParetoPoint.model_construct(
+            retailers=[store["retailer_id"] for store in scored_route["route"]["stores"]],
+            total_cost=scored_route["total_price"],
+            total_time=scored_route["total_time"],
+            route_score=scored_route["total_score"]
+        )
+        for scored_route in frontier
+    ]
+    
+    return alternatives, pareto_frontier
+
+def parse_grocery_list(grocery_list: str, timeout: Optional[float] = None) -> ParsedShoppingList:
+    """Parse a natural language grocery list into catalog products using AI.
+
+    timeout (seconds) bounds the LLM request.
+    """
+    products_data = load_json_data("products.json")
+    
+    # Build product catalog context for AI - ONLY from products.json
+    catalog_context = "ONLY use these pre-existing products from the catalog:\n"
+    for product in products_data.get("products", []):
+        catalog_context += f"- {product['canonical_id']}: {product['canonical_name']} (aliases: {', '.join(product['aliases'])})\n"
+    
+    # Use AI to parse items with strict constraints
+    return llm_do(
+        f"""
+        Parse this grocery list into the product catalog:
+        
+        Grocery list: "{grocery_list}"
+        
+        {catalog_context}
+        
+        CRITICAL RULES:
+        1. ONLY match items to canonical_id values that exist in the catalog above
+        2. Do NOT create new products or canonical_ids
+        3. Extract quantity if mentioned (default to 1)
+        4. Assign confidence score (0.0-1.0) based on match quality
+        5. List unmatched items separately - items that don't match any catalog entry
+        6. Be VERY conservative - only parse items you're confident match existing products
+        7. If an item doesn't clearly match a catalog entry, put it in unmatched_items
+        
+        Return structured parsing with canonical_id, canonical_name, requested_item, quantity, and confidence.
+        """,
+        output=ParsedShoppingList,
+        temperature=0.1,
+        **({"timeout": timeout} if timeout is not None else {})
+    )
+
+async def parse_grocery_list_shared(grocery_list: str, timeout: Optional[float] = None) -> ParsedShoppingList:
+    """Parse a grocery list in the threadpool, sharing one LLM call between concurrent identical lists.
+
+    Successful parses are remembered for fallback_parse. With a timeout, raises
+    asyncio.TimeoutError when it passes; the shared parse keeps running for the
+    other callers and still fills the cache. The LLM call itself is not given the
+    timeout, since its callers can have different budgets.
+    """
+    key = normalize_text(grocery_list)
+    
+    async def parse_and_remember() -> ParsedShoppingList:
+        parsed_list = await run_in_threadpool(parse_grocery_list, grocery_list)
+        remember_parse(key, parsed_list)
+        return parsed_list
+    
+    return await asyncio.wait_for(parse_flights.do(key, parse_and_remember), timeout)
+
+def remember_parse(key: str, parsed_list: ParsedShoppingList) -> None:
+    cache_key = (key, data_version("products.json"))
+    parse_cache[cache_key] = parsed_list
+    parse_cache.move_to_end(cache_key)
+    while len(parse_cache) > PARSE_CACHE_SIZE:
+        parse_cache.popitem(last=False)
+
+def fallback_parse(grocery_list: str) -> ParsedShoppingList:
+    """Parse without the LLM: the last parse of the same list, or a catalog search per item.
+
+    Each comma, semicolon or line separated item is matched to its best product
+    search hit, with a leading number taken as the quantity.
+    """
+    cached = parse_cache.get((normalize_text(grocery_list), data_version("products.json")))
+    if cached is not None:
+        print("[ShopLyft] Using cached parse for grocery list")
+        return cached
+    
+    print("[ShopLyft] Matching grocery list against the catalog without the LLM")
+    parsed_products, unmatched_items = [], []
+    for item in re.split(r"[,;\n]+", grocery_list):
+        item = item.strip()
+        if not item:
+            continue
+        quantity = 1
+        match = re.match(r"^(\d+)\s*x?\s+(.+)$", item, re.IGNORECASE)
+        text = item
+        if match:
+            quantity, text = int(match.group(1)), match.group(2)
+        products, _ = product_search.search(text, limit=1)
+        if products:
+            parsed_products.append(ParsedProduct(
+                canonical_id=products[0]["canonical_id"],
+                canonical_name=products[0]["canonical_name"],
+                requested_item=item,
+                quantity=quantity,
+                confidence=FALLBACK_PARSE_CONFIDENCE
+            ))
+        else:
+            unmatched_items.append(item)
+    
+    return ParsedShoppingList(
+        parsed_products=parsed_products,
+        unmatched_items=unmatched_items,
+        parsing_confidence=FALLBACK_PARSE_CONFIDENCE if parsed_products else 0.0
+    )
+
+def generate_candidate_routes(
+    price_dataset: List[Dict[str, Any]],
+    user_location: Dict[str, float],
+    request: OptimizationRequest
+) -> List[Dict[str, Any]]:
+    """Generate candidate routes for the requested search mode.
+
+    With a departure time, stores closed on arrival are pruned before enumeration.
+    """
+    travel_model = get_travel_model(request.travel_mode.value)
+    min_spend = get_min_spend_index() if request.click_collect else None
+    is_open = None
+    if request.departure_time is not None:
+        is_open = make_open_check(request.departure_time)
+        price_dataset = prune_closed_stores(price_dataset, user_location, is_open, travel_model)
+    
+    if request.search_mode == SearchMode.STORE:
+        return generate_store_level_routes(
+            price_dataset, user_location, request.max_stores, request.stores_per_retailer, is_open, travel_model,
+            min_spend
+        )
+    return generate_all_possible_retailer_routes(
+        price_dataset, user_location, request.max_stores, is_open, travel_model, min_spend
+    )
+
+def fill_basket_links(basket: StoreBasket, known_links: Dict[tuple, str]) -> None:
+    """Set a basket's links from known links; links are parallel to items, so any gap leaves none."""
+    retailer_id = basket.store_info.retailer_id
+    links = [
+        known_links[(retailer_id, item.product_name)]
+        for item in basket.items
+        if (retailer_id, item.product_name) in known_links
+    ]
+    basket.links = links if len(links) == len(basket.items) else []
+
+def emit_basket_links(progress: Optional[ProgressCallback], basket: StoreBasket) -> None:
+    emit_progress(progress, "basket_links", {
+        "retailer_id": basket.store_info.retailer_id,
+        "store_id": basket.store_info.store_id,
+        "links": basket.links
+    })
+
+async def attach_product_links(
+    basket_list: List[StoreBasket],
+    known_links: Optional[Dict[tuple, str]] = None,
+    progress: Optional[ProgressCallback] = None,
+    timeout: Optional[float] = None
+) -> bool:
+    """Add product links to store baskets, only searching for products without a known link.
+
+    Each basket's links are reported as soon as its own searches finish. Baskets
+    whose searches outlast timeout (seconds) get search page links instead; returns
+    False if any did.
+    """
+    if known_links is None:
+        known_links = {}
+    
+    # Search concurrently for the products we have no link for yet
+    link_tasks = []
+    for basket in basket_list:
+        retailer_id = basket.store_info.retailer_id
+        missing_items = [item for item in basket.items if (retailer_id, item.product_name) not in known_links]
+        if missing_items:
+            link_tasks.append(resolve_basket_links(basket, missing_items, known_links, progress, timeout))
+        else:
+            fill_basket_links(basket, known_links)
+            emit_basket_links(progress, basket)
+    
+    # Execute all link generation tasks concurrently with error handling
+    try:
+        return all(await asyncio.gather(*link_tasks))
+    except Exception as e:
+        print(f"[ShopLyft] Error in concurrent link generation: {str(e)}")
+        return True
+
+async def resolve_basket_links(
+    basket: StoreBasket,
+    missing_items: List[RouteItem],
+    known_links: Dict[tuple, str],
+    progress: Optional[ProgressCallback] = None,
+    timeout: Optional[float] = None
+) -> bool:
+    """Search for one basket's missing links, then fill and report the basket.
+
+    Returns False if the searches outlasted timeout and fallback links were used.
+    """
+    retailer_id = basket.store_info.retailer_id
+    completed = True
+    try:
+        links = await asyncio.wait_for(generate_product_links_async(retailer_id, missing_items), timeout)
+        for item, link in zip(missing_items, links):
+            known_links[(retailer_id, item.product_name)] = link
+    except asyncio.TimeoutError:
+        print(f"[ShopLyft] Link budget exhausted for {retailer_id}, using search links")
+        completed = False
+    except Exception as e:
+        print(f"[ShopLyft] Link generation failed for {retailer_id}: {e}")
+    
+    if completed:
+        fill_basket_links(basket, known_links)
+    else:
+        # Fallbacks are not remembered, so a later request searches again
+        basket.links = generate_links_without_scraping(retailer_id, basket.items, known_links)
+    emit_basket_links(progress, basket)
+    return completed
+
+def build_starting_location(location_input: str, user_location: Dict[str, float]) -> StartingLocation:
+    """Create starting location with proper address formatting."""
+    # If location is coordinates, use them directly for Google Maps compatibility
+    display_address = location_input
+    if "," in location_input and len(location_input.split(",")) == 2:
+        # This looks like coordinates, use them directly for Google Maps
+        try:
+            lat, lng = location_input.split(",")
+            lat_f = float(lat.strip())
+            lng_f = float(lng.strip())
+            # Use coordinates directly for Google Maps compatibility
+            display_address = f"{lat_f},{lng_f}"
+        except ValueError:
+            # If parsing fails, use original location
+            display_address = location_input
+    
+    return StartingLocation(
+        address=display_address,
+        coordinates=Location(lat=user_location["lat"], lng=user_location["lng"])
+    )
+
+async def assemble_shopping_plan(
+    optimal_route: Dict[str, Any],
+    price_dataset: List[Dict[str, Any]],
+    parsed_products: List[ParsedProduct],
+    user_location: Dict[str, float],
+    location_input: str,
+    num_alternatives: int = 0,
+    known_links: Optional[Dict[tuple, str]] = None,
+    travel_model: Optional[TravelModel] = None,
+    progress: Optional[ProgressCallback] = None,
+    deadline: Optional[Deadline] = None
+) -> ShoppingPlan:
+    """Turn an optimal route into a shopping plan with baskets, links and alternatives.
+
+    The plan is reported as a "route" event before any product links are searched.
+    With a deadline, link searches get the "links" stage budget.
+    """
+    route_stores = optimal_route["route"]["stores"]
+    item_assignments = optimal_route["item_assignments"]
+    
+    # Group items into store baskets
+    basket_list = build_store_baskets(item_assignments)
+    
+    # Calculate total savings (compare to single most expensive store)
+    single_store_cost = calculate_single_store_baseline(price_dataset, parsed_products)
+    total_savings = max(0.0, single_store_cost - optimal_route["total_price"])
+    
+    starting_location = build_starting_location(location_input, user_location)
+    
+    # Generate route segments
+    route_segments = generate_route_segments(user_location, route_stores, travel_model)
+    
+    # Create optimization details
+    optimization_details = OptimizationDetails.model_construct(
+        price_component=optimal_route["price_score"],
+        time_component=optimal_route["time_score"],
+        total_items=optimal_route["num_items"],
+        stores_count=len(route_stores),
+        optimality_gap=optimal_route.get("optimality_gap")
+    )
+    
+    # Debug: Print the data being used to create the shopping plan
+    print(f"[ShopLyft] Creating shopping plan with:")
+    print(f"  - total_savings: {total_savings}")
+    print(f"  - starting_location: {starting_location}")
+    print(f"  - route_segments: {len(route_segments)} segments")
+    print(f"  - optimization_details: {optimization_details}")
+    print(f"  - stores/store_baskets: {len(basket_list)} stores")
+    
+    # Create shopping plan from trusted internal data without re-validation
+    shopping_plan = ShoppingPlan.model_construct(
+        total_cost=optimal_route["total_price"],
+        total_time=optimal_route["total_time"],
+        travel_time=optimal_route["travel_time"],
+        shopping_time=optimal_route["in_store_time"],
+        total_savings=total_savings,
+        route_score=optimal_route["total_score"],
+        starting_location=starting_location,
+        stores=basket_list,  # Frontend expects 'stores'
+        route_segments=route_segments,
+        optimization_details=optimization_details,
+        num_stores=len(route_stores),
+        store_baskets=basket_list,  # Backend compatibility
+        generated_at=datetime.now(timezone.utc),
+        alternatives=[],
+        pareto_frontier=[]
+    )
+    
+    # The route is known: report the plan before the slower link searches
+    if progress is not None:
+        emit_progress(progress, "route", serialize_plan(shopping_plan))
+    
+    # Add product links to store baskets concurrently
+    timeout = deadline.stage_budget("links") if deadline else None
+    if not await attach_product_links(basket_list, known_links, progress, timeout) and deadline:
+        deadline.degrade("links")
+    
+    # Build alternative plans from the same optimization pass
+    if num_alternatives > 0:
+        shopping_plan.alternatives, shopping_plan.pareto_frontier = build_plan_alternatives(
+            optimal_route, user_location, basket_list, travel_model
+        )
+    
+    # Debug: Print the created shopping plan
+    print(f"[ShopLyft] Shopping plan created successfully:")
+    print(f"  - Plan has starting_location: {shopping_plan.starting_location is not None}")
+    print(f"  - Plan has route_segments: {len(shopping_plan.route_segments)} segments")
+    print(f"  - Plan has optimization_details: {shopping_plan.optimization_details is not None}")
+    print(f"  - Plan has total_savings: {shopping_plan.total_savings}")
+    print(f"  - Plan has stores: {len(shopping_plan.stores)} stores")
+    print(f"  - Plan has store_baskets: {len(shopping_plan.store_baskets)} baskets")
+    
+    return shopping_plan
+
+async def assemble_split_plan(
+    split_route: Dict[str, Any],
+    price_dataset: List[Dict[str, Any]],
+    parsed_products: List[ParsedProduct],
+    shopper_locations: List[Dict[str, float]],
+    location_inputs: List[str],
+    travel_model: Optional[TravelModel] = None
+) -> SplitShoppingPlan:
+    """Turn a split route into per-shopper baskets and routes, with product links."""
+    split = split_route["split"]
+    shoppers = []
+    all_baskets = []
+    
+    for shopper, (start, location_input, stores, trip_time) in enumerate(
+        zip(shopper_locations, location_inputs, split["tours"], split["times"])
+    ):
+        # Items go to the shopper visiting their retailer, in visiting order
+        item_assignments = {}
+        for store in stores:
+            for canonical_id, assignment in split_route["item_assignments"].items():
+                if assignment["item"]["retailer_id"] == store["retailer_id"]:
+                    item_assignments[canonical_id] = {**assignment, "store": store}
+        
+        basket_list = build_store_baskets(item_assignments)
+        travel_time = calculate_round_trip_time(start, stores, travel_model)
+        shoppers.append(ShopperRoute.model_construct(
+            shopper=shopper,
+            starting_location=build_starting_location(location_input, start),
+            stores=basket_list,
+            route_segments=generate_route_segments(start, stores, travel_model),
+            subtotal=sum(basket.subtotal for basket in basket_list),
+            total_time=trip_time,
+            travel_time=travel_time,
+            shopping_time=trip_time - travel_time
+        ))
+        all_baskets.extend(basket_list)
+    
+    await attach_product_links(all_baskets)
+    
+    single_store_cost = calculate_single_store_baseline(price_dataset, parsed_products)
+    return SplitShoppingPlan.model_construct(
+        shoppers=shoppers,
+        total_cost=split_route["total_price"],
+        makespan=split["makespan"],
+        total_savings=max(0.0, single_store_cost - split_route["total_price"]),
+        route_score=split_route["total_score"],
+        solver=split["solver"],
+        generated_at=datetime.now(timezone.utc)
+    )
+
 def create_empty_shopping_plan(message: str) -> ShoppingPlan:
     """Create an empty shopping plan for error responses."""
     return ShoppingPlan(
@@ -1364,36 +2663,7 @@ def create_empty_shopping_plan(message: str) -> ShoppingPlan:
 async def parse_shopping_list(request: ShoppingListRequest):
     """Parse a natural language shopping list into structured products."""
     try:
-        products_data = load_json_data("products.json")
-        
-        # Build product catalog context for AI - ONLY from products.json
-        catalog_context = "ONLY use these pre-existing products from the catalog:\n"
-        for product in products_data.get("products", []):
-            catalog_context += f"- {product['canonical_id']}: {product['canonical_name']} (aliases: {', '.join(product['aliases'])})\n"
-        
-        # Use AI to parse items with strict constraints
-        parsed_list = llm_do(
-            f"""
-            Parse this grocery list into the product catalog:
-            
-            Grocery list: "{request.grocery_list}"
-            
-            {catalog_context}
-            
-            CRITICAL RULES:
-            1. ONLY match items to canonical_id values that exist in the catalog above
-            2. Do NOT create new products or canonical_ids
-            3. Extract quantity if mentioned (default to 1)
-            4. Assign confidence score (0.0-1.0) based on match quality
-            5. List unmatched items separately - items that don't match any catalog entry
-            6. Be VERY conservative - only parse items you're confident match existing products
-            7. If an item doesn't clearly match a catalog entry, put it in unmatched_items
-            
-            Return structured parsing with canonical_id, canonical_name, requested_item, quantity, and confidence.
-            """,
-            output=ParsedShoppingList,
-            temperature=0.1
-        )
+        parsed_list = await parse_grocery_list_shared(request.grocery_list)
         
         # Validate that all parsed products use canonical_ids from products.json
         if not validate_products_only_from_data(parsed_list.parsed_products):
@@ -1413,70 +2683,88 @@ async def parse_shopping_list(request: ShoppingListRequest):
             detail=f"Failed to parse shopping list: {str(e)}"
         )
 
-@router.post("/optimize", response_model=OptimizationResponse, summary="Generate optimized shopping plan")
-async def optimize_shopping_plan(request: OptimizationRequest):
-    """Generate an optimized shopping plan for the given grocery list and location."""
+async def run_optimization(
+    request: OptimizationRequest,
+    progress: Optional[ProgressCallback] = None,
+    deadline: Optional[Deadline] = None
+) -> OptimizationResponse:
+    """Run every optimization stage, reporting each one as it completes.
+
+    The LLM parse and route search run in the threadpool so stage events can be
+    flushed while they work. With a deadline, each stage gets a share of the time
+    left and falls back when it runs out: a cached or catalog-search parse, the best
+    route scored so far, and search page links.
+    """
+    # Step 1: Parse location
+    user_location = parse_location(request.location)
+    emit_progress(progress, "location", user_location)
+    
+    # Step 2: AI parsing - Parse grocery list into products
     try:
-        # Step 1: Parse location
-        user_location = parse_location(request.location)
-        
-        # Step 2: AI parsing - Parse grocery list into products
-        products_data = load_json_data("products.json")
-        catalog_context = "ONLY use these pre-existing products from the catalog:\n"
-        for product in products_data.get("products", []):
-            catalog_context += f"- {product['canonical_id']}: {product['canonical_name']} (aliases: {', '.join(product['aliases'])})\n"
-        
-        parsed_list = llm_do(
-            f"""
-            Parse this grocery list into the product catalog:
-            
-            Grocery list: "{request.grocery_list}"
-            
-            {catalog_context}
-            
-            CRITICAL RULES:
-            1. ONLY match items to canonical_id values that exist in the catalog above
-            2. Do NOT create new products or canonical_ids
-            3. Extract quantity if mentioned (default to 1)
-            4. Assign confidence score (0.0-1.0) based on match quality
-            5. List unmatched items separately - items that don't match any catalog entry
-            6. Be VERY conservative - only parse items you're confident match existing products
-            7. If an item doesn't clearly match a catalog entry, put it in unmatched_items
-            
-            Return structured parsing with canonical_id, canonical_name, requested_item, quantity, and confidence.
-            """,
-            output=ParsedShoppingList,
-            temperature=0.1
+        parsed_list = await parse_grocery_list_shared(
+            request.grocery_list, deadline.stage_budget("parse") if deadline else None
         )
-        
-        if not parsed_list.parsed_products:
-            return OptimizationResponse(
-                plan=create_empty_shopping_plan("No items could be parsed from the grocery list."),
-                success=False,
-                message="No items could be parsed from the grocery list."
-            )
-        
-        # Validate that all parsed products use canonical_ids from products.json
-        if not validate_products_only_from_data(parsed_list.parsed_products):
-            return OptimizationResponse(
-                plan=create_empty_shopping_plan("Parsed products contain invalid canonical_ids not found in products.json"),
-                success=False,
-                message="Parsed products contain invalid canonical_ids not found in products.json"
-            )
-        
-        # Step 3: Route Chooser
-        # Part 1: Generate price dataset
-        price_dataset = generate_price_dataset(parsed_list.parsed_products)
-        
-        if not price_dataset:
+    except asyncio.TimeoutError:
+        print("[ShopLyft] Parse budget exhausted, falling back")
+        if deadline:
+            deadline.degrade("parse")
+        parsed_list = fallback_parse(request.grocery_list)
+    
+    if not parsed_list.parsed_products:
+        return OptimizationResponse(
+            plan=create_empty_shopping_plan("No items could be parsed from the grocery list."),
+            success=False,
+            message="No items could be parsed from the grocery list."
+        )
+    
+    # Validate that all parsed products use canonical_ids from products.json
+    if not validate_products_only_from_data(parsed_list.parsed_products):
+        return OptimizationResponse(
+            plan=create_empty_shopping_plan("Parsed products contain invalid canonical_ids not found in products.json"),
+            success=False,
+            message="Parsed products contain invalid canonical_ids not found in products.json"
+        )
+    emit_progress(progress, "parsed", parsed_list.model_dump())
+    
+    # Step 3: Route Chooser
+    # Part 1: Generate price dataset
+    price_dataset = generate_price_dataset(
+        parsed_list.parsed_products, pack_sizes=request.pack_sizes, substitutes=request.substitutes
+    )
+    
+    if not price_dataset:
+        return OptimizationResponse(
+            plan=create_empty_shopping_plan("No price data found for the parsed items."),
+            success=False,
+            message="No price data found for the parsed items."
+        )
+    emit_progress(progress, "prices", {
+        "price_points": len(price_dataset),
+        "retailers": sorted({entry["retailer_id"] for entry in price_dataset})
+    })
+    
+    routes_expire_at = deadline.stage_expires_at("routes") if deadline else None
+    travel_model = get_travel_model(request.travel_mode.value)
+    min_spend = get_min_spend_index() if request.click_collect else None
+    if request.search_mode == SearchMode.ANYTIME:
+        # Parts 2 and 3 together: local search keeps a best-so-far route for the deadline
+        optimal_route = await run_in_threadpool(
+            anytime_retailer_route,
+            price_dataset, user_location, request, top_k=request.num_alternatives + 1,
+            travel_model=travel_model, min_spend=min_spend, expires_at=routes_expire_at
+        )
+        if not optimal_route:
             return OptimizationResponse(
-                plan=create_empty_shopping_plan("No price data found for the parsed items."),
+                plan=create_empty_shopping_plan("No possible retailer routes found."),
                 success=False,
-                message="No price data found for the parsed items."
+                message="No possible retailer routes found."
             )
-        
+        emit_progress(progress, "routes", {"candidate_routes": optimal_route["routes_scored"]})
+        if deadline and not optimal_route["converged"]:
+            deadline.degrade("routes")
+    else:
         # Part 2: Generate all possible retailer-based routes
-        all_routes = generate_all_possible_retailer_routes(price_dataset, user_location, request.max_stores)
+        all_routes = await run_in_threadpool(generate_candidate_routes, price_dataset, user_location, request)
         
         if not all_routes:
             return OptimizationResponse(
@@ -1484,9 +2772,15 @@ async def optimize_shopping_plan(request: OptimizationRequest):
                 success=False,
                 message="No possible retailer routes found."
             )
+        emit_progress(progress, "routes", {"candidate_routes": len(all_routes)})
         
         # Part 3: Find optimal retailer route
-        optimal_route = find_optimal_retailer_route(all_routes, price_dataset, user_location, request.time_weight, request.price_weight)
+        optimal_route = await run_in_threadpool(
+            find_optimal_retailer_route,
+            all_routes, price_dataset, user_location, request.time_weight, request.price_weight,
+            top_k=request.num_alternatives + 1, travel_model=travel_model,
+            min_spend=min_spend, expires_at=routes_expire_at
+        )
         
         if not optimal_route:
             return OptimizationResponse(
@@ -1494,187 +2788,196 @@ async def optimize_shopping_plan(request: OptimizationRequest):
                 success=False,
                 message="No optimal route found."
             )
+        if deadline and optimal_route["routes_scored"] < len(all_routes):
+            deadline.degrade("routes")
+    
+    # Step 4: Generate shopping plan
+    shopping_plan = await assemble_shopping_plan(
+        optimal_route, price_dataset, parsed_list.parsed_products, user_location,
+        request.location, request.num_alternatives, travel_model=travel_model, progress=progress,
+        deadline=deadline
+    )
+    
+    message = f"Optimized retailer-based plan generated with {len(parsed_list.parsed_products)} items across {len(optimal_route['retailers_used'])} retailers ({shopping_plan.num_stores} stores)"
+    degraded_stages = deadline.degraded if deadline else []
+    if degraded_stages:
+        message += f"; time budget ran out for: {', '.join(degraded_stages)}"
+    
+    return OptimizationResponse(
+        plan=shopping_plan,
+        success=True,
+        message=message,
+        degraded_stages=degraded_stages
+    )
+
+def optimization_key(request: OptimizationRequest, budget_ms: Optional[int]) -> bytes:
+    """Coalescing key for a request: every option and the time budget, with the free text normalized."""
+    fields = request.model_dump(mode="json")
+    fields["grocery_list"] = normalize_text(request.grocery_list)
+    fields["location"] = normalize_text(request.location)
+    fields["deadline_ms"] = budget_ms
+    return orjson.dumps(fields, option=orjson.OPT_SORT_KEYS)
+
+def request_budget(request: OptimizationRequest, header_value: Optional[str]) -> Optional[int]:
+    """The request's time budget in milliseconds, or None if it has none."""
+    try:
+        return resolve_deadline(header_value, request.deadline_ms)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/optimize", response_model=OptimizationResponse, summary="Generate optimized shopping plan")
+async def optimize_shopping_plan(
+    request: OptimizationRequest,
+    deadline_header: Optional[str] = Header(None, alias=DEADLINE_HEADER)
+):
+    """Generate an optimized shopping plan for the given grocery list and location.
+
+    Identical requests that arrive while one is being optimized share its result.
+    """
+    try:
+        _, result = join_optimization(request, request_budget(request, deadline_header))
+        response = await result
+        return plan_response(response) if response.success else response
         
-        # Step 4: Generate shopping plan
-        route_stores = optimal_route["route"]["stores"]
-        item_assignments = optimal_route["item_assignments"]
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to optimize shopping plan: {str(e)}"
+        )
+
+def join_optimization(request: OptimizationRequest, budget_ms: Optional[int]) -> tuple:
+    """Start the optimization for a request, or join the identical one in flight.
+
+    Returns (its ProgressBroadcast, a future of its OptimizationResponse). The
+    optimization runs with its first caller's budget, which is part of the key.
+    """
+    key = optimization_key(request, budget_ms)
+    broadcast = optimization_progress.get(key)
+    if broadcast is None:
+        broadcast = optimization_progress[key] = ProgressBroadcast()
+    
+    async def run() -> OptimizationResponse:
+        try:
+            return await run_optimization(request, broadcast.publish, Deadline(budget_ms) if budget_ms else None)
+        finally:
+            if optimization_progress.get(key) is broadcast:
+                del optimization_progress[key]
+    
+    return broadcast, asyncio.ensure_future(optimization_flights.do(key, run))
+
+def format_sse(event: str, payload: Any) -> bytes:
+    """Encode one server-sent event; bytes payloads are already serialized JSON."""
+    data = payload if isinstance(payload, bytes) else orjson.dumps(payload, option=ORJSON_OPTIONS)
+    return b"event: " + event.encode() + b"\ndata: " + data + b"\n\n"
+
+async def stream_optimization_events(request: OptimizationRequest, budget_ms: Optional[int] = None) -> AsyncIterator[bytes]:
+    """Run or join the request's shared optimization and yield its stage events as SSE frames.
+
+    Ends with a "result" event carrying the full OptimizationResponse, or an "error"
+    event. A disconnecting client stops its stream; the optimization carries on for
+    the other requests sharing it.
+    """
+    broadcast, task = join_optimization(request, budget_ms)
+    queue = broadcast.subscribe()
+    task.add_done_callback(lambda _: queue.put_nowait(None))
+    
+    try:
+        while True:
+            try:
+                item = await asyncio.wait_for(queue.get(), timeout=SSE_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield b": keep-alive\n\n"
+                continue
+            if item is None:
+                break
+            yield format_sse(*item)
         
-        # Group items by store
-        store_baskets = {}
-        for canonical_id, assignment in item_assignments.items():
-            store = assignment["store"]
-            retailer_id = store["retailer_id"]
-            
-            if retailer_id not in store_baskets:
-                store_baskets[retailer_id] = {
-                    "store_info": store,
-                    "items": [],
-                    "subtotal": 0.0
-                }
-            
-            item = assignment["item"]
-            line_total = item["price"] * item["quantity"]
-            
-            store_baskets[retailer_id]["items"].append({
-                "item_requested": item["requested_item"],
-                "product_name": item["product_name"],
-                "quantity": item["quantity"],
-                "unit_price": item["price"],
-                "line_total": line_total
-            })
-            
-            store_baskets[retailer_id]["subtotal"] += line_total
+        try:
+            response = task.result()
+            if response.success:
+                yield format_sse("result", plan_response(response).body)
+            else:
+                yield format_sse("result", response.model_dump())
+        except Exception as e:
+            print(f"[ShopLyft] Streamed optimization failed: {str(e)}")
+            yield format_sse("error", {"detail": f"Failed to optimize shopping plan: {str(e)}"})
+    finally:
+        broadcast.unsubscribe(queue)
+        if not task.done():
+            task.cancel()
+
+@router.post("/optimize/stream", summary="Generate optimized shopping plan with progress events")
+async def optimize_shopping_plan_stream(
+    request: OptimizationRequest,
+    deadline_header: Optional[str] = Header(None, alias=DEADLINE_HEADER)
+):
+    """Stream optimization stages as server-sent events.
+
+    Events, in order: location, parsed, prices, routes, route (the plan before
+    product links), one basket_links per store basket, then result (the same body
+    as /optimize) or error. Identical requests in flight, streamed or not, share one
+    optimization, and a stream that joins late first gets the events it missed.
+    """
+    budget_ms = request_budget(request, deadline_header)
+    return StreamingResponse(
+        stream_optimization_events(request, budget_ms),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/optimize/split", response_model=SplitOptimizationResponse, summary="Split a shopping plan between shoppers")
+async def optimize_split_shopping_plan(request: SplitOptimizationRequest):
+    """Split the shop between shoppers, each starting and ending at their own location.
+
+    Minimizes the total cost and the longest shopper's trip, weighted like /optimize.
+    """
+    try:
+        shopper_locations = [parse_location(location) for location in request.shopper_locations]
         
-        # Build store baskets with click & collect info
-        retailers_data = load_json_data("retailers.json")
-        basket_list = []
+        parsed_list = await parse_grocery_list_shared(request.grocery_list)
+        if not parsed_list.parsed_products:
+            return SplitOptimizationResponse(success=False, message="No items could be parsed from the grocery list.")
         
-        for retailer_id, basket_data in store_baskets.items():
-            store_info = basket_data["store_info"]
-            
-            # Check Click & Collect eligibility
-            min_spend = 0
-            for retailer in retailers_data.get("retailers", []):
-                if retailer["retailer_id"] == retailer_id:
-                    min_spend = retailer.get("click_collect", {}).get("min_spend", 0)
-                    break
-            
-            meets_min_spend = basket_data["subtotal"] >= min_spend
-            
-            # Convert to RouteStore
-            route_store = RouteStore(
-                store_id=store_info["store_id"],
-                retailer_id=store_info["retailer_id"],
-                name=store_info["name"],
-                address=store_info["address"],
-                suburb=store_info["suburb"],
-                postcode=store_info["postcode"],
-                location=store_info["location"]
+        if not validate_products_only_from_data(parsed_list.parsed_products):
+            return SplitOptimizationResponse(
+                success=False,
+                message="Parsed products contain invalid canonical_ids not found in products.json"
             )
-            
-            # Convert items to RouteItem
-            route_items = []
-            for item in basket_data["items"]:
-                route_items.append(RouteItem(
-                    item_requested=item["item_requested"],
-                    product_name=item["product_name"],
-                    quantity=item["quantity"],
-                    unit_price=item["unit_price"],
-                    line_total=item["line_total"]
-                ))
-            
-            basket_list.append(StoreBasket(
-                store_info=route_store,
-                items=route_items,
-                links=[],  # Will be populated below
-                subtotal=basket_data["subtotal"],
-                click_collect_eligible=meets_min_spend,
-                min_spend_required=min_spend
-            ))
-        
-        # Calculate total savings (compare to single most expensive store)
-        single_store_cost = calculate_single_store_baseline(price_dataset, parsed_list.parsed_products)
-        total_savings = max(0.0, single_store_cost - optimal_route["total_price"])
-        
-        # Create starting location with proper address formatting
-        # If location is coordinates, use them directly for Google Maps compatibility
-        display_address = request.location
-        if "," in request.location and len(request.location.split(",")) == 2:
-            # This looks like coordinates, use them directly for Google Maps
-            try:
-                lat, lng = request.location.split(",")
-                lat_f = float(lat.strip())
-                lng_f = float(lng.strip())
-                # Use coordinates directly for Google Maps compatibility
-                display_address = f"{lat_f},{lng_f}"
-            except ValueError:
-                # If parsing fails, use original location
-                display_address = request.location
         
-        starting_location = StartingLocation(
-            address=display_address,
-            coordinates=Location(lat=user_location["lat"], lng=user_location["lng"])
+        price_dataset = generate_price_dataset(
+            parsed_list.parsed_products, pack_sizes=request.pack_sizes, substitutes=request.substitutes
         )
+        if not price_dataset:
+            return SplitOptimizationResponse(success=False, message="No price data found for the parsed items.")
         
-        # Generate route segments
-        route_segments = generate_route_segments(user_location, route_stores)
-        
-        # Create optimization details
-        optimization_details = OptimizationDetails(
-            price_component=optimal_route["price_score"],
-            time_component=optimal_route["time_score"],
-            total_items=optimal_route["num_items"],
-            stores_count=len(route_stores)
+        travel_model = get_travel_model(request.travel_mode.value)
+        min_spend = get_min_spend_index() if request.click_collect else None
+        split_route = await run_in_threadpool(
+            split_retailer_route, price_dataset, shopper_locations, request, travel_model, min_spend
         )
+        if split_route is None:
+            return SplitOptimizationResponse(success=False, message="No possible retailer routes found.")
         
-        # Add product links to store baskets concurrently
-        link_tasks = []
-        for basket in basket_list:
-            task = generate_product_links_async(basket.store_info.retailer_id, basket.items)
-            link_tasks.append(task)
-        
-        # Execute all link generation tasks concurrently with error handling
-        try:
-            all_links = await asyncio.gather(*link_tasks, return_exceptions=True)
-            
-            # Assign the results back to baskets
-            for i, basket in enumerate(basket_list):
-                if isinstance(all_links[i], list):
-                    basket.links = all_links[i]
-                else:
-                    # If link generation failed, use empty list
-                    print(f"[ShopLyft] Link generation failed for {basket.store_info.retailer_id}: {all_links[i]}")
-                    basket.links = []
-        except Exception as e:
-            print(f"[ShopLyft] Error in concurrent link generation: {str(e)}")
-            # Fallback: set empty links for all baskets
-            for basket in basket_list:
-                basket.links = []
-        
-        # Debug: Print the data being used to create the shopping plan
-        print(f"[ShopLyft] Creating shopping plan with:")
-        print(f"  - total_savings: {total_savings}")
-        print(f"  - starting_location: {starting_location}")
-        print(f"  - route_segments: {len(route_segments)} segments")
-        print(f"  - optimization_details: {optimization_details}")
-        print(f"  - stores/store_baskets: {len(basket_list)} stores")
-        
-        # Create shopping plan
-        shopping_plan = ShoppingPlan(
-            total_cost=optimal_route["total_price"],
-            total_time=optimal_route["total_time"],
-            travel_time=optimal_route["travel_time"],
-            shopping_time=optimal_route["in_store_time"],
-            total_savings=total_savings,
-            route_score=optimal_route["total_score"],
-            starting_location=starting_location,
-            stores=basket_list,  # Frontend expects 'stores'
-            route_segments=route_segments,
-            optimization_details=optimization_details,
-            num_stores=len(route_stores),
-            store_baskets=basket_list,  # Backend compatibility
-            generated_at=datetime.now(timezone.utc)
+        plan = await assemble_split_plan(
+            split_route, price_dataset, parsed_list.parsed_products, shopper_locations,
+            request.shopper_locations, travel_model
         )
         
-        # Debug: Print the created shopping plan
-        print(f"[ShopLyft] Shopping plan created successfully:")
-        print(f"  - Plan has starting_location: {shopping_plan.starting_location is not None}")
-        print(f"  - Plan has route_segments: {len(shopping_plan.route_segments)} segments")
-        print(f"  - Plan has optimization_details: {shopping_plan.optimization_details is not None}")
-        print(f"  - Plan has total_savings: {shopping_plan.total_savings}")
-        print(f"  - Plan has stores: {len(shopping_plan.stores)} stores")
-        print(f"  - Plan has store_baskets: {len(shopping_plan.store_baskets)} baskets")
-        
-        return OptimizationResponse(
-            plan=shopping_plan,
+        # Trusted internal data: serialize without FastAPI's response re-validation
+        return FastJSONResponse(SplitOptimizationResponse.model_construct(
+            plan=plan,
             success=True,
-            message=f"Optimized retailer-based plan generated with {len(parsed_list.parsed_products)} items across {len(optimal_route['retailers_used'])} retailers ({len(route_stores)} stores)"
-        )
+            message=f"Split plan generated with {len(parsed_list.parsed_products)} items across {len(split_route['retailers_used'])} retailers for {len(shopper_locations)} shoppers ({plan.solver} split)"
+        ))
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
-            detail=f"Failed to optimize shopping plan: {str(e)}"
+            detail=f"Failed to split shopping plan: {str(e)}"
         )
 
 @router.get("/status", summary="Get optimization service status")
@@ -1707,6 +3010,12 @@ async def get_optimization_status():
                 "missing": missing_files
             },
             "connectonion_available": connectonion_available,
+            "single_flight": {
+                "optimizations": optimization_flights.stats(),
+                "parses": parse_flights.stats(),
+                "searches": search_flights.stats()
+            },
+            "search_strategies": search_strategy_stats.snapshot(),
             "timestamp": datetime.now(timezone.utc)
         }
         
@@ -9,9 +9,15 @@ from api.models import (
     PlanEntry, PlanResponse, PlanSaveRequest, PlanSaveResponse,
     ShoppingPlan, ErrorResponse
 )
+from api.aggregates import plans_summary, record_plan_change
+from api.data_store import data_version
+from api.streaming import build_validated_list, stream_list_response
 
 router = APIRouter()
 
+# Plans live in backend/data; the data cache accepts an absolute path
+PLANS_FILE = str(Path(__file__).parent.parent.parent / "data" / "plans.json")
+
 def load_json_data(filename: str) -> dict:
     """Load JSON data from the data directory."""
     data_path = Path(__file__).parent.parent.parent / "data" / filename
@@ -21,6 +27,10 @@ def load_json_data(filename: str) -> dict:
     except FileNotFoundError:
         return {}
 
+def sort_plans_newest_first(plans: List[dict]) -> List[dict]:
+    """Order validated plan entries by generation time, newest first."""
+    return sorted(plans, key=lambda plan: plan["generated_at"], reverse=True)
+
 def save_json_data(filename: str, data: dict) -> None:
     """Save JSON data to the data directory."""
     data_path = Path(__file__).parent.parent.parent / "data" / filename
@@ -51,6 +61,24 @@ async def get_all_plans():
             detail=f"Failed to load plans: {str(e)}"
         )
 
+@router.get("/stream", summary="Stream saved plans")
+async def stream_plans(
+    format: str = Query("ndjson", description="Stream format: ndjson or json"),
+    limit: Optional[int] = Query(None, ge=1, le=10000, description="Maximum number of items in this page"),
+    cursor: Optional[str] = Query(None, description="Cursor from the previous page")
+):
+    """Stream saved plans (newest first) as NDJSON or a chunked JSON array, one page at a time."""
+    try:
+        plans = build_validated_list(PLANS_FILE, "plans", PlanEntry, sort_plans_newest_first)
+        return stream_list_response("plans", plans, "plan_id", format, limit, cursor)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to stream plans: {str(e)}"
+        )
+
 @router.get("/{plan_id}", response_model=PlanEntry, summary="Get plan by ID")
 async def get_plan_by_id(plan_id: str):
     """Get a specific shopping plan by its ID."""
@@ -81,6 +109,7 @@ async def get_plan_by_id(plan_id: str):
 async def save_plan(request: PlanSaveRequest):
     """Save a shopping plan to the database."""
     try:
+        previous_version = data_version(PLANS_FILE)
         plans_data = load_json_data("plans.json")
         
         # Generate plan ID
@@ -102,6 +131,7 @@ async def save_plan(request: PlanSaveRequest):
         
         # Save to file
         save_json_data("plans.json", plans_data)
+        record_plan_change(PLANS_FILE, previous_version, [plan_entry], [])
         
         return PlanSaveResponse(
             plan_id=plan_id,
@@ -117,16 +147,17 @@ async def save_plan(request: PlanSaveRequest):
 async def delete_plan(plan_id: str):
     """Delete a specific shopping plan."""
     try:
+        previous_version = data_version(PLANS_FILE)
         plans_data = load_json_data("plans.json")
         
         # Find and remove the plan
-        original_count = len(plans_data.get("plans", []))
+        removed = [plan for plan in plans_data.get("plans", []) if plan.get("plan_id") == plan_id]
         plans_data["plans"] = [
             plan for plan in plans_data.get("plans", [])
             if plan.get("plan_id") != plan_id
         ]
         
-        if len(plans_data["plans"]) == original_count:
+        if not removed:
             raise HTTPException(
                 status_code=404,
                 detail=f"Plan with ID '{plan_id}' not found"
@@ -134,6 +165,7 @@ async def delete_plan(plan_id: str):
         
         # Save updated data
         save_json_data("plans.json", plans_data)
+        record_plan_change(PLANS_FILE, previous_version, [], removed)
         
         return {"message": f"Plan '{plan_id}' deleted successfully"}
     except HTTPException:
@@ -173,55 +205,9 @@ async def get_recent_plans(
 
 @router.get("/stats/summary", summary="Get plans statistics")
 async def get_plans_stats():
-    """Get statistics about saved plans."""
+    """Get statistics about saved plans, maintained as plans are saved and deleted."""
     try:
-        plans_data = load_json_data("plans.json")
-        plans = plans_data.get("plans", [])
-        
-        if not plans:
-            return {
-                "total_plans": 0,
-                "oldest_plan": None,
-                "newest_plan": None,
-                "average_cost": 0.0,
-                "average_stores": 0.0,
-                "average_time": 0.0
-            }
-        
-        # Calculate statistics
-        total_plans = len(plans)
-        
-        # Find oldest and newest plans
-        timestamps = [datetime.fromisoformat(plan["generated_at"].replace('Z', '+00:00')) for plan in plans]
-        oldest_plan = min(timestamps)
-        newest_plan = max(timestamps)
-        
-        # Calculate averages from plan payloads
-        total_cost = 0.0
-        total_stores = 0
-        total_time = 0.0
-        valid_plans = 0
-        
-        for plan in plans:
-            payload = plan.get("payload", {})
-            if payload:
-                total_cost += payload.get("total_cost", 0.0)
-                total_stores += payload.get("num_stores", 0)
-                total_time += payload.get("total_time", 0.0)
-                valid_plans += 1
-        
-        average_cost = total_cost / valid_plans if valid_plans > 0 else 0.0
-        average_stores = total_stores / valid_plans if valid_plans > 0 else 0.0
-        average_time = total_time / valid_plans if valid_plans > 0 else 0.0
-        
-        return {
-            "total_plans": total_plans,
-            "oldest_plan": oldest_plan.isoformat(),
-            "newest_plan": newest_plan.isoformat(),
-            "average_cost": round(average_cost, 2),
-            "average_stores": round(average_stores, 2),
-            "average_time": round(average_time, 2)
-        }
+        return plans_summary(PLANS_FILE)
     except Exception as e:
         raise HTTPException(
             status_code=500,
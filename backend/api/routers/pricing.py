@@ -1,16 +1,31 @@
 # Pricing API Router
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Request
+from starlette.concurrency import run_in_threadpool
 from typing import List, Optional, Dict, Any
+import io
 import json
+import tempfile
+from datetime import datetime
 from pathlib import Path
 
+from api.aggregates import pricing_summary
 from api.models import (
     PriceSnapshot, PriceResponse, PriceComparisonRequest, PriceComparisonResponse,
-    ErrorResponse
+    PriceHistoryPoint, PriceHistoryResponse, PriceIngestResponse, ErrorResponse
 )
+from api.price_history import VERSION_FILES, load_latest_prices, price_as_of, price_series
+from api.price_ingest import DEFAULT_BATCH_SIZE, FEED_FORMATS, ingest_price_feed
+from api.price_query import PRICE_SORTS, query_prices
+from api.streaming import stream_list_response
 
 router = APIRouter()
 
+# Data files read by these endpoints (their versions drive the HTTP validators)
+DATA_FILES = ["price_snapshots.json", "retailer_catalog.json", "products.json", "retailers.json"] + VERSION_FILES
+
+# Uploaded feeds are buffered in memory up to this size, then spill to a temp file
+FEED_SPOOL_BYTES = 8 * 1024 * 1024
+
 def load_json_data(filename: str) -> dict:
     """Load JSON data from the data directory."""
     data_path = Path(__file__).parent.parent.parent.parent / "data" / filename
@@ -24,7 +39,7 @@ def load_json_data(filename: str) -> dict:
 async def get_all_prices():
     """Get all current price snapshots."""
     try:
-        prices_data = load_json_data("price_snapshots.json")
+        prices_data = load_latest_prices()
         prices = [PriceSnapshot(**price) for price in prices_data.get("prices", [])]
         return PriceResponse(prices=prices)
     except Exception as e:
@@ -33,11 +48,44 @@ async def get_all_prices():
             detail=f"Failed to load prices: {str(e)}"
         )
 
+@router.get("/stream", summary="Stream current prices")
+async def stream_prices(
+    format: str = Query("ndjson", description="Stream format: ndjson or json"),
+    limit: Optional[int] = Query(None, ge=1, le=10000, description="Maximum number of items in this page"),
+    cursor: Optional[str] = Query(None, description="Cursor from the previous page")
+):
+    """Stream the current price slice as NDJSON or a chunked JSON array, one page at a time."""
+    try:
+        prices = load_latest_prices().get("prices", [])
+        return stream_list_response(
+            "prices", prices, "retailer_product_id", format, limit, cursor,
+            fields=list(PriceSnapshot.model_fields)
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to stream prices: {str(e)}"
+        )
+
 @router.get("/product/{retailer_product_id}", response_model=PriceSnapshot, summary="Get price by retailer product ID")
-async def get_price_by_product_id(retailer_product_id: str):
-    """Get price for a specific retailer product."""
+async def get_price_by_product_id(
+    retailer_product_id: str,
+    as_of: Optional[datetime] = Query(None, description="Return the price in effect at this time")
+):
+    """Get price for a specific retailer product, optionally as of a past time."""
     try:
-        prices_data = load_json_data("price_snapshots.json")
+        if as_of is not None:
+            price = price_as_of(retailer_product_id, as_of)
+            if price is None:
+                raise HTTPException(
+                    status_code=404,
+                    detail=f"No price for product '{retailer_product_id}' as of {as_of.isoformat()}"
+                )
+            return PriceSnapshot(**price)
+        
+        prices_data = load_latest_prices()
         
         for price in prices_data.get("prices", []):
             if price.get("retailer_product_id") == retailer_product_id:
@@ -55,11 +103,27 @@ async def get_price_by_product_id(retailer_product_id: str):
             detail=f"Failed to load price: {str(e)}"
         )
 
+@router.get("/history/{retailer_product_id}", response_model=PriceHistoryResponse, summary="Get price history for a retailer product")
+async def get_price_history(
+    retailer_product_id: str,
+    start: Optional[datetime] = Query(None, description="Earliest recording time"),
+    end: Optional[datetime] = Query(None, description="Latest recording time")
+):
+    """Get every recorded price for a retailer product, oldest first."""
+    try:
+        points = [PriceHistoryPoint(**point) for point in price_series(retailer_product_id, start, end)]
+        return PriceHistoryResponse(retailer_product_id=retailer_product_id, points=points)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to load price history: {str(e)}"
+        )
+
 @router.get("/retailer/{retailer_id}", response_model=PriceResponse, summary="Get prices by retailer")
 async def get_prices_by_retailer(retailer_id: str):
     """Get all prices for a specific retailer."""
     try:
-        prices_data = load_json_data("price_snapshots.json")
+        prices_data = load_latest_prices()
         prices = []
         
         for price in prices_data.get("prices", []):
@@ -79,7 +143,7 @@ async def get_prices_by_canonical_id(canonical_id: str):
     try:
         # Load retailer catalog to map canonical_id to retailer_product_ids
         catalog_data = load_json_data("retailer_catalog.json")
-        prices_data = load_json_data("price_snapshots.json")
+        prices_data = load_latest_prices()
         
         # Find all retailer product IDs for this canonical ID
         retailer_product_ids = []
@@ -106,7 +170,7 @@ async def compare_prices(request: PriceComparisonRequest):
     try:
         # Load all necessary data
         catalog_data = load_json_data("retailer_catalog.json")
-        prices_data = load_json_data("price_snapshots.json")
+        prices_data = load_latest_prices()
         products_data = load_json_data("products.json")
         retailers_data = load_json_data("retailers.json")
         
@@ -180,103 +244,69 @@ async def compare_prices(request: PriceComparisonRequest):
 
 @router.get("/search", response_model=PriceResponse, summary="Search prices")
 async def search_prices(
-    query: str = Query(..., description="Search query"),
+    query: Optional[str] = Query(None, description="Search query"),
     retailer_id: Optional[str] = Query(None, description="Filter by retailer"),
     min_price: Optional[float] = Query(None, description="Minimum price filter"),
-    max_price: Optional[float] = Query(None, description="Maximum price filter")
+    max_price: Optional[float] = Query(None, description="Maximum price filter"),
+    sort: Optional[str] = Query(None, description="Sort by price, -price, unit_price or -unit_price"),
+    limit: Optional[int] = Query(None, ge=1, le=10000, description="Maximum number of results to return"),
+    offset: int = Query(0, ge=0, description="Number of results to skip")
 ):
-    """Search prices by product name or retailer product ID."""
+    """Search prices by product name or retailer product ID, with optional retailer and price range filters."""
     try:
-        prices_data = load_json_data("price_snapshots.json")
-        catalog_data = load_json_data("retailer_catalog.json")
-        
-        # Build product name lookup
-        product_name_lookup = {}
-        for catalog_item in catalog_data.get("retailer_products", []):
-            product_name_lookup[catalog_item["retailer_product_id"]] = catalog_item["name"]
+        if sort is not None and sort not in PRICE_SORTS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unsupported sort '{sort}', expected one of: {', '.join(PRICE_SORTS)}"
+            )
         
-        matching_prices = []
-        query_lower = query.lower()
+        matches = query_prices(query, retailer_id, min_price, max_price, sort, limit, offset)
+        return PriceResponse(prices=[PriceSnapshot(**price) for price in matches])
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to search prices: {str(e)}"
+        )
+
+@router.post("/ingest", response_model=PriceIngestResponse, summary="Ingest a price feed")
+async def ingest_prices(
+    request: Request,
+    format: str = Query("ndjson", description="Feed format: ndjson or csv"),
+    batch_size: int = Query(DEFAULT_BATCH_SIZE, ge=1, le=100000, description="Rows validated and written per batch")
+):
+    """Ingest an NDJSON or CSV price feed sent as the raw request body."""
+    try:
+        if format not in FEED_FORMATS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unsupported feed format '{format}', expected one of: {', '.join(FEED_FORMATS)}"
+            )
         
-        for price in prices_data.get("prices", []):
-            retailer_product_id = price.get("retailer_product_id", "")
-            
-            # Filter by retailer if specified
-            if retailer_id and not retailer_product_id.startswith(f"{retailer_id}:"):
-                continue
-            
-            # Filter by price range if specified
-            if min_price is not None and price.get("price", 0) < min_price:
-                continue
-            if max_price is not None and price.get("price", 0) > max_price:
-                continue
-            
-            # Search in retailer product ID
-            if query_lower in retailer_product_id.lower():
-                matching_prices.append(PriceSnapshot(**price))
-                continue
+        with tempfile.SpooledTemporaryFile(max_size=FEED_SPOOL_BYTES) as body:
+            async for chunk in request.stream():
+                body.write(chunk)
+            body.seek(0)
             
-            # Search in product name
-            product_name = product_name_lookup.get(retailer_product_id, "")
-            if query_lower in product_name.lower():
-                matching_prices.append(PriceSnapshot(**price))
-                continue
+            # Validation and disk writes run off the event loop
+            stream = io.TextIOWrapper(body, encoding="utf-8", newline="")
+            summary = await run_in_threadpool(ingest_price_feed, stream, format, batch_size)
         
-        return PriceResponse(prices=matching_prices)
+        return PriceIngestResponse(**summary)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
-            detail=f"Failed to search prices: {str(e)}"
+            detail=f"Failed to ingest prices: {str(e)}"
         )
 
 @router.get("/stats/summary", summary="Get pricing statistics summary")
 async def get_pricing_stats():
-    """Get pricing statistics summary."""
+    """Get pricing statistics summary, including per-category and unit price statistics."""
     try:
-        prices_data = load_json_data("price_snapshots.json")
-        catalog_data = load_json_data("retailer_catalog.json")
-        retailers_data = load_json_data("retailers.json")
-        
-        prices = prices_data.get("prices", [])
-        retailers = retailers_data.get("retailers", [])
-        
-        # Basic stats
-        total_products = len(prices)
-        total_retailers = len(retailers)
-        
-        # Price range stats
-        all_prices = [p["price"] for p in prices if "price" in p]
-        min_price = min(all_prices) if all_prices else 0
-        max_price = max(all_prices) if all_prices else 0
-        avg_price = sum(all_prices) / len(all_prices) if all_prices else 0
-        
-        # Retailer stats
-        retailer_stats = {}
-        for retailer in retailers:
-            retailer_id = retailer["retailer_id"]
-            retailer_prices = [p["price"] for p in prices if p.get("retailer_product_id", "").startswith(f"{retailer_id}:")]
-            
-            if retailer_prices:
-                retailer_stats[retailer_id] = {
-                    "display_name": retailer["display_name"],
-                    "product_count": len(retailer_prices),
-                    "min_price": min(retailer_prices),
-                    "max_price": max(retailer_prices),
-                    "avg_price": sum(retailer_prices) / len(retailer_prices)
-                }
-        
-        return {
-            "summary": {
-                "total_products": total_products,
-                "total_retailers": total_retailers,
-                "price_range": {
-                    "min": min_price,
-                    "max": max_price,
-                    "average": avg_price
-                }
-            },
-            "retailer_stats": retailer_stats
-        }
+        return pricing_summary()
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -6,11 +6,16 @@ from pathlib import Path
 
 from api.models import (
     Product, ProductResponse, ProductSearchRequest, ProductSearchResponse,
-    ErrorResponse
+    ProductSuggestion, ProductAutocompleteResponse, ErrorResponse
 )
+from api.product_search import autocomplete, search
+from api.streaming import build_validated_list, stream_list_response
 
 router = APIRouter()
 
+# Data files read by these endpoints (their versions drive the HTTP validators)
+DATA_FILES = ["products.json"]
+
 def load_json_data(filename: str) -> dict:
     """Load JSON data from the data directory."""
     data_path = Path(__file__).parent.parent.parent.parent / "data" / filename
@@ -33,39 +38,38 @@ async def get_all_products():
             detail=f"Failed to load products: {str(e)}"
         )
 
+@router.get("/stream", summary="Stream products")
+async def stream_products(
+    format: str = Query("ndjson", description="Stream format: ndjson or json"),
+    limit: Optional[int] = Query(None, ge=1, le=10000, description="Maximum number of items in this page"),
+    cursor: Optional[str] = Query(None, description="Cursor from the previous page")
+):
+    """Stream products as NDJSON or a chunked JSON array, one page at a time."""
+    try:
+        products = build_validated_list("products.json", "products", Product)
+        return stream_list_response("products", products, "canonical_id", format, limit, cursor)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to stream products: {str(e)}"
+        )
+
 @router.get("/search", response_model=ProductSearchResponse, summary="Search products")
 async def search_products(
     query: str = Query(..., description="Search query"),
-    category: Optional[str] = Query(None, description="Filter by category")
+    category: Optional[str] = Query(None, description="Filter by category"),
+    limit: int = Query(20, ge=1, le=200, description="Maximum number of results to return"),
+    offset: int = Query(0, ge=0, description="Number of ranked results to skip"),
+    fuzzy: bool = Query(True, description="Match query terms with small typos")
 ):
-    """Search products by name, aliases, or category."""
+    """Search products by name, aliases, or category, best match first."""
     try:
-        products_data = load_json_data("products.json")
-        all_products = products_data.get("products", [])
-        
-        # Filter by category if specified
-        if category:
-            all_products = [p for p in all_products if p.get("category", "").lower() == category.lower()]
-        
-        # Search in product names and aliases
-        query_lower = query.lower()
-        matching_products = []
-        
-        for product in all_products:
-            # Check canonical name
-            if query_lower in product.get("canonical_name", "").lower():
-                matching_products.append(Product(**product))
-                continue
-            
-            # Check aliases
-            aliases = product.get("aliases", [])
-            if any(query_lower in alias.lower() for alias in aliases):
-                matching_products.append(Product(**product))
-                continue
-        
+        matches, total_count = search(query, category, limit, offset, fuzzy=fuzzy)
         return ProductSearchResponse(
-            products=matching_products,
-            total_count=len(matching_products)
+            products=[Product(**product) for product in matches],
+            total_count=total_count
         )
     except Exception as e:
         raise HTTPException(
@@ -73,6 +77,21 @@ async def search_products(
             detail=f"Failed to search products: {str(e)}"
         )
 
+@router.get("/autocomplete", response_model=ProductAutocompleteResponse, summary="Autocomplete product names")
+async def autocomplete_products(
+    query: str = Query(..., description="Partially typed product name"),
+    limit: int = Query(10, ge=1, le=50, description="Maximum number of suggestions")
+):
+    """Suggest products as the user types; the last word is matched as a prefix."""
+    try:
+        suggestions = [ProductSuggestion(**suggestion) for suggestion in autocomplete(query, limit)]
+        return ProductAutocompleteResponse(suggestions=suggestions)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to autocomplete products: {str(e)}"
+        )
+
 @router.get("/categories", summary="Get all product categories")
 async def get_categories():
     """Get all available product categories."""
@@ -136,32 +155,12 @@ async def get_products_by_category(category: str):
 async def advanced_product_search(request: ProductSearchRequest):
     """Advanced product search with structured request."""
     try:
-        products_data = load_json_data("products.json")
-        all_products = products_data.get("products", [])
-        
-        # Filter by category if specified
-        if request.category:
-            all_products = [p for p in all_products if p.get("category", "").lower() == request.category.lower()]
-        
-        # Search in product names and aliases
-        query_lower = request.query.lower()
-        matching_products = []
-        
-        for product in all_products:
-            # Check canonical name
-            if query_lower in product.get("canonical_name", "").lower():
-                matching_products.append(Product(**product))
-                continue
-            
-            # Check aliases
-            aliases = product.get("aliases", [])
-            if any(query_lower in alias.lower() for alias in aliases):
-                matching_products.append(Product(**product))
-                continue
-        
+        matches, total_count = search(
+            request.query, request.category, request.limit, request.offset, fuzzy=request.fuzzy
+        )
         return ProductSearchResponse(
-            products=matching_products,
-            total_count=len(matching_products)
+            products=[Product(**product) for product in matches],
+            total_count=total_count
         )
     except Exception as e:
         raise HTTPException(
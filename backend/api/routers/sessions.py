@@ -0,0 +1,549 @@
+# Optimization Sessions API Router
+from fastapi import APIRouter, HTTPException, Query
+from typing import List, Optional, Dict, Any, Set, Tuple
+import asyncio
+import time
+import uuid
+from datetime import datetime, timezone, timedelta
+
+from api.models import (
+    OptimizationRequest, OptimizationSessionResponse, BasketUpdateRequest, BasketItemChange,
+    BasketAction, ParsedProduct, ErrorResponse, WeightedRoute, WeightSweepResponse
+)
+from api.routers.optimization import (
+    load_json_data, parse_location, parse_grocery_list_shared, validate_products_only_from_data,
+    generate_price_dataset, generate_candidate_routes, score_retailer_route, select_top_routes,
+    option_cost, compute_route_score, assemble_shopping_plan, create_empty_shopping_plan, plan_signature
+)
+from api.travel import get_travel_model
+from api.click_collect import get_min_spend_index
+from api.data_store import get_derived
+from api.pack_sizes import family_of
+from api.price_history import add_price_listener
+from api.serialization import plan_response
+from api.weight_sweep import build_weight_sweep, hull_weight_ranges, rank_routes
+
+router = APIRouter()
+
+# Sessions expire after 30 minutes without activity
+SESSION_TTL_SECONDS = 30 * 60
+
+# In-memory session store: session_id -> session state
+sessions: Dict[str, Dict[str, Any]] = {}
+
+def evict_expired_sessions() -> None:
+    """Drop sessions whose TTL has elapsed."""
+    now = time.monotonic()
+    expired = [session_id for session_id, session in sessions.items() if session["expires_at"] <= now]
+    for session_id in expired:
+        del sessions[session_id]
+
+def touch_session(session: Dict[str, Any]) -> None:
+    """Extend a session's TTL after activity."""
+    session["expires_at"] = time.monotonic() + SESSION_TTL_SECONDS
+    session["expires_at_utc"] = datetime.now(timezone.utc) + timedelta(seconds=SESSION_TTL_SECONDS)
+
+def get_session(session_id: str) -> Dict[str, Any]:
+    """Get a live session or raise 404."""
+    evict_expired_sessions()
+    session = sessions.get(session_id)
+    if session is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Session '{session_id}' not found or expired"
+        )
+    touch_session(session)
+    return session
+
+def build_item_options(product: ParsedProduct, request: OptimizationRequest) -> Dict[str, Dict[str, Any]]:
+    """Get the cheapest price dataset entry per retailer for a basket item."""
+    options = {}
+    for entry in generate_price_dataset([product], pack_sizes=request.pack_sizes, substitutes=request.substitutes):
+        current = options.get(entry["retailer_id"])
+        if current is None or option_cost(entry) < option_cost(current):
+            options[entry["retailer_id"]] = entry
+    return options
+
+def session_price_dataset(session: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Flatten the per-item options into a price dataset (one entry per item and retailer)."""
+    return [entry for options in session["options"].values() for entry in options.values()]
+
+def assign_item(scored_route: Dict[str, Any], canonical_id: str, options: Dict[str, Dict[str, Any]]) -> None:
+    """Assign an item to the cheapest retailer in the route and add it to the route price.
+
+    Like score_retailer_route, a substitute is only used if no retailer in the route
+    sells the item, and its penalty is kept with the route.
+    """
+    route_retailers = scored_route["retailers_used"]
+    candidates = [entry for retailer_id, entry in options.items() if retailer_id in route_retailers]
+    exact_candidates = [entry for entry in candidates if "substitute_for" not in entry]
+    if exact_candidates:
+        candidates = exact_candidates
+    if not candidates:
+        return
+
+    best_item = min(candidates, key=option_cost)
+    best_store = None
+    for store in scored_route["route"]["stores"]:
+        if store["retailer_id"] == best_item["retailer_id"]:
+            best_store = store
+            break
+
+    if best_store:
+        line_total = best_item["price"] * best_item["quantity"]
+        penalty = best_item.get("substitution_penalty", 0.0) * best_item["quantity"]
+        scored_route["item_assignments"][canonical_id] = {
+            "store": best_store,
+            "item": best_item,
+            "total_price": line_total,
+            "substitution_penalty": penalty
+        }
+        scored_route["total_price"] += line_total
+        scored_route["substitution_penalty"] = scored_route.get("substitution_penalty", 0.0) + penalty
+
+def unassign_item(scored_route: Dict[str, Any], canonical_id: str) -> None:
+    """Remove an item from the route and subtract it from the route price."""
+    assignment = scored_route["item_assignments"].pop(canonical_id, None)
+    if assignment:
+        scored_route["total_price"] -= assignment["total_price"]
+        scored_route["substitution_penalty"] = scored_route.get("substitution_penalty", 0.0) - assignment.get("substitution_penalty", 0.0)
+
+def refresh_route_score(scored_route: Dict[str, Any], time_weight: float, price_weight: float) -> None:
+    """Recompute the derived time and score fields of a route after its items changed."""
+    scored_route["num_items"] = len(scored_route["item_assignments"])
+    scored_route["in_store_time"] = scored_route["num_items"] * 2.0
+    scored_route["total_time"] = scored_route["travel_time"] + scored_route["in_store_time"]
+
+    price_score, time_score, total_score = compute_route_score(
+        scored_route["total_price"] + scored_route.get("substitution_penalty", 0.0), scored_route["total_time"], time_weight, price_weight
+    )
+    scored_route["price_score"] = price_score
+    scored_route["time_score"] = time_score
+    scored_route["total_score"] = total_score
+
+def rebuild_route_table(session: Dict[str, Any]) -> None:
+    """Enumerate and score all candidate routes for the session basket from scratch."""
+    request = session["request"]
+    price_dataset = generate_price_dataset(
+        list(session["products"].values()), pack_sizes=request.pack_sizes, substitutes=request.substitutes
+    )
+    all_routes = generate_candidate_routes(price_dataset, session["user_location"], request)
+
+    session["retailers"] = {entry["retailer_id"] for entry in price_dataset}
+    travel_model = get_travel_model(request.travel_mode.value)
+    min_spend = get_min_spend_index() if request.click_collect else None
+    session["routes"] = [
+        score_retailer_route(
+            route, price_dataset, session["user_location"], request.time_weight, request.price_weight,
+            travel_model, min_spend
+        )
+        for route in all_routes
+    ]
+
+def add_item(session: Dict[str, Any], product: ParsedProduct) -> None:
+    """Add an item to the basket and update every route score incrementally."""
+    canonical_id = product.canonical_id
+    existing = session["products"].get(canonical_id)
+    if existing:
+        set_item_quantity(session, canonical_id, existing.quantity + product.quantity)
+        return
+
+    options = build_item_options(product, session["request"])
+    session["products"][canonical_id] = product
+    session["options"][canonical_id] = options
+
+    # A retailer new to this basket changes the candidate routes themselves, and
+    # min-spend assignment couples items so single-item updates do not apply
+    if session["request"].click_collect or not set(options).issubset(session["retailers"]):
+        rebuild_route_table(session)
+        return
+
+    request = session["request"]
+    for scored_route in session["routes"]:
+        assign_item(scored_route, canonical_id, options)
+        refresh_route_score(scored_route, request.time_weight, request.price_weight)
+
+def remove_item(session: Dict[str, Any], canonical_id: str) -> None:
+    """Remove an item from the basket and update every route score incrementally."""
+    session["products"].pop(canonical_id, None)
+    session["options"].pop(canonical_id, None)
+
+    request = session["request"]
+    if request.click_collect:
+        rebuild_route_table(session)
+        return
+
+    for scored_route in session["routes"]:
+        unassign_item(scored_route, canonical_id)
+        refresh_route_score(scored_route, request.time_weight, request.price_weight)
+
+def set_item_quantity(session: Dict[str, Any], canonical_id: str, quantity: int) -> None:
+    """Change an item's quantity; the cheapest retailer per route stays the same.
+
+    With pack sizes the cheapest mix depends on the amount, so the item is re-priced
+    and re-assigned across each route's retailers instead.
+    """
+    if quantity <= 0:
+        remove_item(session, canonical_id)
+        return
+
+    request = session["request"]
+    product = session["products"][canonical_id].model_copy(update={"quantity": quantity})
+    session["products"][canonical_id] = product
+    if request.pack_sizes:
+        options = build_item_options(product, request)
+    else:
+        options = {
+            retailer_id: {**entry, "quantity": quantity * entry.get("substitute_packs", 1)}
+            for retailer_id, entry in session["options"][canonical_id].items()
+        }
+    session["options"][canonical_id] = options
+
+    if request.click_collect or not set(options).issubset(session["retailers"]):
+        rebuild_route_table(session)
+        return
+
+    for scored_route in session["routes"]:
+        assignment = scored_route["item_assignments"].get(canonical_id)
+        if assignment:
+            unassign_item(scored_route, canonical_id)
+            if request.pack_sizes:
+                assign_item(scored_route, canonical_id, options)
+            else:
+                assign_item(scored_route, canonical_id, {assignment["item"]["retailer_id"]: options[assignment["item"]["retailer_id"]]})
+        refresh_route_score(scored_route, request.time_weight, request.price_weight)
+
+def build_canonical_by_product(catalog_data: dict) -> Dict[str, str]:
+    """Map retailer_product_id -> canonical_id."""
+    return {
+        item["retailer_product_id"]: item["canonical_id"]
+        for item in catalog_data.get("retailer_products", [])
+    }
+
+def build_product_families(products_data: dict) -> Dict[str, str]:
+    """Map canonical_id -> pack-size family."""
+    return {product["canonical_id"]: family_of(product) for product in products_data.get("products", [])}
+
+def mark_prices_changed(changed: Dict[str, Dict[str, Any]], previous_version: Optional[Tuple[str, ...]]) -> None:
+    """Price listener: flag session items whose retailer products were repriced.
+
+    In pack-size sessions an item's mix can use any pack of its family, so a repriced
+    pack flags every item of the family. This can run on an ingestion thread, so it
+    only records which items are stale; sessions apply the new prices under their own
+    lock on next access.
+    """
+    canonical_by_product = get_derived("canonical_by_product", ["retailer_catalog.json"], build_canonical_by_product)
+    repriced = {canonical_by_product[product_id] for product_id in changed if product_id in canonical_by_product}
+    if not repriced:
+        return
+    product_families = get_derived("product_families", ["products.json"], build_product_families)
+    repriced_families = {product_families[canonical_id] for canonical_id in repriced if canonical_id in product_families}
+    for session in list(sessions.values()):
+        basket = list(session["products"])
+        session["stale_items"].update(repriced.intersection(basket))
+        if session["request"].pack_sizes:
+            session["stale_items"].update(
+                canonical_id for canonical_id in basket if product_families.get(canonical_id) in repriced_families
+            )
+
+def refresh_stale_prices(session: Dict[str, Any]) -> bool:
+    """Re-price flagged items and update route scores incrementally; returns whether anything changed."""
+    stale: Set[str] = set(session["stale_items"])
+    session["stale_items"].difference_update(stale)
+    stale.intersection_update(session["products"])
+    if not stale:
+        return False
+
+    request = session["request"]
+    rebuild = request.click_collect
+    for canonical_id in stale:
+        options = build_item_options(session["products"][canonical_id], request)
+        session["options"][canonical_id] = options
+        if not set(options).issubset(session["retailers"]):
+            rebuild = True
+
+    if rebuild:
+        rebuild_route_table(session)
+        return True
+
+    for scored_route in session["routes"]:
+        for canonical_id in stale:
+            unassign_item(scored_route, canonical_id)
+            assign_item(scored_route, canonical_id, session["options"][canonical_id])
+        refresh_route_score(scored_route, request.time_weight, request.price_weight)
+    return True
+
+add_price_listener(mark_prices_changed)
+
+async def resolve_added_products(session: Dict[str, Any], change: BasketItemChange) -> List[ParsedProduct]:
+    """Turn an add change into parsed products, only calling the LLM for free text items.
+
+    Free text is parsed through the shared, threadpooled parse, so the event loop is
+    not blocked and concurrent identical adds share one LLM call.
+    """
+    if change.canonical_id:
+        products_data = load_json_data("products.json")
+        for product in products_data.get("products", []):
+            if product["canonical_id"] == change.canonical_id:
+                return [ParsedProduct(
+                    canonical_id=product["canonical_id"],
+                    canonical_name=product["canonical_name"],
+                    requested_item=change.item_text or product["canonical_name"],
+                    quantity=change.quantity,
+                    confidence=1.0
+                )]
+        raise HTTPException(
+            status_code=404,
+            detail=f"Product with ID '{change.canonical_id}' not found"
+        )
+
+    if change.item_text:
+        parsed_list = await parse_grocery_list_shared(change.item_text)
+        if not validate_products_only_from_data(parsed_list.parsed_products):
+            raise HTTPException(
+                status_code=400,
+                detail="Parsed products contain invalid canonical_ids not found in products.json"
+            )
+        session["unmatched_items"].extend(parsed_list.unmatched_items)
+        return parsed_list.parsed_products
+
+    raise HTTPException(
+        status_code=400,
+        detail="Adding an item requires a canonical_id or item_text"
+    )
+
+async def apply_basket_change(session: Dict[str, Any], change: BasketItemChange) -> None:
+    """Apply a single add, remove or quantity change to the session basket."""
+    if change.action == BasketAction.ADD:
+        for product in await resolve_added_products(session, change):
+            add_item(session, product)
+        return
+
+    if not change.canonical_id or change.canonical_id not in session["products"]:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Item '{change.canonical_id}' is not in the basket"
+        )
+
+    if change.action == BasketAction.REMOVE:
+        remove_item(session, change.canonical_id)
+    else:
+        current_quantity = session["products"][change.canonical_id].quantity
+        set_item_quantity(session, change.canonical_id, current_quantity + change.quantity)
+
+def build_session_sweep(session: Dict[str, Any]) -> Dict[str, Any]:
+    """Index the route table's weight-independent (price score, time score) vectors for weight sweeps."""
+    vectors = []
+    for scored_route in session["routes"]:
+        price_score, time_score, _ = compute_route_score(
+            scored_route["total_price"] + scored_route.get("min_spend_shortfall", 0.0) + scored_route.get("substitution_penalty", 0.0),
+            scored_route["total_time"]
+        )
+        vectors.append((plan_signature(scored_route), price_score, time_score, scored_route))
+    return build_weight_sweep(vectors)
+
+def weighted_route(scored_route: Dict[str, Any], **fields) -> WeightedRoute:
+    route_stores = scored_route["route"]["stores"]
+    return WeightedRoute.model_construct(
+        retailers=[store["retailer_id"] for store in route_stores],
+        store_ids=[store["store_id"] for store in route_stores],
+        total_cost=scored_route["total_price"],
+        total_time=scored_route["total_time"],
+        **fields
+    )
+
+async def build_session_response(session: Dict[str, Any]) -> OptimizationSessionResponse:
+    """Pick the best route from the session table and assemble the plan."""
+    request = session["request"]
+    # Every change to the route table ends here, so the sweep index is rebuilt alongside
+    session["sweep"] = build_session_sweep(session)
+    items = list(session["products"].values())
+    optimal_route = select_top_routes(session["routes"], request.num_alternatives + 1) if items else None
+
+    if not optimal_route:
+        message = "No items in the basket." if not items else "No optimal route found."
+        plan = create_empty_shopping_plan(message)
+        success = False
+    else:
+        # Links already found for this session are reused, so only new items are searched
+        plan = await assemble_shopping_plan(
+            optimal_route, session_price_dataset(session), items, session["user_location"],
+            request.location, request.num_alternatives, session["known_links"],
+            get_travel_model(request.travel_mode.value)
+        )
+        message = f"Session plan updated with {len(items)} items across {len(optimal_route['retailers_used'])} retailers ({plan.num_stores} stores)"
+        success = True
+
+    session["last_response"] = OptimizationSessionResponse(
+        session_id=session["session_id"],
+        expires_at=session["expires_at_utc"],
+        items=items,
+        unmatched_items=session["unmatched_items"],
+        plan=plan,
+        success=success,
+        message=message
+    )
+    return session["last_response"]
+
+@router.post("/", response_model=OptimizationSessionResponse, summary="Create optimization session")
+async def create_session(request: OptimizationRequest):
+    """Optimize a grocery list and keep the parsed basket and scored routes for incremental edits."""
+    try:
+        evict_expired_sessions()
+
+        user_location = parse_location(request.location)
+        parsed_list = await parse_grocery_list_shared(request.grocery_list)
+
+        if not parsed_list.parsed_products:
+            raise HTTPException(
+                status_code=400,
+                detail="No items could be parsed from the grocery list."
+            )
+
+        if not validate_products_only_from_data(parsed_list.parsed_products):
+            raise HTTPException(
+                status_code=400,
+                detail="Parsed products contain invalid canonical_ids not found in products.json"
+            )
+
+        # Merge duplicate items so each canonical product appears once in the basket
+        products = {}
+        for product in parsed_list.parsed_products:
+            if product.canonical_id in products:
+                existing = products[product.canonical_id]
+                product = existing.model_copy(update={"quantity": existing.quantity + product.quantity})
+            products[product.canonical_id] = product
+
+        session = {
+            "session_id": uuid.uuid4().hex,
+            "request": request,
+            "user_location": user_location,
+            "products": products,
+            "options": {canonical_id: build_item_options(product, request) for canonical_id, product in products.items()},
+            "unmatched_items": list(parsed_list.unmatched_items),
+            "known_links": {},
+            "stale_items": set(),
+            "lock": asyncio.Lock()
+        }
+        touch_session(session)
+        rebuild_route_table(session)
+
+        if not session["routes"]:
+            raise HTTPException(
+                status_code=400,
+                detail="No possible retailer routes found."
+            )
+
+        sessions[session["session_id"]] = session
+
+        async with session["lock"]:
+            return plan_response(await build_session_response(session))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to create optimization session: {str(e)}"
+        )
+
+@router.get("/{session_id}", response_model=OptimizationSessionResponse, summary="Get optimization session")
+async def get_session_plan(session_id: str):
+    """Get the current basket and plan of an optimization session."""
+    try:
+        session = get_session(session_id)
+        async with session["lock"]:
+            # Prices ingested since the last request are applied before answering
+            if refresh_stale_prices(session):
+                await build_session_response(session)
+            response = session["last_response"]
+            response.expires_at = session["expires_at_utc"]
+            return plan_response(response)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to load optimization session: {str(e)}"
+        )
+
+@router.patch("/{session_id}/items", response_model=OptimizationSessionResponse, summary="Update session basket")
+async def update_session_items(session_id: str, request: BasketUpdateRequest):
+    """Apply item adds, removals and quantity deltas, re-scoring routes incrementally."""
+    try:
+        session = get_session(session_id)
+        async with session["lock"]:
+            refresh_stale_prices(session)
+            for change in request.changes:
+                await apply_basket_change(session, change)
+            return plan_response(await build_session_response(session))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to update optimization session: {str(e)}"
+        )
+
+@router.get("/{session_id}/sweep", response_model=WeightSweepResponse, summary="Re-rank session routes for other weights")
+async def sweep_session_weights(
+    session_id: str,
+    time_weight: Optional[float] = Query(None, ge=0, description="Weight for time optimization"),
+    price_weight: Optional[float] = Query(None, ge=0, description="Weight for price optimization"),
+    limit: int = Query(3, ge=1, le=20, description="Number of ranked plans to return")
+):
+    """Rank the session's routes for any weights, and return the lower convex hull of (cost, time).
+
+    Uses the route vectors cached with the session plan, so nothing is parsed or scored
+    again. Weights are optional; without them only the hull is returned.
+    """
+    try:
+        session = get_session(session_id)
+        async with session["lock"]:
+            if refresh_stale_prices(session):
+                await build_session_response(session)
+            sweep = session["sweep"]
+
+        ranked = []
+        if time_weight is not None or price_weight is not None:
+            if time_weight is None:
+                time_weight = 1.0 - price_weight if price_weight <= 1 else 0.0
+            if price_weight is None:
+                price_weight = 1.0 - time_weight if time_weight <= 1 else 0.0
+            ranked = [
+                weighted_route(vector[3], route_score=score)
+                for score, vector in rank_routes(sweep, time_weight, price_weight, limit)
+            ]
+
+        hull = [
+            weighted_route(vector[3], time_weight_range=list(weight_range))
+            for vector, weight_range in zip(sweep["hull"], hull_weight_ranges(sweep))
+        ]
+        return WeightSweepResponse(
+            session_id=session_id,
+            time_weight=time_weight,
+            price_weight=price_weight,
+            ranked=ranked,
+            hull=hull
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to sweep session weights: {str(e)}"
+        )
+
+@router.delete("/{session_id}", summary="Delete optimization session")
+async def delete_session(session_id: str):
+    """Delete an optimization session."""
+    try:
+        get_session(session_id)
+        del sessions[session_id]
+        return {"message": f"Session '{session_id}' deleted successfully"}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to delete optimization session: {str(e)}"
+        )
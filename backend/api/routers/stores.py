@@ -9,9 +9,13 @@ from api.models import (
     Store, StoreResponse, StoreSearchRequest, StoreSearchResponse,
     Location, ErrorResponse
 )
+from api.streaming import build_validated_list, stream_list_response
 
 router = APIRouter()
 
+# Data files read by these endpoints (their versions drive the HTTP validators)
+DATA_FILES = ["stores.json"]
+
 def load_json_data(filename: str) -> dict:
     """Load JSON data from the data directory."""
     data_path = Path(__file__).parent.parent.parent.parent / "data" / filename
@@ -51,6 +55,24 @@ async def get_all_stores():
             detail=f"Failed to load stores: {str(e)}"
         )
 
+@router.get("/stream", summary="Stream stores")
+async def stream_stores(
+    format: str = Query("ndjson", description="Stream format: ndjson or json"),
+    limit: Optional[int] = Query(None, ge=1, le=10000, description="Maximum number of items in this page"),
+    cursor: Optional[str] = Query(None, description="Cursor from the previous page")
+):
+    """Stream stores as NDJSON or a chunked JSON array, one page at a time."""
+    try:
+        stores = build_validated_list("stores.json", "stores", Store)
+        return stream_list_response("stores", stores, "store_id", format, limit, cursor)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to stream stores: {str(e)}"
+        )
+
 @router.get("/search", response_model=StoreSearchResponse, summary="Search stores")
 async def search_stores(
     lat: Optional[float] = Query(None, description="Latitude for location-based search"),
@@ -0,0 +1,48 @@
+# Fast JSON serialization for plan responses
+from typing import Any, Dict
+
+import orjson
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+from api.models import ShoppingPlan
+
+# Match Pydantic's JSON output for UTC datetimes ("...Z")
+ORJSON_OPTIONS = orjson.OPT_UTC_Z
+
+class FastJSONResponse(Response):
+    """orjson-backed JSON response that also accepts already serialized bytes."""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        if isinstance(content, BaseModel):
+            content = content.model_dump()
+        return orjson.dumps(content, option=ORJSON_OPTIONS)
+
+def splice_fields(object_bytes: bytes, fields: Dict[str, bytes]) -> bytes:
+    """Add pre-serialized values to a serialized JSON object."""
+    extra = b",".join(orjson.dumps(key) + b":" + value for key, value in fields.items())
+    if object_bytes == b"{}":
+        return b"{" + extra + b"}"
+    return object_bytes[:-1] + b"," + extra + b"}"
+
+def serialize_plan(plan: ShoppingPlan) -> bytes:
+    """Serialize a shopping plan, encoding its baskets once for both the stores and store_baskets aliases."""
+    baskets = orjson.dumps([basket.model_dump() for basket in plan.store_baskets], option=ORJSON_OPTIONS)
+    if plan.stores is plan.store_baskets:
+        stores = baskets
+    else:
+        stores = orjson.dumps([basket.model_dump() for basket in plan.stores], option=ORJSON_OPTIONS)
+
+    body = orjson.dumps(plan.model_dump(exclude={"stores", "store_baskets"}), option=ORJSON_OPTIONS)
+    return splice_fields(body, {"stores": stores, "store_baskets": baskets})
+
+def plan_response(response: BaseModel) -> FastJSONResponse:
+    """Serialize a response model with a `plan` field, skipping FastAPI's response re-validation.
+
+    Only for responses built from internally trusted data.
+    """
+    body = orjson.dumps(response.model_dump(exclude={"plan"}), option=ORJSON_OPTIONS)
+    return FastJSONResponse(splice_fields(body, {"plan": serialize_plan(response.plan)}))
@@ -0,0 +1,42 @@
+# Single-flight coalescing: concurrent calls with the same key share one computation
+from typing import Any, Awaitable, Callable, Dict, Hashable
+import asyncio
+
+class SingleFlight:
+    """Run at most one computation per key at a time; concurrent callers await its result.
+
+    Nothing is cached: the key is released as soon as the computation finishes, so a
+    later call starts afresh. The computation runs as its own task, so a caller that
+    is cancelled (such as a disconnected client) does not cancel it for the others.
+    Exceptions are raised in every waiting caller.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.in_flight: Dict[Hashable, asyncio.Task] = {}
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self.in_flight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            print(f"[ShopLyft] Joining in-flight {self.name} ({len(self.in_flight)} in flight)")
+        else:
+            task = asyncio.ensure_future(fn())
+            self.in_flight[key] = task
+            task.add_done_callback(lambda done: self.release(key, done))
+        return await asyncio.shield(task)
+
+    def release(self, key: Hashable, task: asyncio.Task) -> None:
+        if self.in_flight.get(key) is task:
+            del self.in_flight[key]
+        # Retrieve the outcome so a computation nobody awaits anymore is not reported as unhandled
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, int]:
+        return {"in_flight": len(self.in_flight), "coalesced": self.coalesced}
+
+def normalize_text(text: str) -> str:
+    """Case- and whitespace-insensitive form of free text used in coalescing keys."""
+    return " ".join(text.lower().split())
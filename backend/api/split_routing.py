@@ -0,0 +1,236 @@
+# Multi-shopper split routing: share the stores to visit between shoppers, minimizing the makespan
+"""
+Each shopper leaves their own start, visits their share of the retailers (one store
+per retailer) and returns to their start. A trip's time is its travel plus the
+in-store time of its retailers, and the makespan is the longest trip. Small
+instances are solved exactly: Held-Karp gives each shopper's best tour for every
+subset of the retailers, and a DP over subsets splits the retailers between the
+shoppers. Larger ones give each retailer to the shopper with the shortest
+out-and-back trip, join each shopper's stops with the savings algorithm, then
+improve the split by local search (relocating and exchanging stops between
+shoppers, 2-opt and store swaps).
+
+Splits are compared by makespan, then by the total time of all trips.
+"""
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+import itertools
+
+# Largest number of retailers solved exactly
+EXACT_MAX_RETAILERS = 6
+
+# Local search rounds before the heuristic stops regardless
+MAX_LOCAL_SEARCH_ROUNDS = 200
+
+Place = Dict[str, Any]
+Minutes = Callable[[Place, Place], float]
+
+# Stores visited by each shopper, in visiting order
+Tours = List[List[Place]]
+
+def trip_time(start: Place, stores: List[Place], service: Dict[str, float], minutes: Minutes) -> float:
+    """Round trip travel from start through stores, plus their in-store time."""
+    if not stores:
+        return 0.0
+    total = minutes(start, stores[0]) + minutes(stores[-1], start)
+    for from_store, to_store in zip(stores, stores[1:]):
+        total += minutes(from_store, to_store)
+    return total + sum(service[store["retailer_id"]] for store in stores)
+
+def split_key(starts: List[Place], tours: Tours, service: Dict[str, float], minutes: Minutes) -> Tuple[float, float]:
+    """(makespan, total time) of a split."""
+    times = [trip_time(start, stores, service, minutes) for start, stores in zip(starts, tours)]
+    return max(times), sum(times)
+
+def best_tours(
+    start: Place,
+    retailers: List[str],
+    candidates: Dict[str, List[Place]],
+    service: Dict[str, float],
+    minutes: Minutes
+) -> List[Tuple[float, List[Place]]]:
+    """Held-Karp over retailers with a store choice per retailer.
+
+    Returns, for every bitmask of retailers, the shortest trip from start visiting
+    one store of each as (time, stores).
+    """
+    nodes = [(bit, store) for bit, retailer_id in enumerate(retailers) for store in candidates[retailer_id]]
+    from_start = [minutes(start, store) for _, store in nodes]
+    to_start = [minutes(store, start) for _, store in nodes]
+    between = [[minutes(a, b) for _, b in nodes] for _, a in nodes]
+
+    # (mask, last node) -> (travel time, previous node)
+    paths: Dict[Tuple[int, int], Tuple[float, int]] = {}
+    for node, (bit, _) in enumerate(nodes):
+        key = (1 << bit, node)
+        if key not in paths or from_start[node] < paths[key][0]:
+            paths[key] = (from_start[node], -1)
+
+    full = (1 << len(retailers)) - 1
+    for mask in range(1, full + 1):
+        for node, (bit, _) in enumerate(nodes):
+            entry = paths.get((mask, node))
+            if entry is None:
+                continue
+            for next_node, (next_bit, _) in enumerate(nodes):
+                if mask & (1 << next_bit):
+                    continue
+                key = (mask | (1 << next_bit), next_node)
+                candidate = entry[0] + between[node][next_node]
+                if key not in paths or candidate < paths[key][0]:
+                    paths[key] = (candidate, node)
+
+    tours: List[Tuple[float, List[Place]]] = [(0.0, [])]
+    for mask in range(1, full + 1):
+        best_time, best_node = float("inf"), -1
+        for node in range(len(nodes)):
+            entry = paths.get((mask, node))
+            if entry is not None and entry[0] + to_start[node] < best_time:
+                best_time, best_node = entry[0] + to_start[node], node
+
+        stores, node, remaining = [], best_node, mask
+        while node >= 0:
+            stores.append(nodes[node][1])
+            previous = paths[(remaining, node)][1]
+            remaining &= ~(1 << nodes[node][0])
+            node = previous
+        stores.reverse()
+        time_in_store = sum(service[retailers[bit]] for bit in range(len(retailers)) if mask & (1 << bit))
+        tours.append((best_time + time_in_store, stores))
+    return tours
+
+def exact_split(
+    starts: List[Place],
+    candidates: Dict[str, List[Place]],
+    service: Dict[str, float],
+    minutes: Minutes
+) -> Tours:
+    """Optimal split: each shopper's Held-Karp tours, combined by a DP over retailer subsets."""
+    retailers = list(candidates)
+    full = (1 << len(retailers)) - 1
+    tours = [best_tours(start, retailers, candidates, service, minutes) for start in starts]
+
+    # best[mask]: (makespan, total time) of the shoppers so far covering mask
+    best = [(tours[0][mask][0], tours[0][mask][0]) for mask in range(full + 1)]
+    choices = []
+    for shopper in range(1, len(starts)):
+        shopper_best, shopper_choice = [], []
+        for mask in range(full + 1):
+            best_key, best_subset = None, 0
+            subset = mask
+            while True:
+                time = tours[shopper][subset][0]
+                previous = best[mask ^ subset]
+                key = (max(previous[0], time), previous[1] + time)
+                if best_key is None or key < best_key:
+                    best_key, best_subset = key, subset
+                if subset == 0:
+                    break
+                subset = (subset - 1) & mask
+            shopper_best.append(best_key)
+            shopper_choice.append(best_subset)
+        best = shopper_best
+        choices.append(shopper_choice)
+
+    split: Tours = [[] for _ in starts]
+    mask = full
+    for shopper in range(len(starts) - 1, 0, -1):
+        subset = choices[shopper - 1][mask]
+        split[shopper] = tours[shopper][subset][1]
+        mask ^= subset
+    split[0] = tours[0][mask][1]
+    return split
+
+def savings_tour(start: Place, stores: List[Place], minutes: Minutes) -> List[Place]:
+    """Join single-store trips from start into one tour with the Clarke-Wright savings algorithm."""
+    routes = [[store] for store in stores]
+    while len(routes) > 1:
+        best_saving, best_pair = None, None
+        for (i, first), (j, second) in itertools.permutations(enumerate(routes), 2):
+            saving = minutes(first[-1], start) + minutes(start, second[0]) - minutes(first[-1], second[0])
+            if best_saving is None or saving > best_saving:
+                best_saving, best_pair = saving, (i, j)
+        i, j = best_pair
+        merged = routes[i] + routes[j]
+        routes = [route for index, route in enumerate(routes) if index not in (i, j)] + [merged]
+    return routes[0] if routes else []
+
+def split_neighbours(tours: Tours, candidates: Dict[str, List[Place]]) -> Iterator[Tours]:
+    """Splits one move away: relocate or exchange a stop between shoppers, 2-opt, or another store."""
+    for shopper, stores in enumerate(tours):
+        for position, store in enumerate(stores):
+            remaining = stores[:position] + stores[position + 1:]
+            for other, other_stores in enumerate(tours):
+                if other == shopper:
+                    continue
+                for replacement in candidates[store["retailer_id"]]:
+                    for insert_at in range(len(other_stores) + 1):
+                        moved = [list(tour) for tour in tours]
+                        moved[shopper] = remaining
+                        moved[other] = other_stores[:insert_at] + [replacement] + other_stores[insert_at:]
+                        yield moved
+
+            # Exchange with a stop of a later shopper
+            for other in range(shopper + 1, len(tours)):
+                for other_position in range(len(tours[other])):
+                    moved = [list(tour) for tour in tours]
+                    moved[shopper][position], moved[other][other_position] = tours[other][other_position], store
+                    yield moved
+
+        for i in range(len(stores) - 1):
+            for j in range(i + 1, len(stores)):
+                moved = [list(tour) for tour in tours]
+                moved[shopper] = stores[:i] + stores[i:j + 1][::-1] + stores[j + 1:]
+                yield moved
+
+        for position, store in enumerate(stores):
+            for replacement in candidates[store["retailer_id"]]:
+                if replacement["store_id"] != store["store_id"]:
+                    moved = [list(tour) for tour in tours]
+                    moved[shopper] = stores[:position] + [replacement] + stores[position + 1:]
+                    yield moved
+
+def savings_split(
+    starts: List[Place],
+    candidates: Dict[str, List[Place]],
+    service: Dict[str, float],
+    minutes: Minutes
+) -> Tours:
+    """Heuristic split: nearest out-and-back assignment, savings tours, then local search."""
+    assigned: List[List[Place]] = [[] for _ in starts]
+    for stores in candidates.values():
+        shopper, store = min(
+            ((shopper, store) for shopper in range(len(starts)) for store in stores),
+            key=lambda choice: minutes(starts[choice[0]], choice[1]) + minutes(choice[1], starts[choice[0]])
+        )
+        assigned[shopper].append(store)
+    tours = [savings_tour(start, stores, minutes) for start, stores in zip(starts, assigned)]
+
+    current = split_key(starts, tours, service, minutes)
+    for _ in range(MAX_LOCAL_SEARCH_ROUNDS):
+        for candidate in split_neighbours(tours, candidates):
+            key = split_key(starts, candidate, service, minutes)
+            if key < current:
+                tours, current = candidate, key
+                break
+        else:
+            break
+    return tours
+
+def solve_split(
+    starts: List[Place],
+    candidates: Dict[str, List[Place]],
+    service: Dict[str, float],
+    minutes: Minutes
+) -> Dict[str, Any]:
+    """Split the retailers between the shoppers.
+
+    candidates maps each retailer to the stores that may represent it and service
+    maps it to its in-store minutes. Returns the tours per shopper, each trip's time,
+    the makespan and the solver used ("exact" or "savings").
+    """
+    if len(candidates) <= EXACT_MAX_RETAILERS:
+        tours, solver = exact_split(starts, candidates, service, minutes), "exact"
+    else:
+        tours, solver = savings_split(starts, candidates, service, minutes), "savings"
+    times = [trip_time(start, stores, service, minutes) for start, stores in zip(starts, tours)]
+    return {"tours": tours, "times": times, "makespan": max(times), "solver": solver}
@@ -0,0 +1,123 @@
+# Streaming list responses with cursor pagination
+from typing import Callable, Iterator, List, Optional, Tuple, Type
+import base64
+import json
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from api.data_store import get_derived
+
+STREAM_FORMATS = ("ndjson", "json")
+
+# Items serialized per chunk written to the socket
+CHUNK_ITEMS = 200
+
+def build_validated_list(
+    filename: str,
+    list_key: str,
+    model: Type[BaseModel],
+    transform: Optional[Callable[[List[dict]], List[dict]]] = None
+) -> List[dict]:
+    """Validate a data file's list against a model once per file version.
+
+    Streaming endpoints serialize the cached plain dicts directly, so items are not
+    re-validated on every request.
+    """
+    def builder(data: dict) -> List[dict]:
+        items = [model(**item).model_dump(mode="json") for item in data.get(list_key, [])]
+        return transform(items) if transform else items
+
+    return get_derived(f"validated:{filename}:{list_key}", [filename], builder)
+
+def encode_cursor(offset: int, key_value: str) -> str:
+    """Encode the position after the last item sent, and that item's key."""
+    return base64.urlsafe_b64encode(f"{offset}:{key_value}".encode()).decode().rstrip("=")
+
+def find_cursor_offset(items: List[dict], key: str, cursor: str) -> int:
+    """Resolve a cursor to a list offset.
+
+    The offset is trusted when the item before it still has the recorded key; if the
+    list changed underneath, the key is searched for instead.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        offset_text, key_value = base64.urlsafe_b64decode(padded.encode()).decode().split(":", 1)
+        offset = int(offset_text)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    if 0 < offset <= len(items) and items[offset - 1].get(key) == key_value:
+        return offset
+    for position, item in enumerate(items):
+        if item.get(key) == key_value:
+            return position + 1
+    raise HTTPException(status_code=400, detail="Cursor no longer matches any item")
+
+def page_items(
+    items: List[dict],
+    key: str,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None
+) -> Tuple[List[dict], Optional[str]]:
+    """Slice one page from items; returns the page and the cursor for the next one."""
+    start = find_cursor_offset(items, key, cursor) if cursor else 0
+    end = len(items) if limit is None else min(len(items), start + limit)
+    page = items[start:end]
+    next_cursor = encode_cursor(end, page[-1][key]) if page and end < len(items) else None
+    return page, next_cursor
+
+def iter_ndjson(items: List[dict], fields: Optional[List[str]] = None) -> Iterator[bytes]:
+    """Yield items as newline-delimited JSON in chunks."""
+    for start in range(0, len(items), CHUNK_ITEMS):
+        chunk = items[start:start + CHUNK_ITEMS]
+        yield "".join(json.dumps(select_fields(item, fields)) + "\n" for item in chunk).encode()
+
+def iter_json_object(
+    list_key: str,
+    items: List[dict],
+    next_cursor: Optional[str],
+    fields: Optional[List[str]] = None
+) -> Iterator[bytes]:
+    """Yield {list_key: [...], "next_cursor": ...} with the array written in chunks."""
+    yield f'{{"{list_key}":['.encode()
+    for start in range(0, len(items), CHUNK_ITEMS):
+        chunk = items[start:start + CHUNK_ITEMS]
+        prefix = "," if start else ""
+        yield (prefix + ",".join(json.dumps(select_fields(item, fields)) for item in chunk)).encode()
+    yield f'],"next_cursor":{json.dumps(next_cursor)}}}'.encode()
+
+def select_fields(item: dict, fields: Optional[List[str]]) -> dict:
+    """Restrict an item to a model's fields when it carries extra internal keys."""
+    if fields is None:
+        return item
+    return {field: item[field] for field in fields if field in item}
+
+def stream_list_response(
+    list_key: str,
+    items: List[dict],
+    key: str,
+    stream_format: str = "ndjson",
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    fields: Optional[List[str]] = None
+) -> StreamingResponse:
+    """Build a streaming page of items as NDJSON or a chunked JSON object.
+
+    NDJSON carries the next page's cursor in the X-Next-Cursor header; the JSON form
+    also includes it as next_cursor.
+    """
+    if stream_format not in STREAM_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported stream format '{stream_format}', expected one of: {', '.join(STREAM_FORMATS)}"
+        )
+
+    page, next_cursor = page_items(items, key, limit, cursor)
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+    if stream_format == "ndjson":
+        return StreamingResponse(iter_ndjson(page, fields), media_type="application/x-ndjson", headers=headers)
+    return StreamingResponse(
+        iter_json_object(list_key, page, next_cursor, fields), media_type="application/json", headers=headers
+    )
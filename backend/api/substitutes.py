@@ -0,0 +1,119 @@
+# Substitution graph: what each retailer can offer in place of a product it does not sell
+"""
+For every retailer and every product it has no priced catalog entry for, the graph
+lists the retailer's acceptable substitutes: products in the same category and
+measure whose unit_size is within SIZE_TOLERANCE of the missing one. Each edge
+says how many substitute packs cover one missing pack and carries a cost penalty,
+a share of their price that grows for another kind of product and for a larger
+size difference, and each list is sorted by the packs' price plus penalty. The
+graph is built once per version of the price slice, catalog and products, so
+finding the best substitute for a missing item is a dictionary lookup.
+"""
+from typing import Any, Dict, List, Optional
+import bisect
+import math
+
+from api.data_store import data_version, load_cached_json
+from api.price_history import latest_prices_version, load_latest_prices
+
+# Substitutes may be at most this many times larger or smaller than the missing product
+SIZE_TOLERANCE = 2.0
+
+# Penalty as a share of the substitute's price: a base rate, more for another kind of
+# product (e.g. cereal for pasta), and more per doubling or halving of the size
+SUBSTITUTE_PENALTY_RATE = 0.1
+OTHER_KIND_PENALTY_RATE = 0.25
+SIZE_PENALTY_RATE = 0.1
+
+# Substitutes kept per missing product and retailer, best first
+MAX_SUBSTITUTES = 3
+
+# (price slice version, catalog version, products version) -> graph
+_graph_cache: Dict[str, Any] = {}
+
+def product_kind(canonical_id: str) -> str:
+    """Kind of product a canonical ID names ("milk-fullcream-2l" -> "milk")."""
+    return canonical_id.split("-", 1)[0]
+
+def substitution_penalty(missing: Dict[str, Any], substitute: Dict[str, Any], price: float) -> float:
+    """Cost penalty for buying substitute at price instead of the missing product."""
+    rate = SUBSTITUTE_PENALTY_RATE
+    if product_kind(substitute["canonical_id"]) != product_kind(missing["canonical_id"]):
+        rate += OTHER_KIND_PENALTY_RATE
+    rate += SIZE_PENALTY_RATE * abs(math.log2(substitute["unit_size"] / missing["unit_size"]))
+    return round(price * rate, 2)
+
+def build_substitution_graph(products_data: dict, catalog_data: dict, prices: List[Dict[str, Any]]) -> Dict[str, Dict[str, List[Dict[str, Any]]]]:
+    """Adjacency index retailer_id -> missing canonical_id -> substitute edges, best first.
+
+    Each edge has the substitute's canonical_id, retailer_product_id, product_name and
+    price, the packs that replace one pack of the missing product, and the penalty
+    for those packs. Products a retailer sells have no entry for that retailer.
+    """
+    products = {
+        product["canonical_id"]: product
+        for product in products_data.get("products", [])
+        if product.get("unit_size")
+    }
+    price_lookup = {price["retailer_product_id"]: price["price"] for price in prices}
+
+    # retailer_id -> (category, measure) -> offers sorted by unit_size
+    offers: Dict[str, Dict[tuple, List[tuple]]] = {}
+    for catalog_item in catalog_data.get("retailer_products", []):
+        product = products.get(catalog_item["canonical_id"])
+        price = price_lookup.get(catalog_item["retailer_product_id"])
+        if product is None or price is None:
+            continue
+        group = offers.setdefault(catalog_item["retailer_id"], {}).setdefault(
+            (product.get("category"), product.get("unit_measure")), []
+        )
+        group.append((product["unit_size"], product["canonical_id"], catalog_item, price))
+
+    graph: Dict[str, Dict[str, List[Dict[str, Any]]]] = {}
+    for retailer_id, groups in offers.items():
+        sold = set()
+        for group in groups.values():
+            group.sort(key=lambda offer: (offer[0], offer[1]))
+            sold.update(offer[1] for offer in group)
+        sizes = {key: [offer[0] for offer in group] for key, group in groups.items()}
+
+        retailer_graph = graph.setdefault(retailer_id, {})
+        for canonical_id, missing in products.items():
+            key = (missing.get("category"), missing.get("unit_measure"))
+            if canonical_id in sold or key not in groups:
+                continue
+            group = groups[key]
+            low = bisect.bisect_left(sizes[key], missing["unit_size"] / SIZE_TOLERANCE)
+            high = bisect.bisect_right(sizes[key], missing["unit_size"] * SIZE_TOLERANCE)
+            edges = []
+            for size, substitute_id, catalog_item, price in group[low:high]:
+                packs = math.ceil(missing["unit_size"] / size - 1e-9)
+                edges.append({
+                    "canonical_id": substitute_id,
+                    "retailer_product_id": catalog_item["retailer_product_id"],
+                    "product_name": catalog_item["name"],
+                    "price": price,
+                    "packs": packs,
+                    "penalty": substitution_penalty(missing, products[substitute_id], price * packs)
+                })
+            if edges:
+                edges.sort(key=lambda edge: edge["price"] * edge["packs"] + edge["penalty"])
+                retailer_graph[canonical_id] = edges[:MAX_SUBSTITUTES]
+    return graph
+
+def get_substitution_graph() -> Dict[str, Dict[str, List[Dict[str, Any]]]]:
+    """Get the substitution graph, rebuilt once per version of the price slice, catalog and products."""
+    key = (latest_prices_version(), data_version("retailer_catalog.json"), data_version("products.json"))
+    if _graph_cache.get("key") != key:
+        graph = build_substitution_graph(
+            load_cached_json("products.json"),
+            load_cached_json("retailer_catalog.json"),
+            load_latest_prices().get("prices", [])
+        )
+        _graph_cache.update(key=key, value=graph)
+    return _graph_cache["value"]
+
+def best_substitute(graph: Dict[str, Dict[str, List[Dict[str, Any]]]], retailer_id: str, canonical_id: str) -> Optional[Dict[str, Any]]:
+    """The retailer's best substitute for a product it does not sell, or None."""
+    edges = graph.get(retailer_id, {}).get(canonical_id)
+    return edges[0] if edges else None
@@ -0,0 +1,350 @@
+# Synthetic datasets: deterministic data files at configurable sizes for scale testing
+"""
+Writes products.json, stores.json, retailers.json, retailer_catalog.json,
+price_snapshots.json and plans.json in the schema the routers read.
+
+Every record is a pure function of the seed and its index, drawn from a splitmix64
+hash rather than a shared random stream, so records are generated one at a time and
+written as they are generated: memory stays flat at any size, the catalog and its
+prices are written in one pass without keeping either, and the same seed and sizes
+always give byte-identical files.
+
+Products come in pack-size families ("milk-line3-1l", "milk-line3-2l") of a few
+dozen kinds across the sample data's categories. Each retailer sells a seeded share
+of the products (every product is sold by at least one retailer) at a price drawn
+around the kind's unit price, and stores are spread around Sydney.
+
+Run from the backend directory:
+  python -m api.synthetic_data OUT_DIR --products 100000 --stores 10000 --retailers 20 [--seed 0]
+"""
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+import argparse
+import os
+import tempfile
+
+import orjson
+
+DEFAULT_SEED = 0
+
+# Share of the products each retailer sells
+DEFAULT_COVERAGE = 0.7
+
+# Stores are spread over a square around this point, sized to keep SYDNEY_STORE_DENSITY
+SYDNEY_CENTER = (-33.8688, 151.2093)
+SYDNEY_STORE_DENSITY = 4000.0  # stores per square degree, about that of the sample stores
+MIN_SPAN_DEGREES = 0.1
+
+# (kind, category, unit_type, unit_measure, pack sizes, typical price per measure unit)
+PRODUCT_KINDS: List[Tuple[str, str, str, str, Tuple[float, ...], float]] = [
+    ("milk", "dairy", "volume", "L", (1.0, 2.0, 3.0), 1.6),
+    ("yogurt", "dairy", "weight", "kg", (0.5, 1.0), 6.0),
+    ("cheese", "dairy", "weight", "kg", (0.25, 0.5), 16.0),
+    ("eggs", "dairy", "count", "piece", (6, 12, 18), 0.42),
+    ("butter", "dairy", "weight", "kg", (0.25, 0.5), 14.0),
+    ("bread", "bakery", "weight", "kg", (0.65, 0.7, 0.75), 4.5),
+    ("rolls", "bakery", "count", "piece", (4, 6), 0.7),
+    ("pasta", "pantry", "weight", "kg", (0.5, 1.0), 3.0),
+    ("rice", "pantry", "weight", "kg", (1.0, 2.0, 5.0), 2.4),
+    ("cereal", "pantry", "weight", "kg", (0.5, 0.75), 9.0),
+    ("olive-oil", "pantry", "volume", "L", (0.5, 1.0), 15.0),
+    ("tomato-sauce", "pantry", "weight", "kg", (0.4, 0.7), 5.0),
+    ("flour", "pantry", "weight", "kg", (1.0, 2.0), 1.5),
+    ("orange-juice", "beverages", "volume", "L", (1.0, 2.0), 2.6),
+    ("water", "beverages", "volume", "L", (1.5, 10.0), 0.6),
+    ("apples", "fresh-produce", "weight", "kg", (1.0,), 5.0),
+    ("potatoes", "fresh-produce", "weight", "kg", (1.0, 2.0, 4.0), 2.5),
+    ("carrots", "fresh-produce", "weight", "kg", (0.5, 1.0), 2.2),
+    ("chicken-breast", "meat", "weight", "kg", (0.5, 1.0), 12.0),
+    ("mince-beef", "meat", "weight", "kg", (0.5, 1.0), 13.0),
+]
+
+PRODUCT_STYLES = ["Classic", "Organic", "Farmhouse", "Premium", "Value", "Select", "Lite", "Homestyle"]
+
+SUBURBS = [
+    "Sydney", "Bondi Junction", "Pyrmont", "Newtown", "Double Bay", "Darlinghurst", "Surry Hills",
+    "Glebe", "Alexandria", "Waterloo", "Leichhardt", "Mascot", "Chatswood", "Parramatta", "Ryde",
+    "Strathfield", "Burwood", "Randwick", "Marrickville", "Hurstville",
+]
+
+# (open, close) every day, as in the sample stores
+OPENING_HOURS = [("07:00", "22:00"), ("06:00", "23:00"), ("08:30", "20:00"), ("07:00", "23:00")]
+
+WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+# Click & collect minimums; the largest means no click & collect, like ALDI in the sample
+MIN_SPENDS = [30.0, 50.0, 75.0, 2147483647]
+
+UNIT_PRICE_MEASURES = {"L": "per_L", "kg": "per_kg", "piece": "per_each"}
+
+# Hash streams, so each kind of draw is independent of the others
+PRODUCT, STORE, RETAILER, COVERAGE, PRICE, PLAN = range(6)
+
+MASK64 = (1 << 64) - 1
+
+def splitmix64(value: int) -> int:
+    value = (value + 0x9E3779B97F4A7C15) & MASK64
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & MASK64
+    return value ^ (value >> 31)
+
+def draw(seed: int, *keys: int) -> float:
+    """Uniform float in [0, 1) determined by the seed and keys."""
+    value = seed
+    for key in keys:
+        value = splitmix64(value ^ key)
+    return (value >> 11) / float(1 << 53)
+
+def size_token(size: float, unit_measure: str) -> str:
+    """Pack size as a canonical ID suffix ("2l", "500ml", "1kg", "12pk")."""
+    if unit_measure == "piece":
+        return f"{int(size)}pk"
+    small, large = ("ml", "l") if unit_measure == "L" else ("g", "kg")
+    if size < 1 or size != int(size):
+        return f"{round(size * 1000)}{small}"
+    return f"{int(size)}{large}"
+
+def size_label(size: float, unit_measure: str) -> str:
+    """Pack size for display names ("2L", "500ml", "12 Pack")."""
+    if unit_measure == "piece":
+        return f"{int(size)} Pack"
+    token = size_token(size, unit_measure)
+    return token.upper() if token.endswith("l") and not token.endswith("ml") else token
+
+def synthetic_retailer(seed: int, index: int) -> Dict[str, Any]:
+    return {
+        "retailer_id": f"retailer-{index + 1:02d}",
+        "display_name": f"Retailer {index + 1:02d}",
+        "click_collect": {
+            "min_spend": MIN_SPENDS[int(draw(seed, RETAILER, index) * len(MIN_SPENDS))],
+            "currency": "AUD"
+        },
+        # Not part of the schema: the retailer's price level, used for its prices
+        "_price_factor": 0.85 + 0.3 * draw(seed, RETAILER, index, 1)
+    }
+
+def synthetic_product(seed: int, index: int) -> Dict[str, Any]:
+    """Product index: consecutive products of a kind form its pack-size families."""
+    kind, category, unit_type, unit_measure, sizes, unit_price = PRODUCT_KINDS[index % len(PRODUCT_KINDS)]
+    variant = index // len(PRODUCT_KINDS)
+    line, size = variant // len(sizes), sizes[variant % len(sizes)]
+    style = PRODUCT_STYLES[line % len(PRODUCT_STYLES)]
+    title = kind.replace("-", " ").title()
+    return {
+        "canonical_id": f"{kind}-line{line}-{size_token(size, unit_measure)}",
+        "canonical_name": f"{title} {style} {line} {size_label(size, unit_measure)}",
+        "category": category,
+        "unit_type": unit_type,
+        "unit_size": float(size) if unit_measure != "piece" else int(size),
+        "unit_measure": unit_measure,
+        "aliases": [f"{kind.replace('-', ' ')} {size_token(size, unit_measure)}", f"{style.lower()} {kind.replace('-', ' ')}"],
+        # Not part of the schema: the line's price per measure unit, shared by its pack sizes
+        "_unit_price": unit_price * (0.8 + 0.4 * draw(seed, PRODUCT, kind_line_key(index, line)))
+    }
+
+def kind_line_key(index: int, line: int) -> int:
+    """Key shared by every pack size of a product line."""
+    return (index % len(PRODUCT_KINDS)) * 1_000_003 + line
+
+def synthetic_store(seed: int, index: int, retailers: List[Dict[str, Any]], span: float) -> Dict[str, Any]:
+    retailer = retailers[index % len(retailers)]
+    suburb = SUBURBS[int(draw(seed, STORE, index, 2) * len(SUBURBS))]
+    open_time, close_time = OPENING_HOURS[int(draw(seed, STORE, index, 3) * len(OPENING_HOURS))]
+    return {
+        "store_id": f"{retailer['retailer_id']}:syn:{index:06d}",
+        "retailer_id": retailer["retailer_id"],
+        "name": f"{retailer['display_name']} {suburb} {index}",
+        "address": f"{1 + int(draw(seed, STORE, index, 4) * 999)} Synthetic Street, {suburb} NSW {2000 + index % 800}",
+        "suburb": suburb,
+        "postcode": str(2000 + index % 800),
+        "location": {
+            "lat": round(SYDNEY_CENTER[0] + (draw(seed, STORE, index, 0) - 0.5) * span, 6),
+            "lng": round(SYDNEY_CENTER[1] + (draw(seed, STORE, index, 1) - 0.5) * span, 6)
+        },
+        "opening_hours": [{"day": day, "open": open_time, "close": close_time} for day in WEEKDAYS]
+    }
+
+def public(record: Dict[str, Any]) -> Dict[str, Any]:
+    """The record without its generator-only fields."""
+    return {key: value for key, value in record.items() if not key.startswith("_")}
+
+def sellers(seed: int, index: int, num_retailers: int, coverage: float) -> List[int]:
+    """Retailers selling a product; at least one always does."""
+    selling = [retailer for retailer in range(num_retailers) if draw(seed, COVERAGE, index, retailer) < coverage]
+    return selling or [index % num_retailers]
+
+def catalog_and_prices(
+    seed: int,
+    num_products: int,
+    retailers: List[Dict[str, Any]],
+    coverage: float
+) -> Iterator[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """(catalog entry, price snapshot) for every product each retailer sells."""
+    for index in range(num_products):
+        product = synthetic_product(seed, index)
+        kind = product["canonical_id"].split("-line", 1)[0]
+        for retailer_index in sellers(seed, index, len(retailers), coverage):
+            retailer = retailers[retailer_index]
+            retailer_product_id = f"{retailer['retailer_id']}:{kind}:{product['canonical_id']}"
+            unit_price = product["_unit_price"] * retailer["_price_factor"] * (0.95 + 0.1 * draw(seed, PRICE, index, retailer_index))
+            price = max(0.5, round(unit_price * product["unit_size"], 2))
+            yield (
+                {
+                    "retailer_product_id": retailer_product_id,
+                    "retailer_id": retailer["retailer_id"],
+                    "canonical_id": product["canonical_id"],
+                    "name": f"{retailer['display_name']} {product['canonical_name']}"
+                },
+                {
+                    "retailer_product_id": retailer_product_id,
+                    "price": price,
+                    "unit_price": round(price / product["unit_size"], 2),
+                    "unit_price_measure": UNIT_PRICE_MEASURES[product["unit_measure"]]
+                }
+            )
+
+def synthetic_plan(seed: int, index: int, num_products: int, num_stores: int, retailers: List[Dict[str, Any]], span: float) -> Dict[str, Any]:
+    """A saved single-store plan over a few products, shaped like the sample plans."""
+    store = synthetic_store(seed, int(draw(seed, PLAN, index, 0) * num_stores), retailers, span)
+    baskets = []
+    for line in range(1 + int(draw(seed, PLAN, index, 1) * 5)):
+        product = synthetic_product(seed, int(draw(seed, PLAN, index, 2, line) * num_products))
+        unit_price = round(product["_unit_price"] * product["unit_size"], 2)
+        baskets.append({
+            "item": product["canonical_name"],
+            "quantity": 1,
+            "unit": size_label(product["unit_size"], product["unit_measure"]),
+            "unit_price": unit_price,
+            "line_total": unit_price,
+            "substitution": False
+        })
+    subtotal = round(sum(basket["line_total"] for basket in baskets), 2)
+    instore_minutes = 2.0 * len(baskets)
+    payload = {
+        "version": "v1",
+        "user_location": store["location"],
+        "stores": [{
+            "store_name": store["name"],
+            "store_address": store["address"],
+            "eta_travel_minutes": 5.0,
+            "eta_instore_minutes": instore_minutes,
+            "baskets": baskets,
+            "click_and_collect": {"button_enabled": False, "reason_if_disabled": "Synthetic plan."},
+            "store_subtotal": subtotal
+        }],
+        "route": [store["name"]],
+        "totals": {
+            "store_subtotals": [subtotal],
+            "grand_total": subtotal,
+            "total_travel_time": 5.0,
+            "total_instore_time": instore_minutes,
+            "total_time": 5.0 + instore_minutes
+        },
+        "assumptions": ["Synthetic plan for scale testing"],
+        "warnings": []
+    }
+    generated_at = datetime(2025, 1, 1, tzinfo=timezone.utc) + timedelta(minutes=index)
+    return {
+        "plan_id": f"plan_{index + 1:06d}",
+        "generated_at": generated_at.isoformat(),
+        "payload": orjson.dumps(payload).decode()
+    }
+
+class RecordWriter:
+    """Stream records into a JSON file {"<key>": [...]}, replacing the file when closed."""
+
+    def __init__(self, path: Path, key: str):
+        self.path = path
+        fd, self.temp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        self.file = os.fdopen(fd, "wb")
+        self.file.write(b'{"' + key.encode() + b'": [')
+        self.count = 0
+
+    def write(self, record: Dict[str, Any]) -> None:
+        self.file.write(b"\n  " if self.count == 0 else b",\n  ")
+        self.file.write(orjson.dumps(record))
+        self.count += 1
+
+    def close(self) -> int:
+        self.file.write(b"\n]}\n")
+        self.file.close()
+        os.chmod(self.temp_path, 0o644)
+        os.replace(self.temp_path, self.path)
+        return self.count
+
+def write_records(path: Path, key: str, records: Iterable[Dict[str, Any]]) -> int:
+    writer = RecordWriter(path, key)
+    for record in records:
+        writer.write(record)
+    return writer.close()
+
+def store_span(num_stores: int) -> float:
+    """Side in degrees of the square the stores are spread over, keeping the sample's density."""
+    return max(MIN_SPAN_DEGREES, (num_stores / SYDNEY_STORE_DENSITY) ** 0.5)
+
+def generate_dataset(
+    out_dir: Path,
+    num_products: int,
+    num_stores: int,
+    num_retailers: int,
+    num_plans: int = 100,
+    seed: int = DEFAULT_SEED,
+    coverage: float = DEFAULT_COVERAGE
+) -> Dict[str, int]:
+    """Write every data file into out_dir; returns the record count per file."""
+    if min(num_products, num_stores, num_retailers) < 1:
+        raise ValueError("products, stores and retailers must each be at least 1")
+    if num_stores < num_retailers:
+        raise ValueError("Need at least one store per retailer")
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    retailers = [synthetic_retailer(seed, index) for index in range(num_retailers)]
+    span = store_span(num_stores)
+    counts = {
+        "retailers.json": write_records(out_dir / "retailers.json", "retailers", (public(retailer) for retailer in retailers)),
+        "products.json": write_records(
+            out_dir / "products.json", "products",
+            (public(synthetic_product(seed, index)) for index in range(num_products))
+        ),
+        "stores.json": write_records(
+            out_dir / "stores.json", "stores",
+            (synthetic_store(seed, index, retailers, span) for index in range(num_stores))
+        ),
+    }
+
+    # The catalog and its prices in one pass
+    catalog = RecordWriter(out_dir / "retailer_catalog.json", "retailer_products")
+    prices = RecordWriter(out_dir / "price_snapshots.json", "prices")
+    for catalog_entry, price in catalog_and_prices(seed, num_products, retailers, coverage):
+        catalog.write(catalog_entry)
+        prices.write(price)
+    counts["retailer_catalog.json"] = catalog.close()
+    counts["price_snapshots.json"] = prices.close()
+
+    counts["plans.json"] = write_records(
+        out_dir / "plans.json", "plans",
+        (synthetic_plan(seed, index, num_products, num_stores, retailers, span) for index in range(num_plans))
+    )
+    return counts
+
+def main() -> None:
+    """Generate a synthetic dataset."""
+    parser = argparse.ArgumentParser(description="Generate a synthetic ShopLyft dataset for scale testing")
+    parser.add_argument("out_dir", type=Path, help="Directory to write the data files into")
+    parser.add_argument("--products", type=int, default=100000, help="Number of canonical products")
+    parser.add_argument("--stores", type=int, default=10000, help="Number of stores")
+    parser.add_argument("--retailers", type=int, default=20, help="Number of retailers")
+    parser.add_argument("--plans", type=int, default=100, help="Number of saved plans")
+    parser.add_argument("--coverage", type=float, default=DEFAULT_COVERAGE, help="Share of the products each retailer sells")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="Random seed")
+    args = parser.parse_args()
+
+    counts = generate_dataset(
+        args.out_dir, args.products, args.stores, args.retailers, args.plans, args.seed, args.coverage
+    )
+    for filename, count in counts.items():
+        print(f"Wrote {count} records to {args.out_dir / filename}")
+
+if __name__ == "__main__":
+    main()
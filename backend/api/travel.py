@@ -0,0 +1,385 @@
+# Travel time model for ShopLyft routing
+"""
+Pluggable travel costs for the route optimizer.
+
+Travel times come from a travel profile (walking, driving, transit) and a provider
+(straight-line distance, or shortest paths over a local OSM road graph). Provider
+results are precomputed into a persistent store x store and grid-cell x store matrix
+so the request path only does table lookups:
+
+    python -m api.travel --profile driving --osm sydney.osm
+"""
+from typing import Any, Dict, List, Optional, Tuple
+import argparse
+import hashlib
+import heapq
+import json
+import math
+import os
+import tempfile
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+from pathlib import Path
+
+from api.data_store import DATA_DIR, get_derived, load_cached_json
+
+MATRIX_DIR = "travel_matrices"
+
+# Grid cells are about 500 m across in Sydney
+GRID_CELL_DEG = 0.005
+
+# Stores further apart than this never get a matrix entry; lookups fall back to estimates
+DEFAULT_MAX_RADIUS_KM = 15.0
+
+@dataclass(frozen=True)
+class TravelProfile:
+    name: str
+    speed_kmh: float
+    detour_factor: float
+    overhead_min: float
+    travel_method: str
+
+# driving keeps the optimizer's original 30 km/h straight-line assumption
+PROFILES = {
+    "walking": TravelProfile("walking", 5.0, 1.3, 0.0, "walking"),
+    "driving": TravelProfile("driving", 30.0, 1.0, 0.0, "driving"),
+    "transit": TravelProfile("transit", 20.0, 1.2, 5.0, "public_transport"),
+}
+
+# OSM highway types each profile may use on a road graph
+BLOCKED_HIGHWAYS = {
+    "walking": {"motorway", "motorway_link", "trunk", "trunk_link"},
+    "driving": {"footway", "path", "pedestrian", "steps", "cycleway", "bridleway", "track", "corridor"},
+    "transit": {"footway", "path", "pedestrian", "steps", "cycleway", "bridleway", "track", "corridor"},
+}
+
+def haversine_distance(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Calculate Haversine distance between two points in km."""
+    R = 6371  # Earth's radius in km
+
+    lat1_rad = math.radians(lat1)
+    lng1_rad = math.radians(lng1)
+    lat2_rad = math.radians(lat2)
+    lng2_rad = math.radians(lng2)
+
+    dlat = lat2_rad - lat1_rad
+    dlng = lng2_rad - lng1_rad
+
+    a = math.sin(dlat/2)**2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(dlng/2)**2
+    c = 2 * math.asin(math.sqrt(a))
+
+    return R * c
+
+def place_location(place: Dict[str, Any]) -> Dict[str, float]:
+    """Get coordinates from a store dict or a bare {"lat", "lng"} location."""
+    return place.get("location", place)
+
+def stores_fingerprint(stores: List[Dict[str, Any]]) -> str:
+    """Hash store IDs and coordinates so matrices can detect stale store data."""
+    digest = hashlib.sha1()
+    for store in sorted(stores, key=lambda s: s["store_id"]):
+        location = store["location"]
+        digest.update(f"{store['store_id']}|{location['lat']:.6f}|{location['lng']:.6f}\n".encode())
+    return digest.hexdigest()
+
+class StraightLineProvider:
+    """Travel costs from straight-line distance, a detour factor and a profile speed."""
+
+    name = "straight_line"
+
+    def __init__(self, profile: TravelProfile):
+        self.profile = profile
+
+    def leg(self, from_location: Dict[str, float], to_location: Dict[str, float]) -> Tuple[float, float]:
+        """Return (distance km, minutes) between two coordinates."""
+        distance = haversine_distance(
+            from_location["lat"], from_location["lng"],
+            to_location["lat"], to_location["lng"]
+        ) * self.profile.detour_factor
+        minutes = (distance / self.profile.speed_kmh) * 60.0 + self.profile.overhead_min
+        return distance, minutes
+
+    def one_to_many(self, source: Dict[str, float], targets: List[Dict[str, float]], reverse: bool = False) -> List[Optional[Tuple[float, float]]]:
+        """Return legs from source to each target (or from each target when reverse)."""
+        if reverse:
+            return [self.leg(target, source) for target in targets]
+        return [self.leg(source, target) for target in targets]
+
+class RoadGraphProvider:
+    """Travel costs from shortest paths over a road graph loaded from an OSM XML extract.
+
+    Only used offline to fill the travel matrix: each source runs one Dijkstra over the
+    graph (bounded by a radius) and reads off the costs to every target.
+    """
+
+    def __init__(self, profile: TravelProfile, osm_path: Path, max_radius_km: float = DEFAULT_MAX_RADIUS_KM):
+        self.profile = profile
+        self.name = f"road_graph:{Path(osm_path).name}"
+        self.max_radius_km = max_radius_km
+        self.access = StraightLineProvider(TravelProfile(profile.name, profile.speed_kmh, 1.0, 0.0, profile.travel_method))
+        self.node_locations: Dict[str, Tuple[float, float]] = {}
+        self.forward: Dict[str, List[Tuple[str, float]]] = {}
+        self.backward: Dict[str, List[Tuple[str, float]]] = {}
+        self.node_buckets: Dict[Tuple[int, int], List[str]] = {}
+        self._load(Path(osm_path))
+
+    def _load(self, osm_path: Path) -> None:
+        """Parse nodes and routable ways from the OSM extract."""
+        blocked = BLOCKED_HIGHWAYS.get(self.profile.name, set())
+        respect_oneway = self.profile.name != "walking"
+        all_nodes = {}
+        ways = []
+
+        for _, element in ET.iterparse(osm_path, events=("end",)):
+            if element.tag == "node":
+                all_nodes[element.get("id")] = (float(element.get("lat")), float(element.get("lon")))
+                element.clear()
+            elif element.tag == "way":
+                tags = {tag.get("k"): tag.get("v") for tag in element.findall("tag")}
+                highway = tags.get("highway")
+                if highway and highway not in blocked:
+                    refs = [nd.get("ref") for nd in element.findall("nd")]
+                    oneway = respect_oneway and tags.get("oneway") in ("yes", "true", "1")
+                    ways.append((refs, oneway))
+                element.clear()
+
+        for refs, oneway in ways:
+            for a, b in zip(refs, refs[1:]):
+                if a not in all_nodes or b not in all_nodes:
+                    continue
+                length = haversine_distance(*all_nodes[a], *all_nodes[b])
+                self._add_edge(a, b, length)
+                if not oneway:
+                    self._add_edge(b, a, length)
+
+        for node_id in self.node_locations:
+            self.node_locations[node_id] = all_nodes[node_id]
+        for node_id, (lat, lng) in self.node_locations.items():
+            self.node_buckets.setdefault(grid_cell(lat, lng), []).append(node_id)
+
+    def _add_edge(self, a: str, b: str, length: float) -> None:
+        self.node_locations.setdefault(a, None)
+        self.node_locations.setdefault(b, None)
+        self.forward.setdefault(a, []).append((b, length))
+        self.backward.setdefault(b, []).append((a, length))
+
+    def nearest_node(self, location: Dict[str, float]) -> Optional[str]:
+        """Snap a coordinate to the closest graph node in its or a neighbouring grid cell."""
+        row, col = grid_cell(location["lat"], location["lng"])
+        best_node, best_distance = None, float('inf')
+        for ring in range(0, 4):
+            for d_row in range(-ring, ring + 1):
+                for d_col in range(-ring, ring + 1):
+                    if max(abs(d_row), abs(d_col)) != ring:
+                        continue
+                    for node_id in self.node_buckets.get((row + d_row, col + d_col), []):
+                        distance = haversine_distance(location["lat"], location["lng"], *self.node_locations[node_id])
+                        if distance < best_distance:
+                            best_node, best_distance = node_id, distance
+            if best_node is not None:
+                return best_node
+        return None
+
+    def _dijkstra(self, source: str, reverse: bool) -> Dict[str, float]:
+        """Shortest path distances (km) from source, bounded by the matrix radius."""
+        adjacency = self.backward if reverse else self.forward
+        distances = {source: 0.0}
+        heap = [(0.0, source)]
+        while heap:
+            distance, node_id = heapq.heappop(heap)
+            if distance > distances.get(node_id, float('inf')) or distance > self.max_radius_km * 2:
+                continue
+            for neighbour, length in adjacency.get(node_id, []):
+                candidate = distance + length
+                if candidate < distances.get(neighbour, float('inf')):
+                    distances[neighbour] = candidate
+                    heapq.heappush(heap, (candidate, neighbour))
+        return distances
+
+    def one_to_many(self, source: Dict[str, float], targets: List[Dict[str, float]], reverse: bool = False) -> List[Optional[Tuple[float, float]]]:
+        """Return legs from source to each target (or from each target when reverse)."""
+        source_node = self.nearest_node(source)
+        if source_node is None:
+            return [None] * len(targets)
+
+        distances = self._dijkstra(source_node, reverse)
+        source_access_km, source_access_min = self.access.leg(source, dict(zip(("lat", "lng"), self.node_locations[source_node])))
+
+        legs = []
+        for target in targets:
+            target_node = self.nearest_node(target)
+            if target_node is None or target_node not in distances:
+                legs.append(None)
+                continue
+            target_access_km, target_access_min = self.access.leg(target, dict(zip(("lat", "lng"), self.node_locations[target_node])))
+            road_km = distances[target_node]
+            distance = road_km + source_access_km + target_access_km
+            minutes = (road_km / self.profile.speed_kmh) * 60.0 + source_access_min + target_access_min + self.profile.overhead_min
+            legs.append((distance, minutes))
+        return legs
+
+def grid_cell(lat: float, lng: float) -> Tuple[int, int]:
+    """Get the (row, col) grid cell containing a coordinate."""
+    return (math.floor(lat / GRID_CELL_DEG), math.floor(lng / GRID_CELL_DEG))
+
+def grid_cell_center(row: int, col: int) -> Dict[str, float]:
+    """Get the center coordinate of a grid cell."""
+    return {"lat": (row + 0.5) * GRID_CELL_DEG, "lng": (col + 0.5) * GRID_CELL_DEG}
+
+def build_travel_matrix(
+    stores: List[Dict[str, Any]],
+    profile: TravelProfile,
+    provider: Any,
+    max_radius_km: float = DEFAULT_MAX_RADIUS_KM
+) -> Dict[str, Any]:
+    """Precompute store x store and grid-cell x store legs within max_radius_km.
+
+    Grid cells cover every cell within max_radius_km of at least one store, and each
+    cell only keeps the stores within that radius, so both tables stay sparse.
+    """
+    store_ids = [store["store_id"] for store in stores]
+    locations = [store["location"] for store in stores]
+
+    store_pairs = []
+    for i, location in enumerate(locations):
+        nearby = [j for j, other in enumerate(locations) if j != i and haversine_distance(
+            location["lat"], location["lng"], other["lat"], other["lng"]) <= max_radius_km]
+        for j, leg in zip(nearby, provider.one_to_many(location, [locations[j] for j in nearby])):
+            if leg:
+                store_pairs.append([i, j, round(leg[0], 4), round(leg[1], 3)])
+
+    # Collect the cells near each store
+    cell_stores: Dict[Tuple[int, int], List[int]] = {}
+    for j, location in enumerate(locations):
+        lat_span = math.ceil(max_radius_km / 111.0 / GRID_CELL_DEG)
+        lng_span = math.ceil(max_radius_km / (111.0 * max(math.cos(math.radians(location["lat"])), 0.01)) / GRID_CELL_DEG)
+        row, col = grid_cell(location["lat"], location["lng"])
+        for d_row in range(-lat_span, lat_span + 1):
+            for d_col in range(-lng_span, lng_span + 1):
+                center = grid_cell_center(row + d_row, col + d_col)
+                if haversine_distance(center["lat"], center["lng"], location["lat"], location["lng"]) <= max_radius_km:
+                    cell_stores.setdefault((row + d_row, col + d_col), []).append(j)
+
+    cells = []
+    for (row, col), nearby in cell_stores.items():
+        center = grid_cell_center(row, col)
+        targets = [locations[j] for j in nearby]
+        outbound = provider.one_to_many(center, targets)
+        inbound = provider.one_to_many(center, targets, reverse=True)
+        entries = []
+        for j, to_leg, from_leg in zip(nearby, outbound, inbound):
+            if to_leg and from_leg:
+                entries.append([j, round(to_leg[0], 4), round(to_leg[1], 3), round(from_leg[0], 4), round(from_leg[1], 3)])
+        if entries:
+            cells.append([row, col, entries])
+
+    return {
+        "profile": profile.name,
+        "provider": provider.name,
+        "stores_fingerprint": stores_fingerprint(stores),
+        "grid_cell_deg": GRID_CELL_DEG,
+        "max_radius_km": max_radius_km,
+        "store_ids": store_ids,
+        "store_pairs": store_pairs,
+        "cells": cells
+    }
+
+def save_travel_matrix(matrix: Dict[str, Any]) -> Path:
+    """Write a travel matrix atomically to the data directory."""
+    matrix_dir = DATA_DIR / MATRIX_DIR
+    matrix_dir.mkdir(parents=True, exist_ok=True)
+    path = matrix_dir / f"{matrix['profile']}.json"
+
+    fd, temp_path = tempfile.mkstemp(dir=matrix_dir, suffix=".tmp")
+    with os.fdopen(fd, 'w') as f:
+        json.dump(matrix, f, separators=(",", ":"))
+    os.chmod(temp_path, 0o644)
+    os.replace(temp_path, path)
+    return path
+
+def index_travel_matrix(matrix_data: dict, stores_data: dict) -> Optional[Dict[str, Any]]:
+    """Turn a stored matrix into lookup dicts, or None if missing or stale."""
+    if not matrix_data or matrix_data.get("grid_cell_deg") != GRID_CELL_DEG:
+        return None
+    if matrix_data.get("stores_fingerprint") != stores_fingerprint(stores_data.get("stores", [])):
+        print(f"[ShopLyft] Travel matrix for '{matrix_data.get('profile')}' is stale, using estimates")
+        return None
+
+    store_ids = matrix_data["store_ids"]
+    pairs = {(store_ids[i], store_ids[j]): (km, minutes) for i, j, km, minutes in matrix_data["store_pairs"]}
+    cells = {}
+    for row, col, entries in matrix_data["cells"]:
+        cells[(row, col)] = {
+            store_ids[j]: ((to_km, to_min), (from_km, from_min))
+            for j, to_km, to_min, from_km, from_min in entries
+        }
+    return {"pairs": pairs, "cells": cells, "provider": matrix_data.get("provider")}
+
+class TravelModel:
+    """Request-path travel costs: matrix lookups with a straight-line fallback."""
+
+    def __init__(self, profile: TravelProfile, matrix: Optional[Dict[str, Any]]):
+        self.profile = profile
+        self.matrix = matrix
+        self.fallback = StraightLineProvider(profile)
+
+    @property
+    def travel_method(self) -> str:
+        return self.profile.travel_method
+
+    def leg(self, from_place: Dict[str, Any], to_place: Dict[str, Any]) -> Tuple[float, float]:
+        """Return (distance km, minutes) between two stores or locations."""
+        if self.matrix:
+            from_store_id = from_place.get("store_id")
+            to_store_id = to_place.get("store_id")
+            if from_store_id and to_store_id:
+                if from_store_id == to_store_id:
+                    return 0.0, 0.0
+                cached = self.matrix["pairs"].get((from_store_id, to_store_id))
+                if cached:
+                    return cached
+            elif to_store_id:
+                location = place_location(from_place)
+                cached = self.matrix["cells"].get(grid_cell(location["lat"], location["lng"]), {}).get(to_store_id)
+                if cached:
+                    return cached[0]
+            elif from_store_id:
+                location = place_location(to_place)
+                cached = self.matrix["cells"].get(grid_cell(location["lat"], location["lng"]), {}).get(from_store_id)
+                if cached:
+                    return cached[1]
+
+        return self.fallback.leg(place_location(from_place), place_location(to_place))
+
+    def minutes(self, from_place: Dict[str, Any], to_place: Dict[str, Any]) -> float:
+        """Return travel minutes between two stores or locations."""
+        return self.leg(from_place, to_place)[1]
+
+def get_travel_model(mode: str = "driving") -> TravelModel:
+    """Get the travel model for a profile, using its precomputed matrix when one is on disk."""
+    profile = PROFILES.get(mode, PROFILES["driving"])
+    matrix_file = f"{MATRIX_DIR}/{profile.name}.json"
+    matrix = get_derived(f"travel_matrix:{profile.name}", [matrix_file, "stores.json"], index_travel_matrix)
+    return TravelModel(profile, matrix)
+
+def main() -> None:
+    """Precompute and save the travel matrix for a profile."""
+    parser = argparse.ArgumentParser(description="Precompute ShopLyft travel-time matrices")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="driving", help="Travel profile")
+    parser.add_argument("--osm", type=Path, help="OSM XML extract for road-graph travel times")
+    parser.add_argument("--radius-km", type=float, default=DEFAULT_MAX_RADIUS_KM, help="Maximum leg length to precompute")
+    args = parser.parse_args()
+
+    profile = PROFILES[args.profile]
+    if args.osm:
+        provider = RoadGraphProvider(profile, args.osm, args.radius_km)
+    else:
+        provider = StraightLineProvider(profile)
+
+    stores = load_cached_json("stores.json").get("stores", [])
+    matrix = build_travel_matrix(stores, profile, provider, args.radius_km)
+    path = save_travel_matrix(matrix)
+    print(f"Saved {profile.name} travel matrix ({provider.name}): {len(matrix['store_pairs'])} store pairs, {len(matrix['cells'])} grid cells -> {path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# Weight sweeps over scored routes: re-rank for any price/time weights without re-scoring
+"""
+A route's score is price_weight * price_score + time_weight * time_score, where the
+two component scores do not depend on the weights. Keeping each route's
+(price_score, time_score) vector therefore answers any weight pair by arithmetic
+alone. The routes that can be best for some weights are the vertices of the lower
+convex hull of those vectors. Each vertex wins on an interval of the normalized
+time weight t = time_weight / (time_weight + price_weight), so the best route for
+any weights is a bisection over the interval breakpoints.
+"""
+from typing import Any, Dict, Hashable, List, Tuple
+import bisect
+
+# (signature, price score, time score, scored route)
+RouteVector = Tuple[Hashable, float, float, Dict[str, Any]]
+
+def pareto_vectors(vectors: List[RouteVector]) -> List[RouteVector]:
+    """Keep only vectors no other vector beats on both components, per plan signature.
+
+    Routes sharing a signature are the same plan (e.g. other visit orders), so only
+    their own non-dominated vectors can matter for any weights.
+    """
+    kept: Dict[Hashable, List[RouteVector]] = {}
+    for vector in sorted(vectors, key=lambda vector: (vector[1], vector[2])):
+        group = kept.setdefault(vector[0], [])
+        if not group or vector[2] < group[-1][2]:
+            group.append(vector)
+    return [vector for group in kept.values() for vector in group]
+
+def lower_hull(vectors: List[RouteVector]) -> List[RouteVector]:
+    """Lower-left convex hull, cheapest first: the routes that are best for some weights."""
+    frontier = []
+    for vector in sorted(vectors, key=lambda vector: (vector[1], vector[2])):
+        if frontier and vector[2] >= frontier[-1][2]:
+            continue
+        # Drop the last vertex while it lies on or above the segment to the new one
+        while len(frontier) >= 2:
+            (_, x1, y1, _), (_, x2, y2, _) = frontier[-2], frontier[-1]
+            if (x2 - x1) * (vector[2] - y1) - (y2 - y1) * (vector[1] - x1) <= 0:
+                frontier.pop()
+            else:
+                break
+        frontier.append(vector)
+    return frontier
+
+def build_weight_sweep(vectors: List[RouteVector]) -> Dict[str, Any]:
+    """Precompute the candidate vectors, the hull and the hull's switching weights.
+
+    breakpoints[i] is the normalized time weight at which hull vertex i + 1 becomes
+    better than vertex i.
+    """
+    candidates = pareto_vectors(vectors)
+    hull = lower_hull(candidates)
+    breakpoints = []
+    for (_, x1, y1, _), (_, x2, y2, _) in zip(hull, hull[1:]):
+        breakpoints.append((x2 - x1) / ((x2 - x1) + (y1 - y2)))
+    return {"candidates": candidates, "hull": hull, "breakpoints": breakpoints}
+
+def normalized_time_weight(time_weight: float, price_weight: float) -> float:
+    total = time_weight + price_weight
+    return time_weight / total if total > 0 else 0.0
+
+def best_on_hull(sweep: Dict[str, Any], time_weight: float, price_weight: float) -> RouteVector:
+    """The best route for the weights, by bisection over the hull breakpoints."""
+    t = normalized_time_weight(time_weight, price_weight)
+    return sweep["hull"][bisect.bisect_left(sweep["breakpoints"], t)]
+
+def hull_weight_ranges(sweep: Dict[str, Any]) -> List[Tuple[float, float]]:
+    """Normalized time weight interval on which each hull vertex is the best route."""
+    edges = [0.0] + sweep["breakpoints"] + [1.0]
+    return list(zip(edges, edges[1:]))
+
+def rank_routes(sweep: Dict[str, Any], time_weight: float, price_weight: float, limit: int) -> List[Tuple[float, RouteVector]]:
+    """The best distinct plans for the weights, as (score, vector), best first."""
+    if limit == 1 and sweep["hull"]:
+        best = best_on_hull(sweep, time_weight, price_weight)
+        return [(price_weight * best[1] + time_weight * best[2], best)]
+
+    scored = sorted(
+        ((price_weight * vector[1] + time_weight * vector[2], vector) for vector in sweep["candidates"]),
+        key=lambda entry: entry[0]
+    )
+    ranked, seen = [], set()
+    for score, vector in scored:
+        if vector[0] not in seen:
+            seen.add(vector[0])
+            ranked.append((score, vector))
+            if len(ranked) >= limit:
+                break
+    return ranked
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+ShopLyft response serialization microbenchmark
+
+Builds a full shopping plan from the sample data (every catalog product, with
+alternatives) and times, per response:
+  - model construction with validation vs model_construct
+  - FastAPI's default response path (re-validate, serialize, json.dumps)
+  - the orjson plan_response path used by /optimize and sessions
+
+Run from the backend directory: python bench_serialization.py [--rounds 200]
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from api.models import OptimizationResponse, ParsedProduct, ShoppingPlan
+from api.routers.optimization import (
+    load_json_data, generate_price_dataset, generate_all_possible_retailer_routes,
+    find_optimal_retailer_route, assemble_shopping_plan
+)
+from api.serialization import plan_response
+
+SYDNEY_CBD = {"lat": -33.8688, "lng": 151.2093}
+
+def build_response(num_alternatives: int) -> OptimizationResponse:
+    """Optimize a basket of every catalog product and wrap it in a response."""
+    products = [
+        ParsedProduct(
+            canonical_id=product["canonical_id"],
+            canonical_name=product["canonical_name"],
+            requested_item=product["canonical_name"],
+            quantity=1,
+            confidence=1.0
+        )
+        for product in load_json_data("products.json").get("products", [])
+    ]
+    price_dataset = generate_price_dataset(products)
+    routes = generate_all_possible_retailer_routes(price_dataset, SYDNEY_CBD)
+    optimal_route = find_optimal_retailer_route(
+        routes, price_dataset, SYDNEY_CBD, top_k=num_alternatives + 1
+    )
+
+    # Pre-fill links so no product searches run
+    known_links = {
+        (entry["retailer_id"], entry["product_name"]): f"https://example.com/{entry['retailer_product_id']}"
+        for entry in price_dataset
+    }
+    plan = asyncio.run(assemble_shopping_plan(
+        optimal_route, price_dataset, products, SYDNEY_CBD, "-33.8688,151.2093",
+        num_alternatives, known_links
+    ))
+    return OptimizationResponse(plan=plan, success=True, message="benchmark")
+
+def time_per_call(func, rounds: int) -> float:
+    """Mean microseconds per call."""
+    func()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    return (time.perf_counter() - start) / rounds * 1e6
+
+async def time_per_async_call(func, rounds: int) -> float:
+    """Mean microseconds per awaited call, all on one event loop."""
+    await func()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        await func()
+    return (time.perf_counter() - start) / rounds * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark plan response serialization")
+    parser.add_argument("--rounds", type=int, default=200, help="Iterations per measurement")
+    parser.add_argument("--alternatives", type=int, default=3, help="Alternative plans in the response")
+    args = parser.parse_args()
+
+    response = build_response(args.alternatives)
+    plan_data = response.plan.model_dump()
+    field = create_model_field(name="Response", type_=OptimizationResponse, mode="serialization")
+
+    async def fastapi_default():
+        content = await serialize_response(field=field, response_content=response)
+        return JSONResponse(content).body
+
+    def fast_path():
+        return plan_response(response).body
+
+    # Both paths must produce the same document
+    assert json.loads(asyncio.run(fastapi_default())) == json.loads(fast_path())
+
+    results = [
+        ("ShoppingPlan(**data) (validated)", time_per_call(lambda: ShoppingPlan(**plan_data), args.rounds)),
+        ("ShoppingPlan.model_construct(**data)", time_per_call(lambda: ShoppingPlan.model_construct(**plan_data), args.rounds)),
+        ("FastAPI default response path", asyncio.run(time_per_async_call(fastapi_default, args.rounds))),
+        ("plan_response (orjson, baskets once)", time_per_call(fast_path, args.rounds)),
+    ]
+
+    print(f"Plan: {len(response.plan.stores)} stores, {response.plan.optimization_details.total_items} items, "
+          f"{len(response.plan.alternatives)} alternatives, {len(fast_path())} bytes")
+    for name, micros in results:
+        print(f"  {name:<40} {micros:>10.1f} us/response")
+
+if __name__ == "__main__":
+    main()
@@ -3,14 +3,17 @@ from fastapi import FastAPI, HTTPException, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 import uvicorn
+import os
 from datetime import datetime
 from typing import Dict, Any
 import json
 from pathlib import Path
 
 # Import API routers
-from api.routers import products, stores, pricing, optimization, plans
+from api.routers import products, stores, pricing, optimization, plans, sessions
 from api.models import HealthResponse, ErrorResponse
+from api.http_cache import DataVersionCacheMiddleware
+from api.compression import CompressionMiddleware
 
 # Create FastAPI application
 app = FastAPI(
@@ -21,6 +24,21 @@ app = FastAPI(
     redoc_url="/redoc"
 )
 
+# ETag/Last-Modified validation and response caching for catalog, store and price reads.
+# Added before CORS so CORS headers are also applied to 304 and cached responses.
+app.add_middleware(
+    DataVersionCacheMiddleware,
+    routes={
+        "/api/v1/products": products.DATA_FILES,
+        "/api/v1/stores": stores.DATA_FILES,
+        "/api/v1/pricing": pricing.DATA_FILES,
+    },
+    response_cache=os.getenv("SHOPLYFT_RESPONSE_CACHE", "1") != "0",
+)
+
+# gzip/brotli compression for everything else; cached bodies arrive already compressed
+app.add_middleware(CompressionMiddleware)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -36,6 +54,7 @@ app.include_router(stores.router, prefix="/api/v1/stores", tags=["stores"])
 app.include_router(pricing.router, prefix="/api/v1/pricing", tags=["pricing"])
 app.include_router(optimization.router, prefix="/api/v1/optimization", tags=["optimization"])
 app.include_router(plans.router, prefix="/api/v1/plans", tags=["plans"])
+app.include_router(sessions.router, prefix="/api/v1/sessions", tags=["sessions"])
 
 # Global exception handler
 @app.exception_handler(Exception)
@@ -84,14 +103,16 @@ async def api_info():
             "Store location services",
             "Price comparison and snapshots",
             "Shopping plan optimization",
-            "Plan management and storage"
+            "Plan management and storage",
+            "Incremental basket re-optimization sessions"
         ],
         "endpoints": {
             "products": "/api/v1/products",
             "stores": "/api/v1/stores",
             "pricing": "/api/v1/pricing",
             "optimization": "/api/v1/optimization",
-            "plans": "/api/v1/plans"
+            "plans": "/api/v1/plans",
+            "sessions": "/api/v1/sessions"
         },
         "documentation": "/docs"
     }
@@ -15,6 +15,7 @@ function App() {
   const [isLoadingComplete, setIsLoadingComplete] = useState(false);
   const [loadingError, setLoadingError] = useState<string | null>(null);
   const [planData, setPlanData] = useState<PlanData | null>(null);
+  const [linksLoading, setLinksLoading] = useState(false);
 
   useEffect(() => {
     const handleNavigateToLoading = () => {
@@ -31,6 +32,7 @@ function App() {
         setPlanData(event.detail.planData);
         console.log("Plan data stored in state:", event.detail.planData);
       }
+      setLinksLoading(Boolean(event.detail.linksLoading));
 
       // Trigger character exit animation
       setIsLoadingComplete(true);
@@ -144,7 +146,11 @@ function App() {
             exit={{ opacity: 0 }}
             transition={{ duration: 0.5 }}
           >
-            <PlanLayout planData={planData} isLoading={false} />
+            <PlanLayout
+              planData={planData}
+              isLoading={false}
+              linksLoading={linksLoading}
+            />
           </motion.div>
         )}
       </AnimatePresence>
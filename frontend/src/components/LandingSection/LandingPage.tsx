@@ -36,7 +36,21 @@ function NewLandingPage() {
           price_weight: 0.8,
         };
 
-        const result = await optimizeShoppingPlan(optimizationRequest);
+        // Show the plan as soon as the route is known, while product links are still loading
+        const result = await optimizeShoppingPlan(
+          optimizationRequest,
+          (partialPlan) =>
+            window.dispatchEvent(
+              new CustomEvent("navigateToPlan", {
+                detail: {
+                  shoppingList: text,
+                  location: location,
+                  planData: partialPlan,
+                  linksLoading: true,
+                },
+              })
+            )
+        );
 
         if (result.success) {
           // Navigate to plan layout with the optimized data
@@ -46,6 +60,7 @@ function NewLandingPage() {
                 shoppingList: text,
                 location: location,
                 planData: result.plan,
+                linksLoading: false,
               },
             })
           );
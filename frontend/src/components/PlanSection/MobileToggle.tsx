@@ -7,6 +7,9 @@ import { type PlanData } from "./planTemplate";
 interface MobileToggleProps {
   planData: PlanData;
   isLoading: boolean;
+  linksLoading?: boolean;
+  selectedPlan?: number;
+  onSelectPlan?: (index: number) => void;
   isMapExpanded: boolean;
   onMapExpand: () => void;
 }
@@ -14,6 +17,9 @@ interface MobileToggleProps {
 function MobileToggle({
   planData,
   isLoading,
+  linksLoading = false,
+  selectedPlan = 0,
+  onSelectPlan,
   isMapExpanded,
   onMapExpand,
 }: MobileToggleProps) {
@@ -55,7 +61,13 @@ function MobileToggle({
           className="absolute inset-0"
         >
           {activeTab === "plan" ? (
-            <RoutePlan planData={planData} isLoading={isLoading} />
+            <RoutePlan
+              planData={planData}
+              isLoading={isLoading}
+              linksLoading={linksLoading}
+              selectedPlan={selectedPlan}
+              onSelectPlan={onSelectPlan}
+            />
           ) : (
             <RouteMap
               planData={planData}
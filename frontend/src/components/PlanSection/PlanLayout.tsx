@@ -1,6 +1,10 @@
 import { motion } from "framer-motion";
 import { useState, useEffect, useMemo } from "react";
-import { type PlanData, TEMPLATE_PLAN } from "./planTemplate";
+import {
+  type PlanData,
+  type StoreBasket,
+  TEMPLATE_PLAN,
+} from "./planTemplate";
 import PlanHeader from "./PlanHeader";
 import RoutePlan from "./RoutePlan";
 import RouteMap from "./RouteMap";
@@ -31,6 +35,25 @@ interface ServerStoreBasket {
   links?: string[];
 }
 
+interface ServerRouteSegment {
+  from_store_id?: string;
+  to_store_id: string;
+  distance_km: number;
+  travel_time_min: number;
+  travel_method: string;
+}
+
+interface ServerPlanAlternative {
+  total_cost: number;
+  total_time: number;
+  travel_time: number;
+  shopping_time: number;
+  route_score: number;
+  stores: ServerStoreBasket[];
+  route_segments: ServerRouteSegment[];
+  pareto_optimal: boolean;
+}
+
 interface ServerPlanData {
   plan_id?: string;
   total_cost: number;
@@ -44,13 +67,7 @@ interface ServerPlanData {
     coordinates: { lat: number; lng: number };
   };
   stores?: ServerStoreBasket[];
-  route_segments?: Array<{
-    from_store_id?: string;
-    to_store_id: string;
-    distance_km: number;
-    travel_time_min: number;
-    travel_method: string;
-  }>;
+  route_segments?: ServerRouteSegment[];
   optimization_details?: {
     price_component: number;
     time_component: number;
@@ -60,16 +77,35 @@ interface ServerPlanData {
   num_stores: number;
   store_baskets: ServerStoreBasket[];
   generated_at?: string;
+  alternatives?: ServerPlanAlternative[];
 }
 
+// Convert a server store basket to template format
+const convertBasket = (basket: ServerStoreBasket): StoreBasket => ({
+  store_info: basket.store_info,
+  items: basket.items,
+  subtotal: basket.subtotal,
+  click_collect_available: basket.click_collect_eligible,
+  min_spend_met: basket.min_spend_required === 0,
+  links: basket.links || [], // Use server links if available, otherwise empty array
+});
+
 interface PlanLayoutProps {
   planData: PlanData | null;
   isLoading?: boolean;
+  // The plan is shown while product links are still being found
+  linksLoading?: boolean;
 }
 
-function PlanLayout({ planData, isLoading = false }: PlanLayoutProps) {
+function PlanLayout({
+  planData,
+  isLoading = false,
+  linksLoading = false,
+}: PlanLayoutProps) {
   const [isMapExpanded, setIsMapExpanded] = useState(false);
   const [showJumpingCharacter, setShowJumpingCharacter] = useState(false);
+  // 0 is the recommended plan, n is alternative n
+  const [selectedPlan, setSelectedPlan] = useState(0);
 
   // Determine which plan data to use based on environment and server availability
   // Memoized to prevent repeated conversion on every render
@@ -84,14 +120,7 @@ function PlanLayout({ planData, isLoading = false }: PlanLayoutProps) {
         const serverData = planData as unknown as ServerPlanData;
 
         // Convert store_baskets to stores format
-        const convertedStores = serverData.store_baskets.map((basket) => ({
-          store_info: basket.store_info,
-          items: basket.items,
-          subtotal: basket.subtotal,
-          click_collect_available: basket.click_collect_eligible,
-          min_spend_met: basket.min_spend_required === 0,
-          links: basket.links || [], // Use server links if available, otherwise empty array
-        }));
+        const convertedStores = serverData.store_baskets.map(convertBasket);
 
         // Use server route segments if available, otherwise generate basic ones
         const routeSegments =
@@ -129,6 +158,16 @@ function PlanLayout({ planData, isLoading = false }: PlanLayoutProps) {
             ),
             stores_count: convertedStores.length,
           },
+          alternatives: (serverData.alternatives || []).map((alternative) => ({
+            total_cost: alternative.total_cost,
+            total_time: alternative.total_time,
+            travel_time: alternative.travel_time,
+            shopping_time: alternative.shopping_time,
+            route_score: alternative.route_score,
+            stores: alternative.stores.map(convertBasket),
+            route_segments: alternative.route_segments,
+            pareto_optimal: alternative.pareto_optimal,
+          })),
         } as PlanData;
       } else {
         // Already in template format
@@ -145,9 +184,45 @@ function PlanLayout({ planData, isLoading = false }: PlanLayoutProps) {
     }
   }, [planData]); // Only recalculate when planData changes
 
-  // Trigger character animation when component mounts (plan is loaded)
+  // A new plan starts on its recommended option
+  useEffect(() => {
+    setSelectedPlan(0);
+  }, [actualPlanData]);
+
+  // The plan on display: the recommended one, or the alternative the user picked
+  const displayedPlan = useMemo((): PlanData | null => {
+    const alternative = actualPlanData?.alternatives?.[selectedPlan - 1];
+    if (!actualPlanData || !alternative) {
+      return actualPlanData;
+    }
+    return {
+      ...actualPlanData,
+      total_cost: alternative.total_cost,
+      total_time: alternative.total_time,
+      travel_time: alternative.travel_time,
+      shopping_time: alternative.shopping_time,
+      // Savings are against the same baseline as the recommended plan
+      total_savings:
+        actualPlanData.total_savings +
+        actualPlanData.total_cost -
+        alternative.total_cost,
+      route_score: alternative.route_score,
+      stores: alternative.stores,
+      route_segments: alternative.route_segments,
+      optimization_details: {
+        ...actualPlanData.optimization_details,
+        total_items: alternative.stores.reduce(
+          (sum, store) => sum + store.items.length,
+          0
+        ),
+        stores_count: alternative.stores.length,
+      },
+    };
+  }, [actualPlanData, selectedPlan]);
+
+  // Trigger character animation once the plan is loaded, product links included
   useEffect(() => {
-    if (!isLoading && actualPlanData) {
+    if (!isLoading && !linksLoading && actualPlanData) {
       const timer = setTimeout(() => {
         setShowJumpingCharacter(true);
 
@@ -161,10 +236,10 @@ function PlanLayout({ planData, isLoading = false }: PlanLayoutProps) {
 
       return () => clearTimeout(timer);
     }
-  }, [isLoading, actualPlanData]);
+  }, [isLoading, linksLoading, actualPlanData]);
 
   // Show loading or error state if no plan data available
-  if (!actualPlanData) {
+  if (!displayedPlan) {
     return (
       <div className="min-h-screen bg-gradient-to-br from-orange-50 via-white to-orange-100 flex items-center justify-center">
         <div className="text-center">
@@ -193,17 +268,23 @@ function PlanLayout({ planData, isLoading = false }: PlanLayoutProps) {
         <div className="hidden xl:grid h-[calc(100vh-12rem)] grid-cols-2 gap-6">
           {/* Left Column - Route Plan */}
           <div className="flex flex-col h-full">
-            <RoutePlan planData={actualPlanData} isLoading={isLoading} />
+            <RoutePlan
+              planData={displayedPlan}
+              isLoading={isLoading}
+              linksLoading={linksLoading}
+              selectedPlan={selectedPlan}
+              onSelectPlan={setSelectedPlan}
+            />
           </div>
 
           {/* Right Column - Header + Map */}
           <div className="flex flex-col h-full">
             <div className="flex-shrink-0 mb-2">
-              <PlanHeader planData={actualPlanData} isLoading={isLoading} />
+              <PlanHeader planData={displayedPlan} isLoading={isLoading} />
             </div>
             <div className="flex-1 min-h-0">
               <RouteMap
-                planData={actualPlanData}
+                planData={displayedPlan}
                 isExpanded={isMapExpanded}
                 onExpand={() => setIsMapExpanded(!isMapExpanded)}
               />
@@ -215,18 +296,24 @@ function PlanLayout({ planData, isLoading = false }: PlanLayoutProps) {
         <div className="hidden md:grid xl:hidden h-[calc(100vh-12rem)] grid-cols-2 grid-rows-2 gap-6">
           {/* First Row - Route Plan */}
           <div className="flex flex-col h-full">
-            <RoutePlan planData={actualPlanData} isLoading={isLoading} />
+            <RoutePlan
+              planData={displayedPlan}
+              isLoading={isLoading}
+              linksLoading={linksLoading}
+              selectedPlan={selectedPlan}
+              onSelectPlan={setSelectedPlan}
+            />
           </div>
 
           {/* First Row - Receipt Summary */}
           <div className="flex flex-col h-full">
-            <PlanHeader planData={actualPlanData} isLoading={isLoading} />
+            <PlanHeader planData={displayedPlan} isLoading={isLoading} />
           </div>
 
           {/* Second Row - Google Map (spans full width) */}
           <div className="col-span-2 flex flex-col h-full">
             <RouteMap
-              planData={actualPlanData}
+              planData={displayedPlan}
               isExpanded={isMapExpanded}
               onExpand={() => setIsMapExpanded(!isMapExpanded)}
             />
@@ -236,12 +323,15 @@ function PlanLayout({ planData, isLoading = false }: PlanLayoutProps) {
         {/* Mobile Layout (below md) */}
         <div className="md:hidden space-y-6">
           {/* First Row - Header */}
-          <PlanHeader planData={actualPlanData} isLoading={isLoading} />
+          <PlanHeader planData={displayedPlan} isLoading={isLoading} />
 
           {/* Second Row - Toggle between Route Plan and Map */}
           <MobileToggle
-            planData={actualPlanData}
+            planData={displayedPlan}
             isLoading={isLoading}
+            linksLoading={linksLoading}
+            selectedPlan={selectedPlan}
+            onSelectPlan={setSelectedPlan}
             isMapExpanded={isMapExpanded}
             onMapExpand={() => setIsMapExpanded(!isMapExpanded)}
           />
@@ -7,9 +7,21 @@ import AddToCartButton from "./AddToCartButton";
 interface RoutePlanProps {
   planData: PlanData;
   isLoading: boolean;
+  // Product links are still being found; stores without links yet show a placeholder
+  linksLoading?: boolean;
+  // Plan shown: 0 is the recommended plan, n is planData.alternatives[n - 1]
+  selectedPlan?: number;
+  onSelectPlan?: (index: number) => void;
 }
 
-function RoutePlan({ planData, isLoading }: RoutePlanProps) {
+function RoutePlan({
+  planData,
+  isLoading,
+  linksLoading = false,
+  selectedPlan = 0,
+  onSelectPlan,
+}: RoutePlanProps) {
+  const alternatives = planData.alternatives || [];
   const scrollContainerRef = useRef<HTMLDivElement>(null);
 
   // Ensure scroll starts at the beginning when component mounts
@@ -24,6 +36,33 @@ function RoutePlan({ planData, isLoading }: RoutePlanProps) {
       <h3 className="text-xl font-bold text-orange-600 mb-4 flex-shrink-0">
         Route Plan
       </h3>
+      {/* Plan switcher: the recommended plan and its alternatives */}
+      {!isLoading && alternatives.length > 0 && onSelectPlan && (
+        <div className="flex flex-wrap gap-2 mb-4 flex-shrink-0">
+          {[null, ...alternatives].map((alternative, index) => (
+            <button
+              key={index}
+              onClick={() => onSelectPlan(index)}
+              title={
+                alternative?.pareto_optimal
+                  ? "No other plan is both cheaper and faster"
+                  : undefined
+              }
+              className={`px-3 py-1.5 rounded-lg text-xs font-medium transition-colors whitespace-nowrap ${
+                selectedPlan === index
+                  ? "bg-orange-500 text-white shadow-md"
+                  : "bg-orange-100 text-orange-700 hover:bg-orange-200"
+              }`}
+            >
+              {alternative
+                ? `$${alternative.total_cost.toFixed(2)} • ${Math.round(
+                    alternative.total_time
+                  )}min${alternative.pareto_optimal ? " ★" : ""}`
+                : "Recommended"}
+            </button>
+          ))}
+        </div>
+      )}
       {isLoading ? (
         // Loading skeleton
         <div className="space-y-4 overflow-y-auto flex-1 pb-4 min-h-0">
@@ -142,7 +181,13 @@ function RoutePlan({ planData, isLoading }: RoutePlanProps) {
                   {/* Footer */}
                   <div className="flex justify-between items-center pt-3 border-t border-orange-100">
                     {/* Add to Cart Button with store-specific links */}
-                    <AddToCartButton size="sm" links={store.links || []} />
+                    {linksLoading && !store.links?.length ? (
+                      <span className="px-3 py-1.5 rounded-lg text-xs font-medium bg-orange-100 text-orange-500 animate-pulse whitespace-nowrap">
+                        Finding links...
+                      </span>
+                    ) : (
+                      <AddToCartButton size="sm" links={store.links || []} />
+                    )}
                     {/* Status Badge */}
                     <span
                       className={`px-3 py-1 rounded-full text-xs font-medium whitespace-nowrap ${
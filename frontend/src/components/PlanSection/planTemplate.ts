@@ -47,6 +47,18 @@ export interface RouteSegment {
   travel_method: "walking" | "driving" | "public_transport";
 }
 
+// Another plan from the same optimization the user can switch to
+export interface PlanAlternative {
+  total_cost: number;
+  total_time: number;
+  travel_time: number;
+  shopping_time: number;
+  route_score: number;
+  stores: StoreBasket[];
+  route_segments: RouteSegment[];
+  pareto_optimal: boolean;
+}
+
 export interface PlanData {
   total_cost: number;
   total_time: number;
@@ -66,6 +78,7 @@ export interface PlanData {
     total_items: number;
     stores_count: number;
   };
+  alternatives?: PlanAlternative[];
 }
 
 // Template plan data
@@ -2,7 +2,10 @@ import { useState, useCallback } from "react";
 import {
   apiService,
   type OptimizationRequest,
+  type OptimizationEvent,
+  type BasketLinksEvent,
   type OptimizationResponse,
+  type ShoppingPlan,
 } from "../services/api";
 
 export interface OptimizationState {
@@ -36,8 +39,16 @@ export const useOptimization = () => {
     progress: 0,
   });
 
+  // The plan as soon as the route is chosen, filled in with product links as each
+  // store's are found
+  const [partialPlan, setPartialPlan] = useState<ShoppingPlan | null>(null);
+
   const optimizeShoppingPlan = useCallback(
-    async (request: OptimizationRequest) => {
+    async (
+      request: OptimizationRequest,
+      // Called with the partial plan whenever it changes, even after the caller unmounts
+      onPartialPlan?: (plan: ShoppingPlan) => void
+    ) => {
       setState({
         isLoading: true,
         isSuccess: false,
@@ -47,53 +58,81 @@ export const useOptimization = () => {
         progress: 0,
       });
 
-      // Simulate progress updates during the 1-2 minute optimization
-      const progressInterval = setInterval(() => {
-        setState((prev) => ({
-          ...prev,
-          progress: Math.min(prev.progress + Math.random() * 10, 90), // Cap at 90% until completion
-        }));
-      }, 2000);
-
-      // Update progress messages
-      const messageInterval = setInterval(() => {
-        setProgress((prev) => {
-          const stages = [
-            {
-              stage: "parsing" as const,
-              message: "Parsing your shopping list...",
-            },
-            {
-              stage: "optimizing" as const,
-              message: "Finding the best stores and prices...",
-            },
-            {
-              stage: "generating" as const,
-              message: "Generating your optimized route...",
-            },
-            { stage: "complete" as const, message: "Almost done..." },
-          ];
-
-          const currentIndex = stages.findIndex((s) => s.stage === prev.stage);
-          const nextIndex = Math.min(currentIndex + 1, stages.length - 1);
-
-          return {
-            ...prev,
-            stage: stages[nextIndex].stage,
-            message: stages[nextIndex].message,
-            progress: Math.min(prev.progress + 5, 85),
-          };
-        });
-      }, 15000); // Update message every 15 seconds
+      setPartialPlan(null);
+      setProgress({
+        stage: "parsing",
+        message: "Parsing your shopping list...",
+        progress: 0,
+      });
+
+      // Progress follows the stage events the server streams as each stage completes
+      let basketsTotal = 0;
+      let basketsDone = 0;
+      let latestPlan: ShoppingPlan | null = null;
+      const updatePartialPlan = (plan: ShoppingPlan) => {
+        latestPlan = plan;
+        setPartialPlan(plan);
+        onPartialPlan?.(plan);
+      };
+      const advance = (
+        stage: OptimizationProgress["stage"],
+        message: string,
+        value: number
+      ) => {
+        setState((prev) => ({ ...prev, progress: value }));
+        setProgress({ stage, message, progress: value });
+      };
+      const handleEvent = (event: OptimizationEvent) => {
+        switch (event.event) {
+          case "location":
+            advance("parsing", "Parsing your shopping list...", 10);
+            break;
+          case "parsed":
+            advance("optimizing", "Finding the best stores and prices...", 30);
+            break;
+          case "prices":
+            advance("optimizing", "Comparing prices across stores...", 45);
+            break;
+          case "routes":
+            advance("optimizing", "Scoring candidate routes...", 55);
+            break;
+          case "route": {
+            const plan = event.data as ShoppingPlan;
+            basketsTotal = plan.store_baskets.length;
+            updatePartialPlan(plan);
+            advance("generating", "Finding product links...", 70);
+            break;
+          }
+          case "basket_links": {
+            const { store_id, links } = event.data as BasketLinksEvent;
+            if (latestPlan) {
+              updatePartialPlan({
+                ...latestPlan,
+                store_baskets: latestPlan.store_baskets.map((basket) =>
+                  basket.store_info.store_id === store_id
+                    ? { ...basket, links }
+                    : basket
+                ),
+              });
+            }
+            basketsDone += 1;
+            advance(
+              "generating",
+              "Finding product links...",
+              70 + Math.round((25 * basketsDone) / Math.max(basketsTotal, 1))
+            );
+            break;
+          }
+        }
+      };
 
       try {
         console.log("[Optimization] Starting optimization request:", request);
 
-        const response = await apiService.optimizeShoppingPlan(request);
-
-        // Clear intervals
-        clearInterval(progressInterval);
-        clearInterval(messageInterval);
+        const response = await apiService.optimizeShoppingPlanStream(
+          request,
+          handleEvent
+        );
 
         console.log(
           "[Optimization] Optimization completed successfully:",
@@ -142,10 +181,6 @@ export const useOptimization = () => {
 
         return response;
       } catch (error: unknown) {
-        // Clear intervals
-        clearInterval(progressInterval);
-        clearInterval(messageInterval);
-
         console.error("[Optimization] Optimization failed:", error);
 
         // Check if it's a server connection error
@@ -364,6 +399,7 @@ export const useOptimization = () => {
   );
 
   const reset = useCallback(() => {
+    setPartialPlan(null);
     setState({
       isLoading: false,
       isSuccess: false,
@@ -383,6 +419,7 @@ export const useOptimization = () => {
   return {
     ...state,
     progress,
+    partialPlan,
     optimizeShoppingPlan,
     reset,
   };
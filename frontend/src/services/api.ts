@@ -52,6 +52,14 @@ export interface OptimizationRequest {
   max_stores?: number;
   time_weight?: number;
   price_weight?: number;
+  search_mode?: "retailer" | "store" | "anytime";
+  stores_per_retailer?: number;
+  num_alternatives?: number;
+  travel_mode?: "walking" | "driving" | "transit";
+  click_collect?: boolean;
+  substitutes?: boolean;
+  pack_sizes?: boolean;
+  deadline_ms?: number;
 }
 
 export interface Location {
@@ -75,6 +83,7 @@ export interface RouteItem {
   quantity: number;
   unit_price: number;
   line_total: number;
+  substitute_for?: string | null;
 }
 
 export interface StoreBasket {
@@ -83,6 +92,41 @@ export interface StoreBasket {
   subtotal: number;
   click_collect_eligible: boolean;
   min_spend_required: number;
+  links?: string[];
+}
+
+export interface BasketLinksEvent {
+  retailer_id: string;
+  store_id: string;
+  links: string[];
+}
+
+export interface RouteSegment {
+  from_store_id?: string | null;
+  to_store_id: string;
+  distance_km: number;
+  travel_time_min: number;
+  travel_method: string;
+}
+
+export interface PlanAlternative {
+  retailers: string[];
+  total_cost: number;
+  total_time: number;
+  travel_time: number;
+  shopping_time: number;
+  route_score: number;
+  num_stores: number;
+  stores: StoreBasket[];
+  route_segments: RouteSegment[];
+  pareto_optimal: boolean;
+}
+
+export interface ParetoPoint {
+  retailers: string[];
+  total_cost: number;
+  total_time: number;
+  route_score: number;
 }
 
 export interface ShoppingPlan {
@@ -95,12 +139,67 @@ export interface ShoppingPlan {
   route_score: number;
   store_baskets: StoreBasket[];
   generated_at?: string;
+  alternatives?: PlanAlternative[];
+  pareto_frontier?: ParetoPoint[];
 }
 
 export interface OptimizationResponse {
   plan: ShoppingPlan;
   success: boolean;
   message?: string;
+  degraded_stages?: string[];
+}
+
+export interface SplitOptimizationRequest {
+  grocery_list: string;
+  shopper_locations: string[];
+  max_stores?: number;
+  time_weight?: number;
+  price_weight?: number;
+  travel_mode?: "walking" | "driving" | "transit";
+  click_collect?: boolean;
+  substitutes?: boolean;
+  pack_sizes?: boolean;
+}
+
+export interface ShopperRoute {
+  shopper: number;
+  stores: StoreBasket[];
+  subtotal: number;
+  total_time: number;
+  travel_time: number;
+  shopping_time: number;
+}
+
+export interface SplitShoppingPlan {
+  shoppers: ShopperRoute[];
+  total_cost: number;
+  makespan: number;
+  total_savings: number;
+  route_score: number;
+  solver: "exact" | "savings";
+  generated_at?: string;
+}
+
+export interface SplitOptimizationResponse {
+  plan?: SplitShoppingPlan | null;
+  success: boolean;
+  message?: string;
+}
+
+export type OptimizationEventName =
+  | "location"
+  | "parsed"
+  | "prices"
+  | "routes"
+  | "route"
+  | "basket_links"
+  | "result"
+  | "error";
+
+export interface OptimizationEvent {
+  event: OptimizationEventName;
+  data: unknown;
 }
 
 export interface HealthResponse {
@@ -125,6 +224,83 @@ export const apiService = {
     return response.data;
   },
 
+  // Multi-shopper optimization endpoint
+  async optimizeSplitShoppingPlan(
+    request: SplitOptimizationRequest
+  ): Promise<SplitOptimizationResponse> {
+    const response = await api.post("/api/v1/optimization/optimize/split", request);
+    return response.data;
+  },
+
+  // Optimization endpoint with server-sent progress events
+  async optimizeShoppingPlanStream(
+    request: OptimizationRequest,
+    onEvent: (event: OptimizationEvent) => void
+  ): Promise<OptimizationResponse> {
+    console.log("[API] Making POST request to /api/v1/optimization/optimize/stream");
+    const response = await fetch(
+      `${API_BASE_URL}/api/v1/optimization/optimize/stream`,
+      {
+        method: "POST",
+        headers: {
+          "Content-Type": "application/json",
+          Accept: "text/event-stream",
+        },
+        body: JSON.stringify(request),
+      }
+    );
+    if (!response.ok || !response.body) {
+      const data = await response.json().catch(() => ({}));
+      throw Object.assign(new Error(`Request failed with status ${response.status}`), {
+        response: { status: response.status, data },
+      });
+    }
+
+    const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+    let buffer = "";
+    let result: OptimizationResponse | null = null;
+    for (;;) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += value;
+
+      // Events are separated by a blank line; keep-alive comments start with ":"
+      let boundary = buffer.indexOf("\n\n");
+      while (boundary !== -1) {
+        const frame = buffer.slice(0, boundary);
+        buffer = buffer.slice(boundary + 2);
+        boundary = buffer.indexOf("\n\n");
+
+        let name = "message";
+        const dataLines: string[] = [];
+        for (const line of frame.split("\n")) {
+          if (line.startsWith("event:")) name = line.slice(6).trim();
+          else if (line.startsWith("data:")) dataLines.push(line.slice(5).trimStart());
+        }
+        if (dataLines.length === 0) continue;
+
+        const event = {
+          event: name as OptimizationEventName,
+          data: JSON.parse(dataLines.join("\n")),
+        };
+        if (event.event === "error") {
+          throw Object.assign(new Error("Optimization failed"), {
+            response: { status: 500, data: event.data },
+          });
+        }
+        if (event.event === "result") {
+          result = event.data as OptimizationResponse;
+        }
+        onEvent(event);
+      }
+    }
+
+    if (!result) {
+      throw new Error("Optimization stream ended without a result");
+    }
+    return result;
+  },
+
   // Parse shopping list (if needed separately)
   async parseShoppingList(
     groceryList: string,